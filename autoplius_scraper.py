@@ -1,14 +1,23 @@
-import json
 import random
 import re
-import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple, Union
 from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
 
+from catalog_store import BRAND_KEYS, CatalogStore, open_store
+from checkpoints import CHECKPOINTS
+from http_cache import RESPONSE_CACHE
+from http_fetch import fetch_text
+from http_session import SESSIONS, get_session
+from log_writer import LOG_WRITER, get_logger
+from listings import CarListing, RecordList
+from parse_pipeline import PARSE_WORKERS, ParsePipeline, resolve_workers
+from parsed_document import PARSE_STATS, ParsedDocument, as_document
+
 BRANDS = [
     "Audi",
     "BMW",
@@ -39,21 +48,16 @@ USER_AGENTS = [
 ]
 
 DATA_PATH = Path("autoplius.json")
+DATA_STORE = open_store(DATA_PATH, BRAND_KEYS)
 LOG_PATH = Path("autoplius_log.txt")
+LOG = get_logger("autoplius", LOG_PATH)
 
 
 # Logging ---------------------------------------------------------------------
 
-def timestamp() -> str:
-    return time.strftime("%Y-%m-%d %H:%M:%S")
-
-
 def log(message: str) -> None:
-    try:
-        with LOG_PATH.open("a", encoding="utf-8") as fh:
-            fh.write(f"[{timestamp()}] {message}\n")
-    except Exception:
-        pass
+    """Queue an INFO line for the shared log writer (``log_writer``)."""
+    LOG.info(message)
 
 
 # HTTP helpers ----------------------------------------------------------------
@@ -67,20 +71,9 @@ def random_headers() -> Dict[str, str]:
 
 
 def request_with_retry(url: str, session: requests.Session) -> Optional[str]:
-    for attempt in range(1, 6):
-        sleep_seconds = random.uniform(1.0, 2.5)
-        log(f"Sleeping {sleep_seconds:.2f}s before request attempt {attempt} URL={url}")
-        time.sleep(sleep_seconds)
-        try:
-            response = session.get(url, headers=random_headers(), timeout=25)
-            if response.status_code == 200:
-                log(f"Request success attempt={attempt} status=200 URL={url}")
-                return response.text
-            log(f"Non-200 status={response.status_code} attempt={attempt} URL={url}")
-        except requests.RequestException as exc:
-            log(f"Request exception attempt={attempt} URL={url} exc={exc!r}")
-    log(f"Failed all retries for URL={url}")
-    return None
+    return fetch_text(
+        url, session, headers=random_headers, timeout=25, log=LOG.info, log_debug=LOG.debug, log_error=LOG.error
+    )
 
 
 # Parsing helpers -------------------------------------------------------------
@@ -105,27 +98,37 @@ def extract_float(text: str) -> Optional[float]:
         return None
 
 
-def parse_specs_value(soup: BeautifulSoup, labels: List[str]) -> Optional[str]:
-    for dt in soup.select("dt"):
-        label_text = dt.get_text(strip=True).lower()
-        if any(label.lower() in label_text for label in labels):
-            dd = dt.find_next_sibling("dd")
-            if dd:
-                return dd.get_text(strip=True)
-    return None
+class DetailIndex:
+    """Spec table and photo URLs of a detail page, gathered in one traversal.
 
+    ``specs`` keeps every ``<dt>`` label (lowercased) with the text of its
+    following ``<dd>`` in document order, so each field lookup is a scan over a
+    short list of strings instead of a fresh walk over the whole document.
+    """
 
-def parse_photos(soup: BeautifulSoup) -> (str, List[str]):
-    gallery_imgs = soup.select("img")
-    photo_urls: List[str] = []
-    for img in gallery_imgs:
-        candidate = img.get("data-src") or img.get("src") or ""
-        if candidate and candidate.startswith("http"):
-            photo_urls.append(candidate)
-    photo_urls = list(dict.fromkeys(photo_urls))
-    main_photo = photo_urls[0] if photo_urls else ""
-    additional = photo_urls[1:] if len(photo_urls) > 1 else []
-    return main_photo, additional
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self.specs: List[Tuple[str, Optional[str]]] = []
+        photo_urls: List[str] = []
+        for tag in soup.find_all(["dt", "img"]):
+            if tag.name == "dt":
+                dd = tag.find_next_sibling("dd")
+                self.specs.append((tag.get_text(strip=True).lower(), dd.get_text(strip=True) if dd else None))
+                continue
+            candidate = tag.get("data-src") or tag.get("src") or ""
+            if candidate and candidate.startswith("http"):
+                photo_urls.append(candidate)
+        self.photo_urls = list(dict.fromkeys(photo_urls))
+
+    def spec(self, labels: List[str]) -> Optional[str]:
+        wanted = [label.lower() for label in labels]
+        for label_text, value in self.specs:
+            if value is not None and any(label in label_text for label in wanted):
+                return value
+        return None
+
+    def photos(self) -> (str, List[str]):
+        main_photo = self.photo_urls[0] if self.photo_urls else ""
+        return main_photo, self.photo_urls[1:]
 
 
 def parse_price(soup: BeautifulSoup) -> Optional[int]:
@@ -143,11 +146,16 @@ def parse_price(soup: BeautifulSoup) -> Optional[int]:
     return None
 
 
-def parse_listing_detail(url: str, session: requests.Session, brand: str) -> Optional[Dict[str, object]]:
+def parse_listing_detail(url: str, session: requests.Session, brand: str) -> Optional[CarListing]:
     html = request_with_retry(url, session)
     if not html:
         return None
-    soup = BeautifulSoup(html, "lxml")
+    return parse_detail_html(html, url, brand)
+
+
+def parse_detail_html(html: str, url: str, brand: str) -> CarListing:
+    """Build the listing record from a fetched detail page; runs in parse workers too."""
+    soup = ParsedDocument.parse(html, url, kind="autoplius.detail").soup
 
     title = soup.find("h1")
     title_text = title.get_text(" ", strip=True) if title else ""
@@ -156,14 +164,15 @@ def parse_listing_detail(url: str, session: requests.Session, brand: str) -> Opt
         lowered = title_text.replace(brand, "", 1).strip()
         model = lowered.split(" ")[0] if lowered else ""
 
-    generation = parse_specs_value(soup, ["karta", "generation", "modelio versija", "modifikacija"])
-    year_text = parse_specs_value(soup, ["metai", "pagaminimo", "year"])
+    index = DetailIndex(soup)
+    generation = index.spec(["karta", "generation", "modelio versija", "modifikacija"])
+    year_text = index.spec(["metai", "pagaminimo", "year"])
     year = extract_int(year_text or "")
-    mileage_text = parse_specs_value(soup, ["rida", "mileage", "km"])
+    mileage_text = index.spec(["rida", "mileage", "km"])
     mileage = extract_int(mileage_text or "")
-    vin = parse_specs_value(soup, ["vin"])
+    vin = index.spec(["vin"])
     price = parse_price(soup)
-    main_photo, additional_photos = parse_photos(soup)
+    main_photo, additional_photos = index.photos()
 
     listing_id = None
     id_match = re.search(r"(\d+)(?:\.html)?$", url)
@@ -174,23 +183,23 @@ def parse_listing_detail(url: str, session: requests.Session, brand: str) -> Opt
         if id_tag and id_tag.has_attr("data-id"):
             listing_id = id_tag["data-id"]
 
-    return {
-        "brand": brand,
-        "model": model,
-        "generation": generation or "",
-        "year": year,
-        "mileage": mileage,
-        "price": price,
-        "vin": vin or "",
-        "photo": main_photo,
-        "photos": additional_photos,
-        "url": url,
-        "id": listing_id or "",
-    }
-
-
-def parse_listings_page(html: str, base_url: str) -> List[Dict[str, str]]:
-    soup = BeautifulSoup(html, "lxml")
+    return CarListing(
+        brand=brand,
+        model=model,
+        generation=generation or "",
+        year=year,
+        mileage=mileage,
+        price=price,
+        vin=vin or "",
+        photo=main_photo,
+        photos=additional_photos,
+        url=url,
+        id=listing_id or "",
+    )
+
+
+def parse_listings_page(source: Union[str, ParsedDocument], base_url: str) -> List[Dict[str, str]]:
+    soup = as_document(source, kind="autoplius.listings").soup
     listing_cards = soup.select("[data-id], .announcement-item, article")
     listings: List[Dict[str, str]] = []
     for card in listing_cards:
@@ -214,8 +223,8 @@ def parse_listings_page(html: str, base_url: str) -> List[Dict[str, str]]:
     return unique
 
 
-def extract_total_pages(html: str) -> int:
-    soup = BeautifulSoup(html, "lxml")
+def extract_total_pages(source: Union[str, ParsedDocument]) -> int:
+    soup = as_document(source, kind="autoplius.listings").soup
     page_numbers = set()
     for link in soup.select("a[href]"):
         text = link.get_text(strip=True)
@@ -226,27 +235,40 @@ def extract_total_pages(html: str) -> int:
 
 # Persistence -----------------------------------------------------------------
 
-def load_existing() -> Dict[str, List[Dict[str, object]]]:
-    if DATA_PATH.exists():
-        try:
-            return json.loads(DATA_PATH.read_text(encoding="utf-8"))
-        except Exception as exc:
-            log(f"Failed to load existing data: {exc!r}")
-            return {}
-    return {}
+def load_existing() -> CatalogStore:
+    try:
+        return DATA_STORE.load()
+    except Exception as exc:
+        log(f"Failed to load existing data: {exc!r}")
+        return DATA_STORE
 
 
-def save_data(data: Dict[str, List[Dict[str, object]]]) -> None:
+def save_data(data: CatalogStore) -> None:
     try:
-        DATA_PATH.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        data.save()
         log("autoplius.json saved")
     except Exception as exc:
         log(f"Failed to save data: {exc!r}")
 
 
+def checkpoint_data(data: CatalogStore) -> None:
+    """Hand new records to the background checkpoint thread; it fsyncs and compacts autoplius.json."""
+    try:
+        if data.checkpoint():
+            log("autoplius.json checkpoint queued")
+    except Exception as exc:
+        log(f"Failed to save data: {exc!r}")
+
+
 # Scraper ---------------------------------------------------------------------
 
-def scrape_brand(brand: str, session: requests.Session, existing_ids: Set[str]) -> List[Dict[str, object]]:
+def scrape_brand(
+    brand: str,
+    session: requests.Session,
+    existing_ids: Set[str],
+    pipeline: Optional[ParsePipeline] = None,
+) -> RecordList:
+    pipeline = pipeline or ParsePipeline()
     log(f"Starting brand {brand}")
     brand_slug = brand.lower().replace(" ", "-")
     base_url = f"https://autoplius.lt/skelbimai/naudoti-automobiliai/{brand_slug}"
@@ -254,28 +276,44 @@ def scrape_brand(brand: str, session: requests.Session, existing_ids: Set[str])
     first_page = request_with_retry(base_url, session)
     if not first_page:
         log(f"Failed to fetch first page for brand={brand}")
-        return []
+        return RecordList(CarListing)
 
-    total_pages = extract_total_pages(first_page)
+    # Parsed once; both the page count and the listing cards come from this tree.
+    first_doc = ParsedDocument.parse(first_page, base_url, kind="autoplius.listings")
+    total_pages = extract_total_pages(first_doc)
     log(f"Detected {total_pages} pages for brand={brand}")
 
-    all_entries: List[Dict[str, object]] = []
+    # A brand can have tens of thousands of ads; they are held column by column until stored.
+    all_entries = RecordList(CarListing)
     for page in range(1, total_pages + 1):
         page_url = base_url if page == 1 else f"{base_url}?page_nr={page}"
-        page_html = first_page if page == 1 else request_with_retry(page_url, session)
-        if not page_html:
-            continue
-        for listing in parse_listings_page(page_html, base_url):
+        if page == 1:
+            page_doc = first_doc
+        else:
+            page_html = request_with_retry(page_url, session)
+            if not page_html:
+                continue
+            page_doc = ParsedDocument.parse(page_html, page_url, kind="autoplius.listings")
+        log(f"Parsed page {page} for brand={brand} in {page_doc.parse_seconds * 1000:.1f}ms")
+        # Detail pages are fetched here and parsed by the pipeline while the next one downloads.
+        queued: List[Tuple[Dict[str, str], Future]] = []
+        queued_ids: Set[str] = set()
+        for listing in parse_listings_page(page_doc, base_url):
             listing_id = listing.get("id") or ""
-            if listing_id and listing_id in existing_ids:
+            if listing_id and (listing_id in existing_ids or listing_id in queued_ids):
                 log(f"Skipping already scraped listing id={listing_id}")
                 continue
-            detail = parse_listing_detail(listing["url"], session, brand)
-            if not detail:
+            html = request_with_retry(listing["url"], session)
+            if not html:
                 continue
-            if not detail.get("photo") and listing.get("photo"):
-                detail["photo"] = listing["photo"]
-            listing_id = detail.get("id")
+            queued.append((listing, pipeline.submit(parse_detail_html, html, listing["url"], brand)))
+            if listing_id:
+                queued_ids.add(listing_id)
+        for listing, parsed in queued:
+            detail = parsed.result()
+            if not detail.photo and listing.get("photo"):
+                detail.photo = listing["photo"]
+            listing_id = detail.id
             if listing_id:
                 existing_ids.add(str(listing_id))
             all_entries.append(detail)
@@ -285,29 +323,32 @@ def scrape_brand(brand: str, session: requests.Session, existing_ids: Set[str])
 
 def main() -> None:
     LOG_PATH.touch(exist_ok=True)
-    session = requests.Session()
+    session = get_session()
+    pipeline = ParsePipeline(resolve_workers(PARSE_WORKERS))
     data = load_existing()
-    scraped_ids: Set[str] = set()
-    for brand_entries in data.values():
-        for entry in brand_entries:
-            if isinstance(entry, dict) and entry.get("id"):
-                scraped_ids.add(str(entry["id"]))
+    scraped_ids: Set[str] = data.listing_ids()
 
     for brand in BRANDS:
         try:
-            brand_results = scrape_brand(brand, session, scraped_ids)
+            brand_results = scrape_brand(brand, session, scraped_ids, pipeline)
             if brand_results:
-                data.setdefault(brand, [])
-                data[brand].extend(brand_results)
-                save_data(data)
+                data.extend([brand], brand_results)
+                checkpoint_data(data)
         except KeyboardInterrupt:
             log("KeyboardInterrupt received, saving and exiting")
             break
         except Exception as exc:
             log(f"Unhandled exception for brand={brand}: {exc!r}")
-            save_data(data)
 
     save_data(data)
+    pipeline.shutdown()
+    log(f"HTTP cache {RESPONSE_CACHE.report()}")
+    log(f"HTTP connections {SESSIONS.report()}")
+    log(f"HTML parsing {PARSE_STATS.report()}")
+    log(f"Parse pipeline {pipeline.report()}")
+    log(f"Data store {data.report()}")
+    log(f"Checkpoints {CHECKPOINTS.report()}")
+    log(f"Log writer {LOG_WRITER.report()}")
     log("Scraping completed")
 
 
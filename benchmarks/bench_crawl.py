@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from http_cache import RESPONSE_CACHE  # noqa: E402
+from http_session import SESSIONS, get_session  # noqa: E402
+from parse_pipeline import ParsePipeline, resolve_workers  # noqa: E402
+from rate_limiter import HOST_RATES, RATE_LIMITER  # noqa: E402
+from transport import TRANSPORT, ReplayServer  # noqa: E402
+
+TARGETS = ("build_catalog", "scrape_brand", "process_brand", "scrape_part")
+
+
+def run_target(args: argparse.Namespace, pipeline: ParsePipeline) -> int:
+    """Run one crawler entry point and return the number of records it produced."""
+    if args.target == "build_catalog":
+        import catalog_builder
+
+        brands = args.brand or list(catalog_builder.BRAND_MODELS)[:1]
+        catalog_builder.BRAND_MODELS = {
+            brand: catalog_builder.BRAND_MODELS.get(brand, [])[: args.models] for brand in brands
+        }
+        if args.part:
+            catalog_builder.PARTS = args.part
+        catalog = catalog_builder.build_catalog(
+            concurrency=args.concurrency, per_domain_limit=args.per_domain, pipeline=pipeline
+        )
+        return catalog.count()
+    if args.target == "scrape_brand":
+        import autoplius_scraper
+
+        return sum(
+            len(autoplius_scraper.scrape_brand(brand, get_session(), set(), pipeline))
+            for brand in args.brand or autoplius_scraper.BRANDS[:1]
+        )
+    if args.target == "process_brand":
+        import car_catalog_scraper
+
+        catalog = car_catalog_scraper.load_catalog()
+        for brand in args.brand or car_catalog_scraper.BRANDS[:1]:
+            car_catalog_scraper.process_brand(brand, catalog, {})
+        return catalog.count()
+    import parts_catalog_scraper
+
+    return sum(
+        len(parts_catalog_scraper.scrape_part(part, get_session(), pipeline))
+        for part in args.part or parts_catalog_scraper.PARTS[:1]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark a crawler end to end against a replayed archive.")
+    parser.add_argument("target", choices=TARGETS)
+    parser.add_argument("--archive", required=True, type=Path, help="Archive recorded with SCRAPER_TRANSPORT=record:...")
+    parser.add_argument("--brand", action="append", default=[])
+    parser.add_argument("--part", action="append", default=[])
+    parser.add_argument("--models", type=int, default=2, help="Models per brand for build_catalog")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--per-domain", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-503", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--stall", type=float, default=2.0)
+    parser.add_argument("--bandwidth", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=0.0, help="Override every per-host budget (requests/second)")
+    parser.add_argument("--fallback", action="store_true")
+    parser.add_argument("--parse-workers", default="0", help="Parse worker processes (0 = inline, 'auto')")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.archive.resolve(),
+        latency=args.latency,
+        jitter=args.jitter,
+        errors={429: args.error_429, 503: args.error_503, "timeout": args.timeout_rate},
+        bandwidth=args.bandwidth or None,
+        stall=args.stall,
+        fallback=args.fallback,
+        seed=args.seed,
+    ).start()
+    TRANSPORT.replay_through(server.url)
+    RESPONSE_CACHE.enabled = False
+    if args.rate:
+        for host in HOST_RATES:
+            RATE_LIMITER.set_rate(host, args.rate, max(1, int(args.rate)))
+
+    workdir = tempfile.mkdtemp(prefix="bench_crawl_")
+    os.chdir(workdir)
+    pipeline = ParsePipeline(resolve_workers(args.parse_workers))
+    started = time.perf_counter()
+    try:
+        records = run_target(args, pipeline)
+    finally:
+        elapsed = time.perf_counter() - started
+        pipeline.shutdown()
+        server.stop()
+    requests_served = sum(count for name, count in server.counts.items() if name != "fallback")
+    print(f"target={args.target} records={records} elapsed={elapsed:.2f}s")
+    print(f"stand-in requests={requests_served} ({requests_served / elapsed:.1f}/s) counts={server.counts}")
+    print(f"connections {SESSIONS.report()}")
+    print(f"parse pipeline {pipeline.report()}")
+    print(f"outputs in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import ebay_parser  # noqa: E402
+from rate_limiter import host_key  # noqa: E402
+from transport import load_archive  # noqa: E402
+
+EBAY_HOSTS = {"ebay.com", "ebay.de", "ebay.co.uk"}
+
+
+def load_pages(archive: List[Path], pages_dir: List[Path]) -> List[Tuple[str, str]]:
+    pages: List[Tuple[str, str]] = []
+    for path in archive:
+        for url, record in load_archive(path).items():
+            if record.get("status") == 200 and host_key(url) in EBAY_HOSTS:
+                pages.append((url, str(record.get("body", ""))))
+    for directory in pages_dir:
+        for path in sorted(directory.glob("*.htm*")):
+            pages.append((str(path), path.read_text(encoding="utf-8", errors="replace")))
+    return pages
+
+
+def raw_fields(items: List[ebay_parser.RawItem]) -> List[Tuple]:
+    return [tuple(getattr(item, name) for name in ebay_parser.RawItem.__slots__) for item in items]
+
+
+def chunked(html: str, size: int = 16 * 1024) -> Iterator[str]:
+    """Feed a page the way ``http_fetch.fetch_stream`` does."""
+    for start in range(0, len(html), size):
+        yield html[start : start + size]
+
+
+def caller_outputs(html: str) -> Dict[str, object]:
+    import catalog_builder
+    import scraper
+
+    return {
+        "catalog_builder.parse_listings": catalog_builder.parse_listings(html, "parity", set(), "b", "m", "p"),
+        "scraper.extract_listings": scraper.extract_listings(html),
+    }
+
+
+def available_backends(requested: List[str]) -> List[str]:
+    backends = []
+    for name in requested:
+        try:
+            ebay_parser.BACKENDS[name]("<html><body></body></html>")
+        except ImportError:
+            print(f"skipping backend {name}: not installed")
+            continue
+        backends.append(name)
+    return backends
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check that every eBay parser backend (and the streaming parser) extracts identical "
+        "listings and compare their speed."
+    )
+    parser.add_argument("--archive", action="append", type=Path, default=[], help="Recorded transport archive")
+    parser.add_argument("--pages", action="append", type=Path, default=[], help="Directory of saved result pages")
+    parser.add_argument("--backend", action="append", default=[], help="Backends to compare (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per page")
+    args = parser.parse_args()
+
+    pages = load_pages([path.resolve() for path in args.archive], [path.resolve() for path in args.pages])
+    if not pages:
+        parser.error("no eBay result pages found in the given archives/directories")
+    backends = available_backends(args.backend or list(ebay_parser.BACKENDS))
+    reference = backends[0]
+
+    # The callers log OEM hits next to their catalogs; keep that out of the caller's tree.
+    os.chdir(tempfile.mkdtemp(prefix="ebay_parity_"))
+
+    mismatches = 0
+    expected: Dict[str, Tuple] = {}
+    for name in backends:
+        ebay_parser.DEFAULT_BACKEND = name
+        for url, html in pages:
+            observed = (raw_fields(ebay_parser.parse_items(html)), caller_outputs(html))
+            if name == reference:
+                expected[url] = observed
+            elif observed != expected[url]:
+                mismatches += 1
+                print(f"MISMATCH backend={name} vs {reference} page={url}")
+
+    # The streaming parser must agree with the full parse when the whole page is fed in.
+    for url, html in pages:
+        streamed = raw_fields(list(ebay_parser.iter_items_stream(chunked(html))))
+        if streamed != expected[url][0]:
+            mismatches += 1
+            print(f"MISMATCH streaming parser vs {reference} page={url}")
+
+    items_total = sum(len(expected[url][0]) for url, _ in pages)
+    print(f"pages={len(pages)} items={items_total} backends={','.join(backends)} mismatches={mismatches}")
+    timings: Dict[str, float] = {}
+    for name in backends:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, html in pages:
+                ebay_parser.parse_items(html, name)
+        timings[name] = (time.perf_counter() - started) / (args.repeat * len(pages))
+    for label, limit in (("stream", None), ("stream@10", 10)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for _, html in pages:
+                for _ in itertools.islice(ebay_parser.iter_items_stream(chunked(html)), limit):
+                    pass
+        timings[label] = (time.perf_counter() - started) / (args.repeat * len(pages))
+    baseline = timings.get("bs4", timings[reference])
+    for name, per_page in timings.items():
+        print(f"{name:>10}: {per_page * 1000:8.2f} ms/page  speedup x{baseline / per_page:.1f}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
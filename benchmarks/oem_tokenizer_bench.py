@@ -0,0 +1,141 @@
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import ebay_parser  # noqa: E402
+from ebay_parser import join_text  # noqa: E402
+from oem_tokenizer import OEM_TOKENIZER  # noqa: E402
+from rate_limiter import host_key  # noqa: E402
+from transport import load_archive  # noqa: E402
+
+EBAY_HOSTS = {"ebay.com", "ebay.de", "ebay.co.uk"}
+
+SAMPLE_PARTS = [
+    ("Audi", "Turbo charger 03L 130 277 B {year} 2.0 TDI 140PS"),
+    ("Volkswagen", "EGR valve 03L131501G Golf MK6 {year}-{year2} 4MOTION"),
+    ("BMW", "Injector 13 53 7 589 048 BMW E90 320d {mileage} km 0 445 110 289"),
+    ("BMW", "Alternator 12317823210 xDrive F30 {year}"),
+    ("Mercedes", "Turbo A 651 090 14 80 Sprinter {year} 4MATIC 120KW"),
+    ("Renault", "EGR valve 8200 123 456 Megane {year} 1.5 dCi 80KW"),
+    ("Opel", "Thermostat 55 566 052 Astra {year} 1.7 CDTI"),
+    ("Peugeot", "Injector 9673021480 308 {year} 0 445 110 311"),
+    ("Skoda", "ABS pump 1K0 614 517 DE Octavia {year} tested"),
+    ("Fiat", "Starter 55212460 Ducato {year} {mileage} km"),
+]
+
+
+# Extraction as it was implemented in each module before oem_tokenizer.
+
+
+def legacy_scraper_find_oems(text: str) -> List[str]:
+    normalized = text.upper().replace("-", " ")
+    matches = re.findall(r"[A-Z0-9]{4,}", normalized)
+    unique: List[str] = []
+    seen: Set[str] = set()
+    for m in matches:
+        cleaned = m.strip().upper()
+        if cleaned not in seen:
+            unique.append(cleaned)
+            seen.add(cleaned)
+    return unique
+
+
+def legacy_catalog_extract_oems(text: str) -> List[str]:
+    raw = re.findall(r"[A-Z0-9]{4,}", text.upper())
+    return [re.sub(r"[-\s]", "", token) for token in raw]
+
+
+def legacy_parts_scan(text: str) -> List[str]:
+    return [re.sub(r"[^A-Z0-9]", "", token.upper()) for token in re.findall(r"[A-Z0-9]{4,}", text)]
+
+
+def synthetic_titles(count: int, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        brand, template = rng.choice(SAMPLE_PARTS)
+        year = rng.randint(1998, 2020)
+        titles.append(
+            (brand, template.format(year=year, year2=year + rng.randint(1, 6), mileage=rng.randint(20, 300) * 1000))
+        )
+    return titles
+
+
+def archive_titles(archive: List[Path]) -> List[Tuple[str, str]]:
+    titles = []
+    for path in archive:
+        for url, record in load_archive(path).items():
+            if record.get("status") != 200 or host_key(url) not in EBAY_HOSTS:
+                continue
+            for item in ebay_parser.parse_items(str(record.get("body", ""))):
+                if item.title is not None:
+                    titles.append(("", f"{join_text(item.title, ' ')} {join_text(item.subtitle, ' ')}"))
+    return titles
+
+
+def timed(label: str, run: Callable[[], List[List[str]]], repeat: int, count: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        tokens = run()
+    elapsed = (time.perf_counter() - started) / repeat
+    total = sum(len(found) for found in tokens)
+    distinct = len({token for found in tokens for token in found})
+    print(
+        f"{label:>30}: {elapsed * 1000:8.2f} ms  {count / elapsed:10.0f} titles/s  tokens={total} distinct={distinct}"
+    )
+    return {"elapsed": elapsed, "distinct": distinct}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the OEM tokenizer with the per-module extractors it replaced.")
+    parser.add_argument("--archive", action="append", type=Path, default=[], help="Recorded transport archive")
+    parser.add_argument("--titles", type=Path, help="Text file with one listing title per line")
+    parser.add_argument("--synthetic", type=int, default=5000, help="Synthetic titles when no input is given")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--show", type=int, default=5, help="Print this many sample tokenizations")
+    args = parser.parse_args()
+
+    titles = archive_titles([path.resolve() for path in args.archive])
+    if args.titles:
+        titles += [("", line) for line in args.titles.read_text(encoding="utf-8").splitlines() if line.strip()]
+    if not titles:
+        titles = synthetic_titles(args.synthetic, args.seed)
+    texts = [text for _, text in titles]
+    print(f"titles={len(texts)}")
+
+    for brand, text in titles[: args.show]:
+        print(f"  {text!r}\n    legacy={legacy_catalog_extract_oems(text)} new={OEM_TOKENIZER.tokenize(text, brand or None)}")
+
+    results = {
+        "scraper.find_oems": timed(
+            "scraper.find_oems (legacy)", lambda: [legacy_scraper_find_oems(t) for t in texts], args.repeat, len(texts)
+        ),
+        "catalog_builder.extract_oems": timed(
+            "catalog.extract_oems (legacy)", lambda: [legacy_catalog_extract_oems(t) for t in texts], args.repeat, len(texts)
+        ),
+        "parts scan": timed("parts detail scan (legacy)", lambda: [legacy_parts_scan(t) for t in texts], args.repeat, len(texts)),
+        "tokenize": timed(
+            "OemTokenizer.tokenize", lambda: [OEM_TOKENIZER.tokenize(t, b or None) for b, t in titles], args.repeat, len(texts)
+        ),
+        "tokenize_many": timed(
+            "OemTokenizer.tokenize_many", lambda: OEM_TOKENIZER.tokenize_many(texts), args.repeat, len(texts)
+        ),
+    }
+    baseline = results["catalog_builder.extract_oems"]
+    batched = results["tokenize_many"]
+    print(
+        f"tokenize_many vs catalog_builder.extract_oems: speed x{baseline['elapsed'] / batched['elapsed']:.2f}, "
+        f"distinct OEMs {baseline['distinct']} -> {batched['distinct']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from listings import CarListing, EbayPartListing, RecordList, RrrPart, encode_record  # noqa: E402
+from model_matcher import SEED_MODELS  # noqa: E402
+
+PARTS = ["turbo", "egr valve", "injector", "alternator", "starter", "water pump", "abs pump", "headlight"]
+KINDS = {"ebay": EbayPartListing, "car": CarListing, "rrr": RrrPart}
+
+
+def oem(rng: random.Random) -> str:
+    return f"{rng.randint(10**8, 10**9):X}"
+
+
+def synthetic_entry(kind: str, rng: random.Random, index: int) -> Dict[str, Any]:
+    """One listing dict as the scrapers write it."""
+    brand = rng.choice(list(SEED_MODELS))
+    model = rng.choice(SEED_MODELS[brand])
+    if kind == "ebay":
+        return {
+            "oem_main": oem(rng),
+            "oem_cross_refs": [oem(rng) for _ in range(rng.randint(0, 4))],
+            "title": f"{brand} {model} {rng.choice(PARTS)} OEM genuine used",
+            "price": round(rng.uniform(10, 900), 2),
+            "currency": rng.choice(["EUR", "USD", "GBP"]),
+            "image_url": f"https://i.ebayimg.com/images/g/{index}/s-l500.jpg",
+            "ebay_url": f"https://www.ebay.de/itm/{10**11 + index}",
+        }
+    if kind == "car":
+        return {
+            "brand": brand,
+            "model": model,
+            "generation": rng.choice(["", "B8", "F30", "Mk7", "W204"]),
+            "year": rng.randint(2000, 2023),
+            "mileage": rng.randint(0, 400000),
+            "price": rng.randint(500, 60000),
+            "vin": "",
+            "photo": f"https://img.autoplius.lt/{index}/0.jpg",
+            "photos": [f"https://img.autoplius.lt/{index}/{n}.jpg" for n in range(1, 5)],
+            "url": f"https://autoplius.lt/skelbimai/{index}.html",
+            "id": str(index),
+        }
+    return {
+        "oem_main": oem(rng),
+        "oem_cross_refs": [oem(rng) for _ in range(rng.randint(0, 3))],
+        "price": round(rng.uniform(5, 500), 2),
+        "currency": "EUR",
+        "model": f"{brand} {model}",
+        "year": rng.randint(2000, 2023),
+        "image_url": f"https://rrr.lt/images/{index}.jpg",
+        "url": f"https://rrr.lt/preke/{index}",
+        "title": f"{rng.choice(PARTS)} {brand} {model}",
+    }
+
+
+def builders(record_type: type) -> Dict[str, Callable[[List[str]], Any]]:
+    """Each representation, built from the JSON lines a record log holds."""
+    return {
+        "dict": lambda lines: [json.loads(line) for line in lines],
+        record_type.__name__: lambda lines: [record_type.from_dict(json.loads(line)) for line in lines],
+        "RecordList": lambda lines: RecordList(record_type, (json.loads(line) for line in lines)),
+    }
+
+
+def retained_bytes(build: Callable[[List[str]], Any], lines: List[str]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build(lines)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return after - before
+
+
+def measure(build: Callable[[List[str]], Any], lines: List[str]) -> Dict[str, float]:
+    started = time.perf_counter()
+    held = build(lines)
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    json.dumps(held, ensure_ascii=False, default=encode_record)
+    dumped = time.perf_counter() - started
+    started = time.perf_counter()
+    gc.collect()
+    collected = time.perf_counter() - started
+    del held
+    return {"build": built, "dump": dumped, "gc": collected, "bytes": retained_bytes(build, lines)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory held by listing dicts vs slotted records.")
+    parser.add_argument("--listings", type=int, default=200000, help="Listings per kind")
+    parser.add_argument("--kind", action="append", choices=sorted(KINDS), default=[], help="Default: all kinds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for kind in args.kind or list(KINDS):
+        rng = random.Random(args.seed)
+        lines = [json.dumps(synthetic_entry(kind, rng, index), ensure_ascii=False) for index in range(args.listings)]
+        print(f"{kind}: {args.listings} listings")
+        baseline = None
+        for label, build in builders(KINDS[kind]).items():
+            result = measure(build, lines)
+            baseline = baseline or result["bytes"]
+            print(
+                f"  {label:>16}: {result['bytes'] / 2**20:7.1f} MiB ({result['bytes'] / args.listings:5.0f} B/listing, "
+                f"x{baseline / result['bytes']:.2f})  build {result['build']:.2f}s  "
+                f"to JSON {result['dump']:.2f}s  gc.collect {result['gc'] * 1000:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from catalog_store import LAYOUTS, IndexedJsonStore, JsonStore, entry_id, entry_oems, walk  # noqa: E402
+from model_matcher import SEED_MODELS  # noqa: E402
+
+PARTS = ["turbo", "egr valve", "injector", "alternator", "starter", "water pump", "abs pump", "headlight"]
+LOADERS = ["json.load", "JsonStore", "IndexedJsonStore"]
+
+
+def synthetic_dataset(layout: str, listings: int, seed: int) -> Dict[str, object]:
+    """A dataset shaped like the scrapers' output, ``listings`` entries in total."""
+    rng = random.Random(seed)
+    paths: List[Tuple[str, ...]] = []
+    for brand, models in SEED_MODELS.items():
+        for model in models:
+            for part in PARTS:
+                paths.append((brand, model, part) if layout == "catalog" else (brand,))
+    data: Dict[str, object] = {}
+    for index in range(listings):
+        key_path = rng.choice(paths)
+        if layout == "catalog":
+            entry = {
+                "oem_main": f"{rng.randint(10**8, 10**9):X}",
+                "oem_cross_refs": [f"{rng.randint(10**8, 10**9):X}" for _ in range(rng.randint(0, 4))],
+                "title": f"{key_path[0]} {key_path[1]} {key_path[2]} OEM part genuine used " * 2,
+                "price": round(rng.uniform(10, 900), 2),
+                "currency": "EUR",
+                "image_url": f"https://i.ebayimg.com/images/g/{index}/s-l500.jpg",
+                "ebay_url": f"https://www.ebay.de/itm/{10**11 + index}",
+            }
+        else:
+            entry = {
+                "brand": key_path[0],
+                "model": rng.choice(SEED_MODELS[key_path[0]]),
+                "generation": "",
+                "year": rng.randint(2000, 2023),
+                "mileage": rng.randint(0, 400000),
+                "price": rng.randint(500, 60000),
+                "vin": "",
+                "photo": f"https://img.autoplius.lt/{index}/0.jpg",
+                "photos": [f"https://img.autoplius.lt/{index}/{n}.jpg" for n in range(1, 8)],
+                "url": f"https://autoplius.lt/skelbimai/{index}.html",
+                "id": str(index),
+            }
+        node = data
+        for key in key_path[:-1]:
+            node = node.setdefault(key, {})
+        node.setdefault(key_path[-1], []).append(entry)
+    return data
+
+
+def legacy_indexes(path: Path, depth: int) -> Tuple[Set[str], Set[str]]:
+    """What the scrapers did before the stores: json.load the file, then walk it for ids and OEMs."""
+    with path.open("r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    ids: Set[str] = set()
+    oems: Set[str] = set()
+    for _, entries in walk(data, depth):
+        for entry in entries:
+            listing_id = entry_id(entry)
+            if listing_id:
+                ids.add(listing_id)
+            oems |= entry_oems(entry)
+    return ids, oems
+
+
+def peak_rss_kib() -> int:
+    # ru_maxrss survives exec on Linux, so a child would report its parent's peak; VmHWM does not.
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(loader: str, path: Path) -> None:
+    """Load ``path`` with one loader and print its timing and peak RSS as JSON."""
+    keys = LAYOUTS.get(path.stem, ("brand",))
+    before = peak_rss_kib()
+    started = time.perf_counter()
+    if loader == "json.load":
+        ids, oems = legacy_indexes(path, len(keys))
+    else:
+        store = (JsonStore if loader == "JsonStore" else IndexedJsonStore)(path, keys).load()
+        ids, oems = store.listing_ids(), store.oems()
+    elapsed = time.perf_counter() - started
+    peak = peak_rss_kib()
+    result = {"seconds": elapsed, "peak_kib": peak, "growth_kib": peak - before, "ids": len(ids), "oems": len(oems)}
+    print(json.dumps(result))
+
+
+def run_child(loader: str, path: Path) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", loader, str(path)],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=str(path.parent),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup time and peak memory of the resume loaders.")
+    parser.add_argument("--dataset", action="append", type=Path, default=[], help="Dataset file, e.g. catalog.json")
+    parser.add_argument("--layout", choices=["catalog", "autoplius"], default="catalog", help="Synthetic layout")
+    parser.add_argument("--listings", type=int, default=200000, help="Synthetic listings without --dataset")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per loader (the fastest is shown)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child", nargs=2, metavar=("LOADER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], Path(args.child[1]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = [path.resolve() for path in args.dataset]
+        if not datasets:
+            # Copied so no record log is left next to a real dataset.
+            path = Path(tmp) / f"{args.layout}.json"
+            path.write_text(
+                json.dumps(synthetic_dataset(args.layout, args.listings, args.seed), indent=2, ensure_ascii=False),
+                encoding="utf-8",
+            )
+            datasets = [path]
+        for source in datasets:
+            path = source if source.parent == Path(tmp) else Path(tmp) / source.name
+            if path != source:
+                path.write_bytes(source.read_bytes())
+            print(f"{source.name}: {path.stat().st_size / 2**20:.1f} MiB")
+            for loader in LOADERS:
+                runs = [run_child(loader, path) for _ in range(max(1, args.repeat))]
+                best = min(runs, key=lambda run: run["seconds"])
+                print(
+                    f"{loader:>18}: {best['seconds']:6.2f}s  peak RSS {best['peak_kib'] / 1024:7.1f} MiB "
+                    f"(+{best['growth_kib'] / 1024:.1f} MiB while loading)  ids={best['ids']} oems={best['oems']}"
+                )
+                for stale in path.parent.glob(f"{path.stem}.wal.jsonl*"):
+                    stale.unlink()
+
+
+if __name__ == "__main__":
+    main()
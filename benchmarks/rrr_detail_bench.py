@@ -0,0 +1,155 @@
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from oem_tokenizer import OEM_TOKENIZER  # noqa: E402
+from parts_catalog_scraper import parse_detail_html  # noqa: E402
+from rate_limiter import host_key  # noqa: E402
+from transport import load_archive  # noqa: E402
+
+RRR_HOSTS = {"rrr.lt"}
+
+SAMPLE_PARTS = [
+    ("Volkswagen Golf", "03L 130 277 B", ["03L130277", "0445110369"]),
+    ("BMW 320", "13 53 7 589 048", ["0445110289"]),
+    ("Mercedes-Benz Sprinter", "A 651 090 14 80", ["6510901480"]),
+    ("Renault Megane", "8200 123 456", []),
+    ("Opel Astra", "55 566 052", ["55566052"]),
+]
+
+
+# Extraction as parse_detail_html did it before DetailRegions.
+
+
+def legacy_detail(html: str) -> Dict[str, object]:
+    soup = BeautifulSoup(html, "lxml")
+    title = soup.find("h1")
+    title_text = title.get_text(" ", strip=True) if title else ""
+    price_tag = soup.select_one(".price, [itemprop='price']")
+    price = price_tag.get_text(" ", strip=True) if price_tag else None
+    candidates = OEM_TOKENIZER.tokenize(soup.get_text(" ", strip=True))
+    model = ""
+    year = None
+    for dt in soup.select("dt"):
+        label = dt.get_text(strip=True).lower()
+        dd = dt.find_next_sibling("dd")
+        value = dd.get_text(strip=True) if dd else ""
+        if "model" in label or "automobil" in label:
+            model = value
+        if "year" in label or "metai" in label:
+            years = re.findall(r"\d{4}", value)
+            year = int(years[0]) if years else None
+    image_url = ""
+    for img in soup.select("img"):
+        candidate = img.get("data-src") or img.get("src") or ""
+        if candidate.startswith("http"):
+            image_url = candidate
+            break
+    return {
+        "title": title_text,
+        "price": price,
+        "oem_main": candidates[0] if candidates else "",
+        "oem_cross_refs": sorted(set(candidates[1:])),
+        "model": model,
+        "year": year,
+        "image_url": image_url,
+    }
+
+
+def synthetic_page(rng: random.Random, index: int) -> str:
+    model, oem, cross = rng.choice(SAMPLE_PARTS)
+    year = rng.randint(2004, 2020)
+    menu = "".join(f'<li><a href="/c/{n}"><img src="https://rrr.lt/icons/{n}.svg">Kategorija {n}</a></li>' for n in range(40))
+    related = "".join(
+        f'<div class="card"><img src="https://rrr.lt/thumb/{n}.jpg"><span>ID {rng.randint(10**7, 10**8)}</span></div>'
+        for n in range(12)
+    )
+    return f"""<html><body>
+<header><a href="/"><img src="https://rrr.lt/logo.png"></a><span>Tel. +370 5 219 9999</span></header>
+<nav><ul>{menu}</ul></nav>
+<div class="product-page">
+  <h1>Turbina {model} {year}</h1>
+  <div class="gallery"><img data-src="https://rrr.lt/parts/{index}/1.jpg"><img data-src="https://rrr.lt/parts/{index}/2.jpg"></div>
+  <div class="price">{rng.randint(20, 900)} €</div>
+  <dl>
+    <dt>Automobilis</dt><dd>{model}</dd>
+    <dt>Metai</dt><dd>{year}</dd>
+    <dt>OEM kodas</dt><dd>{oem}</dd>
+    <dt>Sandėlio ID</dt><dd>RRR{rng.randint(10**6, 10**7)}</dd>
+  </dl>
+  <div class="oem-numbers">{' '.join(cross)}</div>
+</div>
+<aside>{related}</aside>
+<footer>Įmonės kodas 302516231 PVM LT100005166410 <img src="https://rrr.lt/pay/visa.png"></footer>
+</body></html>"""
+
+
+def load_pages(archive: List[Path], pages: List[Path], synthetic: int, seed: int) -> List[Tuple[str, str]]:
+    found: List[Tuple[str, str]] = []
+    for path in archive:
+        for url, record in load_archive(path).items():
+            if record.get("status") == 200 and host_key(url) in RRR_HOSTS and "/search" not in url:
+                found.append((url, str(record.get("body", ""))))
+    for path in pages:
+        found.append((path.as_uri(), path.read_text(encoding="utf-8")))
+    if not found:
+        rng = random.Random(seed)
+        found = [(f"https://rrr.lt/synthetic/{n}", synthetic_page(rng, n)) for n in range(synthetic)]
+    return found
+
+
+def timed(label: str, run: Callable[[], List[Dict[str, object]]], repeat: int, count: int) -> List[Dict[str, object]]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        records = run()
+    elapsed = (time.perf_counter() - started) / repeat
+    if not records or "oem_main" not in records[0]:
+        print(f"{label:>22}: {elapsed / count * 1000:7.2f} ms/page")
+        return records
+    candidates = sum(bool(r["oem_main"]) + len(r["oem_cross_refs"]) for r in records)
+    print(f"{label:>22}: {elapsed / count * 1000:7.2f} ms/page  OEM candidates={candidates} ({candidates / count:.1f}/page)")
+    return records
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare region-aware rrr.lt detail extraction with the full-page scan.")
+    parser.add_argument("--archive", action="append", type=Path, default=[], help="Recorded transport archive")
+    parser.add_argument("--pages", action="append", type=Path, default=[], help="Saved detail page HTML file")
+    parser.add_argument("--synthetic", type=int, default=200, help="Synthetic pages when no input is given")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--show", type=int, default=3, help="Print this many sample extractions")
+    args = parser.parse_args()
+
+    pages = load_pages([path.resolve() for path in args.archive], args.pages, args.synthetic, args.seed)
+    print(f"pages={len(pages)}")
+
+    # Both extractors build the same tree first; its cost is shown on its own.
+    timed("tree build only", lambda: [{} for _, html in pages if BeautifulSoup(html, "lxml")], args.repeat, len(pages))
+    legacy = timed("full page (legacy)", lambda: [legacy_detail(html) for _, html in pages], args.repeat, len(pages))
+    regions = timed(
+        "DetailRegions",
+        lambda: [parse_detail_html(html, url, {}).to_dict() for url, html in pages],
+        args.repeat,
+        len(pages),
+    )
+
+    for old, new in list(zip(legacy, regions))[: args.show]:
+        print(f"  legacy oem={old['oem_main']!r} cross={old['oem_cross_refs'][:6]} image={old['image_url']}")
+        print(f"  regions oem={new['oem_main']!r} cross={new['oem_cross_refs'][:6]} image={new['image_url']}")
+    for field in ("oem_main", "model", "year", "image_url"):
+        same = sum(old[field] == new[field] for old, new in zip(legacy, regions))
+        print(f"{field:>10} unchanged on {same}/{len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
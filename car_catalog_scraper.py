@@ -1,15 +1,20 @@
 import json
-import logging
-import os
 import random
 import re
 import signal
 import sys
-import time
-from typing import Dict, List, Optional
-
-import requests
-from bs4 import BeautifulSoup
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from catalog_store import BRAND_KEYS, CatalogStore, open_store
+from checkpoints import CHECKPOINTS
+from http_cache import RESPONSE_CACHE
+from http_fetch import fetch_text
+from http_session import SESSIONS
+from listings import CarListing
+from log_writer import LOG_WRITER, get_logger
+from parsed_document import PARSE_STATS, ParsedDocument, as_document
+from retry_policy import RetryPolicy
 
 BRANDS = [
     "Audi",
@@ -42,15 +47,12 @@ USER_AGENTS = [
 
 LOG_FILE = "car_scraper_log.txt"
 OUTPUT_FILE = "car_catalog.json"
+CATALOG = open_store(Path(OUTPUT_FILE), BRAND_KEYS)
 RETRIES = 5
 TIMEOUT = 20
-SLEEP_RANGE = (1.0, 2.0)
+FETCH_POLICY = RetryPolicy(max_attempts=RETRIES)
 
-logger = logging.getLogger("car_scraper")
-logger.setLevel(logging.INFO)
-file_handler = logging.FileHandler(LOG_FILE)
-file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(file_handler)
+logger = get_logger("car_scraper", Path(LOG_FILE))
 
 stop_requested = False
 
@@ -64,45 +66,37 @@ def slugify_brand(brand: str) -> str:
     return brand.lower().replace(" ", "-")
 
 
-def load_catalog() -> Dict[str, List[Dict[str, object]]]:
-    if os.path.exists(OUTPUT_FILE):
-        with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                logger.warning("Existing catalog file is corrupted; starting fresh.")
-                return {}
-    return {}
+def load_catalog() -> CatalogStore:
+    try:
+        return CATALOG.load()
+    except json.JSONDecodeError:
+        logger.warning("Existing catalog file is corrupted; starting fresh.")
+        return CATALOG
+
 
+def save_catalog(catalog: CatalogStore):
+    catalog.save()
 
-def save_catalog(catalog: Dict[str, List[Dict[str, object]]]):
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(catalog, f, ensure_ascii=False, indent=2)
 
+def get_known_ids(catalog: CatalogStore) -> Dict[str, set]:
+    return {brand: catalog.listing_ids(brand) for brand in BRANDS}
 
-def get_known_ids(catalog: Dict[str, List[Dict[str, object]]]) -> Dict[str, set]:
-    known: Dict[str, set] = {}
-    for brand, listings in catalog.items():
-        known[brand] = {entry.get("id") for entry in listings if entry.get("id")}
-    return known
+
+def random_headers() -> Dict[str, str]:
+    return {"User-Agent": random.choice(USER_AGENTS)}
 
 
 def fetch_url(url: str) -> Optional[str]:
-    for attempt in range(1, RETRIES + 1):
-        headers = {"User-Agent": random.choice(USER_AGENTS)}
-        logger.info("URL being fetched: %s (attempt %s)", url, attempt)
-        try:
-            response = requests.get(url, headers=headers, timeout=TIMEOUT)
-            logger.info("Status code: %s", response.status_code)
-            if response.status_code == 200:
-                time.sleep(random.uniform(*SLEEP_RANGE))
-                return response.text
-        except requests.RequestException as exc:
-            logger.warning("Request failed: %s", exc)
-        if attempt < RETRIES:
-            logger.info("Retrying")
-            time.sleep(random.uniform(*SLEEP_RANGE))
-    return None
+    logger.info("URL being fetched: %s", url)
+    return fetch_text(
+        url,
+        headers=random_headers,
+        timeout=TIMEOUT,
+        policy=FETCH_POLICY,
+        log=logger.info,
+        log_debug=logger.debug,
+        log_error=logger.warning,
+    )
 
 
 def parse_number(text: str) -> Optional[int]:
@@ -131,9 +125,9 @@ def extract_year_and_mileage(listing) -> (Optional[int], Optional[int]):
     return year, mileage
 
 
-def parse_listings(html: str, brand: str, known_ids: set) -> List[Dict[str, object]]:
-    soup = BeautifulSoup(html, "html.parser")
-    entries: List[Dict[str, object]] = []
+def parse_listings(source: Union[str, ParsedDocument], brand: str, known_ids: set) -> List[CarListing]:
+    soup = as_document(source, kind="otomoto.listings", features="html.parser").soup
+    entries: List[CarListing] = []
     listing_elements = soup.select("article[data-ad-id]") or soup.select("article[data-id]")
 
     for article in listing_elements:
@@ -161,27 +155,26 @@ def parse_listings(html: str, brand: str, known_ids: set) -> List[Dict[str, obje
             photo = img_el.get("data-src") or img_el.get("src")
 
         entries.append(
-            {
-                "brand": brand,
-                "model": model,
-                "year": year,
-                "price": price,
-                "mileage": mileage,
-                "photo": photo,
-                "url": url,
-                "id": listing_id,
-            }
+            CarListing(
+                brand=brand,
+                model=model,
+                year=year,
+                price=price,
+                mileage=mileage,
+                photo=photo,
+                url=url,
+                id=listing_id,
+            )
         )
 
     logger.info("Parsed listing count: %s", len(entries))
     return entries
 
 
-def process_brand(brand: str, catalog: Dict[str, List[Dict[str, object]]], known_ids: Dict[str, set]):
+def process_brand(brand: str, catalog: CatalogStore, known_ids: Dict[str, set]):
     logger.info("Start brand: %s", brand)
     page = 1
     brand_slug = slugify_brand(brand)
-    brand_entries = catalog.setdefault(brand, [])
     while not stop_requested:
         url = f"https://www.otomoto.pl/osobowe/{brand_slug}/?page={page}"
         logger.info("Page %s request", page)
@@ -189,17 +182,21 @@ def process_brand(brand: str, catalog: Dict[str, List[Dict[str, object]]], known
         if html is None:
             logger.warning("Failed to fetch page %s for brand %s", page, brand)
             break
-        listings = parse_listings(html, brand, known_ids.get(brand, set()))
+        doc = ParsedDocument.parse(html, url, kind="otomoto.listings", features="html.parser")
+        logger.info("Parsed page %s in %.1fms", page, doc.parse_seconds * 1000)
+        listings = parse_listings(doc, brand, known_ids.get(brand, set()))
         if not listings:
             logger.info("No listings found on page %s for brand %s; stopping pagination.", page, brand)
             break
+        added: List[CarListing] = []
         for entry in listings:
-            if entry["id"] and entry["id"] in known_ids.get(brand, set()):
+            if entry.id and entry.id in known_ids.get(brand, set()):
                 continue
-            brand_entries.append(entry)
-            if entry["id"]:
-                known_ids.setdefault(brand, set()).add(entry["id"])
-        save_catalog(catalog)
+            added.append(entry)
+            if entry.id:
+                known_ids.setdefault(brand, set()).add(entry.id)
+        catalog.extend([brand], added)
+        catalog.checkpoint()
         page += 1
     logger.info("Finished brand: %s", brand)
 
@@ -220,6 +217,12 @@ def main():
         logger.exception("Unexpected error occurred: %s", exc)
     finally:
         save_catalog(catalog)
+        logger.info("HTTP cache %s", RESPONSE_CACHE.report())
+        logger.info("HTTP connections %s", SESSIONS.report())
+        logger.info("HTML parsing %s", PARSE_STATS.report())
+        logger.info("Catalog store %s", catalog.report())
+        logger.info("Checkpoints %s", CHECKPOINTS.report())
+        logger.info("Log writer %s", LOG_WRITER.report())
         logger.info("Catalog saved. Exiting safely.")
 
 
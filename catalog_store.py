@@ -0,0 +1,668 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from checkpoints import CHECKPOINTS
+from json_stream import CHUNK_SIZE, LayoutMerger, LayoutReader, Ref
+from listings import CarListing, EbayPartListing, Record, RrrPart, as_entry, as_records, encode_record
+from record_log import RecordLog, read_dataset
+
+# "json" keeps each dataset in memory behind its record log; "sqlite" keeps every
+# dataset in one indexed database and never loads a dataset as a whole.
+STORAGE_BACKEND = os.environ.get("SCRAPER_STORAGE", "json")
+SQLITE_PATH = Path(os.environ.get("SCRAPER_SQLITE_PATH", "catalogs.sqlite"))
+# With the JSON backend, load only the indexes the resume checks need and leave
+# the entries on disk; "0" loads whole datasets into memory instead.
+RESUME_INDEX = os.environ.get("SCRAPER_RESUME_INDEX", "1") not in {"0", "false", "no", "off"}
+
+# Key path of each dataset layout, outermost first.
+CATALOG_KEYS: Tuple[str, ...] = ("brand", "model", "part")  # catalog.json
+BRAND_KEYS: Tuple[str, ...] = ("brand",)  # car_catalog.json, autoplius.json
+PART_KEYS: Tuple[str, ...] = ("part",)  # parts_catalog.json
+
+# Key layout of the known dataset files, for the export/import command.
+LAYOUTS: Dict[str, Tuple[str, ...]] = {
+    "catalog": CATALOG_KEYS,
+    "car_catalog": BRAND_KEYS,
+    "autoplius": BRAND_KEYS,
+    "parts_catalog": PART_KEYS,
+}
+
+# Record type of each known dataset's entries; entries are held as these in memory.
+RECORD_TYPES: Dict[str, type] = {
+    "catalog": EbayPartListing,
+    "car_catalog": CarListing,
+    "autoplius": CarListing,
+    "parts_catalog": RrrPart,
+}
+
+# A dataset entry: a dict as read from disk, or a ``listings`` record as built by a scraper.
+Entry = Union[Dict[str, Any], Record]
+
+
+def entry_oems(entry: Entry) -> Set[str]:
+    collected: Set[str] = set()
+    main = entry.get("oem_main")
+    if main:
+        collected.add(str(main).upper())
+    for cross in entry.get("oem_cross_refs", []) or []:
+        collected.add(str(cross).upper())
+    return collected
+
+
+def copy_tree(node: Any) -> Any:
+    """A copy of a dataset's dicts and lists that later appends do not touch; entries are shared."""
+    if isinstance(node, dict):
+        return {key: copy_tree(child) for key, child in node.items()}
+    if isinstance(node, list):
+        return list(node)
+    return node
+
+
+def plain_tree(node: Any) -> Any:
+    """A copy of a dataset with its records turned back into dicts."""
+    if isinstance(node, dict):
+        return {key: plain_tree(child) for key, child in node.items()}
+    if isinstance(node, list):
+        return [as_entry(entry) for entry in node]
+    return node
+
+
+def entry_id(entry: Entry) -> str:
+    """Listing id of an entry: the site id, else its listing URL."""
+    return str(entry.get("id") or entry.get("ebay_url") or entry.get("url") or "")
+
+
+def select_lists(data: Dict[str, Any], depth: int, prefix: Sequence[str]) -> List[List[Entry]]:
+    """The entry lists at or below ``prefix`` of a dataset whose lists are ``depth`` keys down."""
+    node: Any = data
+    for key in prefix:
+        node = node.get(key) if isinstance(node, dict) else None
+        if node is None:
+            return []
+    nodes = [node]
+    for _ in range(depth - len(prefix)):
+        nodes = [child for parent in nodes if isinstance(parent, dict) for child in parent.values()]
+    return [entries for entries in nodes if isinstance(entries, list)]
+
+
+class JsonStore:
+    """A dataset file held in memory and persisted through its ``RecordLog``.
+
+    Key paths address the layout given by ``keys``; ``("Audi", "A4", "egr")``
+    in ``catalog.json``, ``("Audi",)`` in ``autoplius.json``. A shorter path
+    selects everything below it. ``checkpoint`` hands the records written since
+    the last call to ``CHECKPOINTS``, whose background thread calls ``flush``.
+    Entries of the known datasets are held as ``listings`` records and only
+    written out as dicts.
+    """
+
+    backend = "json"
+
+    def __init__(self, path: Path, keys: Tuple[str, ...]) -> None:
+        self.path = Path(path)
+        self.keys = keys
+        self.log = RecordLog(self.path)
+        self.record_type = RECORD_TYPES.get(self.path.stem)
+        self.data: Dict[str, Any] = {}
+        # Held while the data and its log change together, so a checkpoint copies a consistent pair.
+        self.lock = threading.Lock()
+        self.unchecked = 0
+
+    def load(self) -> "JsonStore":
+        data = self.log.load()
+        if self.record_type is not None:
+            for entries in select_lists(data, len(self.keys), ()):
+                entries[:] = as_records(self.record_type, entries)
+        self.data = data
+        return self
+
+    def _pack(self, entries: Iterable[Any]) -> List[Any]:
+        return as_records(self.record_type, entries) if self.record_type is not None else list(entries)
+
+    def _lists(self, prefix: Sequence[str]) -> Iterable[List[Entry]]:
+        return select_lists(self.data, len(self.keys), prefix)
+
+    def entries(self, *prefix: str) -> List[Entry]:
+        return [entry for entries in self._lists(prefix) for entry in entries if isinstance(entry, (dict, Record))]
+
+    def has(self, *prefix: str) -> bool:
+        return any(entries for entries in self._lists(prefix))
+
+    def count(self, *prefix: str) -> int:
+        return sum(len(entries) for entries in self._lists(prefix))
+
+    def oems(self, *prefix: str) -> Set[str]:
+        collected: Set[str] = set()
+        for entry in self.entries(*prefix):
+            collected |= entry_oems(entry)
+        return collected
+
+    def listing_ids(self, *prefix: str) -> Set[str]:
+        return {entry_id(entry) for entry in self.entries(*prefix)} - {""}
+
+    def set(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        """Replace the entries at a full key path."""
+        entries = self._pack(entries)
+        with self.lock:
+            parent = self.data
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[keys[-1]] = entries
+            self.log.set(keys, entries)
+            self.unchecked += max(1, len(entries))
+
+    def extend(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        if not entries:
+            return
+        entries = self._pack(entries)
+        with self.lock:
+            parent = self.data
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, {})
+            parent.setdefault(keys[-1], []).extend(entries)
+            self.log.extend(keys, entries)
+            self.unchecked += len(entries)
+
+    def checkpoint(self) -> bool:
+        """Queue the records written since the last call; returns whether a checkpoint is due."""
+        with self.lock:
+            records, self.unchecked = self.unchecked, 0
+        return CHECKPOINTS.request(self, records)
+
+    def flush(self, compact: bool = False) -> None:
+        """fsync the record log; compact it when it has outgrown its threshold (or ``compact``)."""
+        if not (compact or self.log.should_compact()):
+            self.log.sync()
+            return
+        with self.lock:
+            data, mark = copy_tree(self.data), self.log.mark()
+        self.log.compact(data, mark)
+
+    def save(self) -> None:
+        """Compact now, after any checkpoint already running."""
+        CHECKPOINTS.flush(self, compact=True)
+
+    def export(self) -> Dict[str, Any]:
+        with self.lock:
+            return plain_tree(self.data)
+
+    def close(self) -> None:
+        self.log.close()
+
+    def report(self) -> str:
+        return self.log.report()
+
+
+class LeafIndex:
+    """What the resume checks need to know about one key path's entry list."""
+
+    __slots__ = ("count", "ids", "oems")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.ids: Set[str] = set()
+        self.oems: Set[str] = set()
+
+    def add(self, entry: Any) -> None:
+        self.count += 1
+        if isinstance(entry, (dict, Record)):
+            listing_id = entry_id(entry)
+            if listing_id:
+                self.ids.add(listing_id)
+            main = entry.get("oem_main")
+            if main:
+                self.oems.add(str(main).upper())
+            for cross in entry.get("oem_cross_refs") or ():
+                self.oems.add(str(cross).upper())
+
+
+def drop_refs(node: Any, covered: int) -> Any:
+    """The log references of an overlay that a compaction up to ``covered`` left in the log."""
+    if isinstance(node, dict):
+        kept = {}
+        for key, child in node.items():
+            child = drop_refs(child, covered)
+            if child:
+                kept[key] = child
+        return kept
+    return [ref for ref in node if ref[1] >= covered]
+
+
+class IndexedJsonStore:
+    """A dataset file of which only the resume indexes are held in memory.
+
+    ``load`` streams the file (``LayoutReader``) and replays the record log,
+    keeping per key path the entry count, listing ids and OEM numbers; the
+    entries themselves stay on disk. Logged records are remembered by their
+    offset in the log, and a compaction streams the old file and those records
+    into the new file (``LayoutMerger``). ``entries`` and ``export`` read the
+    dataset back from disk. Otherwise it behaves like ``JsonStore``.
+    """
+
+    backend = "json"
+
+    def __init__(self, path: Path, keys: Tuple[str, ...]) -> None:
+        self.path = Path(path)
+        self.keys = keys
+        self.log = RecordLog(self.path)
+        self.lock = threading.Lock()
+        self.unchecked = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.leaves: Dict[Tuple[str, ...], LeafIndex] = {}
+        # Entry counts of every key path prefix, () included.
+        self.counts: Dict[Tuple[str, ...], int] = {}
+        # Key layout of the logged records with (op, offset, length) refs at the leaves.
+        self.overlay: Dict[str, Any] = {}
+        self.load_seconds = 0.0
+
+    def load(self) -> "IndexedJsonStore":
+        started = time.perf_counter()
+        with self.lock:
+            self.reset()
+            base, size = "", 0
+            if self.path.exists():
+                with self.path.open("rb") as fh:
+                    reader = LayoutReader(fh)
+                    if reader.peek():
+                        leaf_path: Tuple[str, ...] = ()
+                        leaf = LeafIndex()
+                        for key_path, entry in reader.leaves(len(self.keys)):
+                            if key_path is not leaf_path:
+                                leaf_path, leaf = key_path, self.leaves.setdefault(key_path, LeafIndex())
+                            leaf.add(entry)
+                        for key_path, leaf in self.leaves.items():
+                            self._count(key_path, leaf.count)
+                    base, size = reader.finish(), reader.size
+            for offset, length, record in self.log.replay(base, size):
+                self._apply(record["op"], tuple(record["keys"]), record["value"], (offset, length))
+        self.load_seconds = time.perf_counter() - started
+        return self
+
+    def _count(self, keys: Tuple[str, ...], delta: int) -> None:
+        counts = self.counts
+        for end in range(len(keys) + 1):
+            counts[keys[:end]] = counts.get(keys[:end], 0) + delta
+
+    def _apply(self, op: str, keys: Tuple[str, ...], entries: List[Entry], ref: Tuple[int, int]) -> None:
+        leaf = self.leaves.get(keys)
+        if op == "set" and leaf is not None:
+            self._count(keys, -leaf.count)
+            leaf = None
+        if leaf is None:
+            leaf = self.leaves[keys] = LeafIndex()
+        for entry in entries:
+            leaf.add(entry)
+        self._count(keys, len(entries))
+        node = self.overlay
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        refs = node.setdefault(keys[-1], [])
+        if op == "set":
+            refs.clear()
+        refs.append((op, *ref))
+
+    def _matching(self, prefix: Tuple[str, ...]) -> List[LeafIndex]:
+        if len(prefix) == len(self.keys):
+            leaf = self.leaves.get(prefix)
+            return [leaf] if leaf is not None else []
+        return [leaf for key_path, leaf in self.leaves.items() if key_path[: len(prefix)] == prefix]
+
+    def entries(self, *prefix: str) -> List[Entry]:
+        lists = select_lists(self.export(), len(self.keys), prefix)
+        return [entry for entries in lists for entry in entries if isinstance(entry, dict)]
+
+    def has(self, *prefix: str) -> bool:
+        return self.counts.get(prefix, 0) > 0
+
+    def count(self, *prefix: str) -> int:
+        return self.counts.get(prefix, 0)
+
+    def oems(self, *prefix: str) -> Set[str]:
+        collected: Set[str] = set()
+        for leaf in self._matching(prefix):
+            collected |= leaf.oems
+        return collected
+
+    def listing_ids(self, *prefix: str) -> Set[str]:
+        collected: Set[str] = set()
+        for leaf in self._matching(prefix):
+            collected |= leaf.ids
+        return collected
+
+    def set(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        """Replace the entries at a full key path."""
+        keys = tuple(keys)
+        with self.lock:
+            self._apply("set", keys, entries, self.log.set(keys, entries))
+            self.unchecked += max(1, len(entries))
+
+    def extend(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        if not entries:
+            return
+        keys = tuple(keys)
+        with self.lock:
+            self._apply("extend", keys, entries, self.log.extend(keys, entries))
+            self.unchecked += len(entries)
+
+    def checkpoint(self) -> bool:
+        """Queue the records written since the last call; returns whether a checkpoint is due."""
+        with self.lock:
+            records, self.unchecked = self.unchecked, 0
+        return CHECKPOINTS.request(self, records)
+
+    def _write_merged(self, overlay: Dict[str, Any], fh: BinaryIO) -> None:
+        chunks: List[str] = []
+        buffered = 0
+
+        def write(text: str) -> None:
+            nonlocal buffered
+            chunks.append(text)
+            buffered += len(text)
+            if buffered >= CHUNK_SIZE:
+                fh.write("".join(chunks).encode("utf-8"))
+                chunks.clear()
+                buffered = 0
+
+        with self.log.log_path.open("rb") as log_fh:
+
+            def load_ref(ref: Ref) -> List[Entry]:
+                log_fh.seek(ref[1] - self.log.origin)
+                return json.loads(log_fh.read(ref[2]))["value"]
+
+            merger = LayoutMerger(len(self.keys), overlay, load_ref, write)
+            if self.path.exists():
+                with self.path.open("rb") as snapshot:
+                    reader = LayoutReader(snapshot)
+                    merger.merge(reader)
+                    reader.finish()
+            else:
+                merger.merge(None)
+        fh.write("".join(chunks).encode("utf-8"))
+
+    def flush(self, compact: bool = False) -> None:
+        """fsync the record log; compact it when it has outgrown its threshold (or ``compact``)."""
+        if not (compact or self.log.should_compact()):
+            self.log.sync()
+            return
+        with self.lock:
+            overlay, mark = copy_tree(self.overlay), self.log.mark()
+        covered = self.log.rewrite(partial(self._write_merged, overlay), mark)
+        with self.lock:
+            self.overlay = drop_refs(self.overlay, covered)
+
+    def save(self) -> None:
+        """Compact now, after any checkpoint already running."""
+        CHECKPOINTS.flush(self, compact=True)
+
+    def export(self) -> Dict[str, Any]:
+        """The whole dataset, read from its file and log."""
+        with CHECKPOINTS.holding(self):
+            return read_dataset(self.path)
+
+    def close(self) -> None:
+        self.log.close()
+
+    def report(self) -> str:
+        ids = sum(len(leaf.ids) for leaf in self.leaves.values())
+        oems = sum(len(leaf.oems) for leaf in self.leaves.values())
+        return (
+            f"{self.log.report()} index: paths={len(self.leaves)} entries={self.counts.get((), 0)} "
+            f"ids={ids} oems={oems} loaded in {self.load_seconds:.2f}s"
+        )
+
+
+class SqliteStore:
+    """A dataset stored as rows of one shared SQLite database (WAL mode).
+
+    Each entry is one row with its key columns, listing id and ``oem_main``
+    indexed, its cross references alongside and the full entry as JSON. Every
+    ``set``/``extend`` call is one transaction with a single batched insert.
+    Resume checks are indexed queries, so opening a store costs the same for
+    ten listings or ten million. ``export`` rebuilds the JSON layout.
+    """
+
+    backend = "sqlite"
+    _connections: Dict[Path, sqlite3.Connection] = {}
+    _connections_lock = threading.Lock()
+
+    def __init__(self, path: Path, keys: Tuple[str, ...], db_path: Path = SQLITE_PATH) -> None:
+        self.path = Path(path)
+        self.dataset = self.path.stem
+        self.keys = keys
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self.counts: Dict[str, float] = {"transactions": 0, "rows": 0, "seconds": 0.0}
+        self.unchecked = 0
+
+    @classmethod
+    def connect(cls, db_path: Path) -> sqlite3.Connection:
+        with cls._connections_lock:
+            conn = cls._connections.get(db_path.resolve())
+            if conn is None:
+                conn = sqlite3.connect(str(db_path), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS records (
+                        seq INTEGER PRIMARY KEY,
+                        dataset TEXT NOT NULL,
+                        brand TEXT,
+                        model TEXT,
+                        part TEXT,
+                        listing_id TEXT,
+                        oem_main TEXT,
+                        oem_cross TEXT,
+                        body TEXT NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS records_keys ON records (dataset, brand, model, part);
+                    CREATE INDEX IF NOT EXISTS records_listing_id ON records (dataset, listing_id);
+                    CREATE INDEX IF NOT EXISTS records_oem_main ON records (oem_main);
+                    """
+                )
+                cls._connections[db_path.resolve()] = conn
+            return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.connect(self.db_path)
+
+    def load(self) -> "SqliteStore":
+        self.connect(self.db_path)
+        return self
+
+    def _where(self, prefix: Sequence[str]) -> Tuple[str, List[str]]:
+        clauses = ["dataset = ?"] + [f"{column} = ?" for column in self.keys[: len(prefix)]]
+        return " AND ".join(clauses), [self.dataset, *prefix]
+
+    def _query(self, sql: str, params: Sequence[object]) -> List[tuple]:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def entries(self, *prefix: str) -> List[Entry]:
+        where, params = self._where(prefix)
+        rows = self._query(f"SELECT body FROM records WHERE {where} ORDER BY seq", params)
+        return [json.loads(body) for (body,) in rows]
+
+    def has(self, *prefix: str) -> bool:
+        where, params = self._where(prefix)
+        return bool(self._query(f"SELECT 1 FROM records WHERE {where} LIMIT 1", params))
+
+    def count(self, *prefix: str) -> int:
+        where, params = self._where(prefix)
+        return self._query(f"SELECT COUNT(*) FROM records WHERE {where}", params)[0][0]
+
+    def oems(self, *prefix: str) -> Set[str]:
+        where, params = self._where(prefix)
+        collected: Set[str] = set()
+        for main, cross in self._query(f"SELECT oem_main, oem_cross FROM records WHERE {where}", params):
+            collected |= entry_oems({"oem_main": main, "oem_cross_refs": json.loads(cross or "[]")})
+        return collected
+
+    def listing_ids(self, *prefix: str) -> Set[str]:
+        where, params = self._where(prefix)
+        rows = self._query(f"SELECT DISTINCT listing_id FROM records WHERE {where} AND listing_id != ''", params)
+        return {listing_id for (listing_id,) in rows}
+
+    def find_oem(self, oem: str) -> List[Entry]:
+        """Entries of this dataset whose main OEM is ``oem``."""
+        rows = self._query(
+            "SELECT body FROM records WHERE oem_main = ? AND dataset = ? ORDER BY seq", (oem.upper(), self.dataset)
+        )
+        return [json.loads(body) for (body,) in rows]
+
+    def _rows(self, keys: Sequence[str], entries: List[Entry]) -> List[tuple]:
+        columns = dict(zip(self.keys, keys))
+        return [
+            (
+                self.dataset,
+                columns.get("brand"),
+                columns.get("model"),
+                columns.get("part"),
+                entry_id(entry),
+                str(entry.get("oem_main") or "").upper() or None,
+                json.dumps(entry.get("oem_cross_refs") or [], ensure_ascii=False),
+                json.dumps(entry, ensure_ascii=False, default=encode_record),
+            )
+            for entry in entries
+        ]
+
+    def _write(self, keys: Sequence[str], entries: List[Entry], replace: bool) -> None:
+        rows = self._rows(keys, entries)
+        started = time.perf_counter()
+        with self.lock:
+            with self.conn:
+                if replace:
+                    where, params = self._where(keys)
+                    self.conn.execute(f"DELETE FROM records WHERE {where}", params)
+                self.conn.executemany(
+                    "INSERT INTO records (dataset, brand, model, part, listing_id, oem_main, oem_cross, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self.counts["transactions"] += 1
+            self.counts["rows"] += len(rows)
+            self.unchecked += max(1, len(rows))
+            self.counts["seconds"] += time.perf_counter() - started
+
+    def set(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        """Replace the entries at a full key path."""
+        self._write(keys, entries, replace=True)
+
+    def extend(self, keys: Sequence[str], entries: List[Entry]) -> None:
+        if entries:
+            self._write(keys, entries, replace=False)
+
+    def checkpoint(self) -> bool:
+        """Queue the rows written since the last call; returns whether a checkpoint is due."""
+        with self.lock:
+            records, self.unchecked = self.unchecked, 0
+        return CHECKPOINTS.request(self, records)
+
+    def flush(self, compact: bool = False) -> None:
+        """Copy SQLite's write-ahead log into the database file (and truncate it with ``compact``)."""
+        mode = "TRUNCATE" if compact else "PASSIVE"
+        with self.lock:
+            self.conn.execute(f"PRAGMA wal_checkpoint({mode})")
+
+    def save(self) -> None:
+        CHECKPOINTS.flush(self, compact=True)
+
+    def export(self) -> Dict[str, Any]:
+        """The dataset in its JSON layout, entries in insertion order."""
+        data: Dict[str, Any] = {}
+        columns = ", ".join(self.keys)
+        for row in self._query(f"SELECT {columns}, body FROM records WHERE dataset = ? ORDER BY seq", (self.dataset,)):
+            *keys, body = row
+            parent = data
+            for key in keys[:-1]:
+                parent = parent.setdefault(key, {})
+            parent.setdefault(keys[-1], []).append(json.loads(body))
+        return data
+
+    def close(self) -> None:
+        pass
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        return (
+            f"{self.db_path.name}[{self.dataset}]: transactions={int(counts['transactions'])} "
+            f"rows={int(counts['rows'])} ({counts['seconds']:.2f}s)"
+        )
+
+
+CatalogStore = Union[IndexedJsonStore, JsonStore, SqliteStore]
+
+
+def open_store(path: Path, keys: Tuple[str, ...], backend: Optional[str] = None) -> CatalogStore:
+    """The store for a dataset file under ``SCRAPER_STORAGE`` (or ``backend``)."""
+    backend = backend or STORAGE_BACKEND
+    if backend == "json":
+        return IndexedJsonStore(path, keys) if RESUME_INDEX else JsonStore(path, keys)
+    if backend == "sqlite":
+        return SqliteStore(path, keys)
+    raise ValueError(f"Unknown SCRAPER_STORAGE backend: {backend!r}")
+
+
+def export_dataset(path: Path, backend: Optional[str] = None) -> Dict[str, Any]:
+    """A dataset in its JSON layout from the configured backend, without writing anything."""
+    path = Path(path)
+    if (backend or STORAGE_BACKEND) == "sqlite":
+        return SqliteStore(path, LAYOUTS.get(path.stem, BRAND_KEYS)).export()
+    return read_dataset(path)
+
+
+def walk(node: Any, depth: int, prefix: Tuple[str, ...] = ()) -> Iterable[Tuple[Tuple[str, ...], List[Entry]]]:
+    """Every full key path of a JSON layout with its entry list."""
+    if not isinstance(node, dict):
+        return
+    for key, child in node.items():
+        if depth == 1:
+            if isinstance(child, list):
+                yield prefix + (key,), [entry for entry in child if isinstance(entry, dict)]
+        else:
+            yield from walk(child, depth - 1, prefix + (key,))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move datasets between their JSON files and the SQLite store.")
+    parser.add_argument("command", choices=["export", "import"], help="export: SQLite -> JSON, import: JSON -> SQLite")
+    parser.add_argument("dataset", nargs="+", type=Path, help="Dataset file, e.g. catalog.json")
+    parser.add_argument("--db", type=Path, default=SQLITE_PATH)
+    args = parser.parse_args()
+
+    for path in args.dataset:
+        keys = LAYOUTS.get(path.stem)
+        if keys is None:
+            parser.error(f"Unknown dataset layout for {path}; expected one of {sorted(LAYOUTS)}")
+        source = SqliteStore(path, keys, args.db)
+        target = JsonStore(path, keys)
+        if args.command == "export":
+            # The target's log is never loaded, so saving replaces the file and its log outright.
+            target.data = source.export()
+            target.save()
+            print(f"Exported {source.count()} entries to {path}")
+            continue
+        target.load()
+        with source.lock:
+            with source.conn:
+                source.conn.execute("DELETE FROM records WHERE dataset = ?", (source.dataset,))
+        total = 0
+        for keys_path, entries in walk(target.export(), len(keys)):
+            source.extend(keys_path, entries)
+            total += len(entries)
+        print(f"Imported {total} entries from {path} into {args.db}")
+
+
+if __name__ == "__main__":
+    main()
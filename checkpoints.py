@@ -0,0 +1,213 @@
+import atexit
+import collections
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set
+
+# A store is checkpointed once this many records were written since its last
+# checkpoint, or once its oldest unflushed record is this many seconds old.
+CHECKPOINT_RECORDS = int(os.environ.get("SCRAPER_CHECKPOINT_RECORDS", "200"))
+CHECKPOINT_SECONDS = float(os.environ.get("SCRAPER_CHECKPOINT_SECONDS", "30"))
+
+# Signals that otherwise end the process without unwinding; they are turned into
+# SystemExit so ``finally`` blocks and the exit flush still run.
+SHUTDOWN_SIGNALS = [getattr(signal, name) for name in ("SIGTERM", "SIGHUP") if hasattr(signal, name)]
+
+
+class CheckpointManager:
+    """Debounced checkpoints of every open store, written by one background thread.
+
+    Scrapers call ``store.checkpoint()`` after each unit of work, which hands the
+    records written since to ``request``. That only counts them: once a store has
+    ``records`` unflushed records, or the oldest is ``seconds`` old, the background
+    thread calls ``store.flush()`` (fsync the record log, compact it once it has
+    outgrown the dataset file). The crawl loop never waits on the disk for it.
+    ``flush`` checkpoints a store right away and waits; a store's ``save`` goes
+    through it so a final compaction never overlaps a background one. Pending
+    stores are flushed at exit and on SIGTERM/SIGHUP. Every checkpoint is timed.
+    """
+
+    def __init__(self, records: int = CHECKPOINT_RECORDS, seconds: float = CHECKPOINT_SECONDS) -> None:
+        self.records = max(1, records)
+        self.seconds = max(0.0, seconds)
+        self.cond = threading.Condition()
+        # id(store) -> [store, unflushed records, time of the first one]
+        self.pending: Dict[int, List[Any]] = {}
+        self.busy: Set[int] = set()
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = False
+        self.latencies: Deque[float] = collections.deque(maxlen=1024)
+        self.counts: Dict[str, float] = {
+            "requests": 0, "checkpoints": 0, "records": 0, "errors": 0, "seconds": 0.0, "waited_seconds": 0.0
+        }
+        self.last_error = ""
+
+    # Scheduling ----------------------------------------------------------------
+
+    def start(self) -> None:
+        with self.cond:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stopping = False
+            self.thread = threading.Thread(target=self.run, name="checkpoints", daemon=True)
+            self.thread.start()
+        self.install_signal_handlers()
+
+    def request(self, store: Any, records: int = 1) -> bool:
+        """Count ``records`` new records of ``store``; returns whether a checkpoint is now due."""
+        if self.thread is None:
+            self.start()
+        with self.cond:
+            self.counts["requests"] += 1
+            entry = self.pending.get(id(store))
+            if entry is None:
+                if records <= 0:
+                    return False
+                entry = self.pending[id(store)] = [store, 0, time.monotonic()]
+            entry[1] += records
+            due = self.is_due(entry, time.monotonic())
+            if due:
+                self.cond.notify_all()
+            return due
+
+    def is_due(self, entry: List[Any], now: float) -> bool:
+        return entry[1] >= self.records or now - entry[2] >= self.seconds
+
+    def next_due(self) -> Optional[List[Any]]:
+        """Pop the entry to checkpoint next, or return None; called with ``cond`` held."""
+        now = time.monotonic()
+        for key, entry in list(self.pending.items()):
+            if key not in self.busy and self.is_due(entry, now):
+                del self.pending[key]
+                self.busy.add(key)
+                return entry
+        return None
+
+    def run(self) -> None:
+        while True:
+            with self.cond:
+                entry = None if self.stopping else self.next_due()
+                while entry is None:
+                    if self.stopping:
+                        return
+                    waiting = [item[2] + self.seconds for key, item in self.pending.items() if key not in self.busy]
+                    timeout = max(0.0, min(waiting) - time.monotonic()) if waiting else None
+                    self.cond.wait(timeout)
+                    entry = self.next_due()
+            self.checkpoint(*entry)
+
+    # Writing -------------------------------------------------------------------
+
+    def checkpoint(self, store: Any, records: int, since: float, compact: bool = False) -> Optional[Exception]:
+        """Flush one store that was marked busy and release it; returns the error, if any."""
+        started = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            store.flush(compact)
+        except Exception as exc:
+            error = exc
+            self.last_error = f"{store.path}: {exc!r}"
+        elapsed = time.perf_counter() - started
+        with self.cond:
+            self.busy.discard(id(store))
+            if error is not None:
+                self.counts["errors"] += 1
+                # Keep the records counted so the next checkpoint retries them.
+                entry = self.pending.setdefault(id(store), [store, 0, since])
+                entry[1] += records
+            else:
+                self.counts["checkpoints"] += 1
+                self.counts["records"] += records
+            self.counts["seconds"] += elapsed
+            self.latencies.append(elapsed)
+            self.cond.notify_all()
+        return error
+
+    def flush(self, store: Any, compact: bool = False) -> None:
+        """Checkpoint ``store`` now on the calling thread, after any checkpoint already running.
+
+        Unlike background checkpoints, a failure is raised to the caller.
+        """
+        started = time.perf_counter()
+        with self.cond:
+            while id(store) in self.busy:
+                self.cond.wait()
+            entry = self.pending.pop(id(store), None) or [store, 0, time.monotonic()]
+            self.busy.add(id(store))
+            self.counts["waited_seconds"] += time.perf_counter() - started
+        error = self.checkpoint(entry[0], entry[1], entry[2], compact)
+        if error is not None:
+            raise error
+
+    @contextmanager
+    def holding(self, store: Any) -> Iterator[None]:
+        """Keep checkpoints of ``store`` from starting while its files are read."""
+        with self.cond:
+            while id(store) in self.busy:
+                self.cond.wait()
+            self.busy.add(id(store))
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.busy.discard(id(store))
+                self.cond.notify_all()
+
+    def shutdown(self) -> None:
+        """Checkpoint every store with unflushed records and stop the background thread."""
+        with self.cond:
+            self.stopping = True
+            thread = self.thread
+            self.cond.notify_all()
+        if thread is not None:
+            thread.join()
+        with self.cond:
+            stores = [entry[0] for entry in self.pending.values()]
+            self.thread = None
+        for store in stores:
+            try:
+                self.flush(store, compact=True)
+            except Exception:
+                pass
+
+    def install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in SHUTDOWN_SIGNALS:
+            # A handler the scraper installed itself (car_catalog_scraper's stop flag) is kept.
+            if signal.getsignal(signum) is signal.SIG_DFL:
+                signal.signal(signum, handle_shutdown_signal)
+
+    # Reporting -----------------------------------------------------------------
+
+    def report(self) -> str:
+        with self.cond:
+            counts = dict(self.counts)
+            latencies = sorted(self.latencies)
+            pending = sum(entry[1] for entry in self.pending.values())
+
+        def percentile(fraction: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        text = (
+            f"checkpoints={int(counts['checkpoints'])} records={int(counts['records'])} pending={pending} "
+            f"errors={int(counts['errors'])} latency p50={percentile(0.5):.1f}ms p95={percentile(0.95):.1f}ms "
+            f"max={(latencies[-1] * 1000 if latencies else 0.0):.1f}ms total={counts['seconds']:.2f}s "
+            f"waited={counts['waited_seconds']:.2f}s"
+        )
+        if self.last_error:
+            text += f" last_error={self.last_error}"
+        return text
+
+
+def handle_shutdown_signal(signum: int, frame: Any) -> None:
+    raise SystemExit(128 + signum)
+
+
+CHECKPOINTS = CheckpointManager()
+atexit.register(CHECKPOINTS.shutdown)
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from catalog_store import LAYOUTS, entry_id, export_dataset, walk
+
+# Columns written per dataset, after the key columns of its layout. Fields a
+# dataset does not have are left null; fields not listed here are not exported.
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "catalog": ("oem_main", "oem_cross_refs", "title", "price", "currency", "image_url", "ebay_url"),
+    "car_catalog": ("model", "year", "price", "mileage", "photo", "url", "id"),
+    "autoplius": ("model", "generation", "year", "mileage", "price", "vin", "photo", "photos", "url", "id"),
+    "parts_catalog": ("oem_main", "oem_cross_refs", "price", "currency", "model", "year", "image_url", "url", "title"),
+}
+
+# Column kinds; anything else is a plain string. "category" columns are
+# dictionary-encoded: each distinct brand or model is stored once per row group.
+CATEGORY_COLUMNS = frozenset({"brand", "model", "part", "currency", "generation"})
+FLOAT_COLUMNS = frozenset({"price"})
+INT_COLUMNS = frozenset({"year", "mileage"})
+LIST_COLUMNS = frozenset({"oem_cross_refs", "photos"})
+
+# Every row carries the listing id the incremental export deduplicates on.
+ID_COLUMN = "listing_id"
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise SystemExit("Columnar export requires pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def as_float(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(" ", ""))
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def as_int(value: Any) -> Optional[int]:
+    number = as_float(value)
+    return int(number) if number is not None else None
+
+
+def as_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def row_id(entry: Dict[str, Any]) -> str:
+    """The entry's listing id, or a digest of the entry for the rare one without any."""
+    listing_id = entry_id(entry)
+    if listing_id:
+        return listing_id
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def column_names(dataset: str) -> List[str]:
+    keys = LAYOUTS[dataset]
+    return list(keys) + [column for column in COLUMNS[dataset] if column not in keys] + [ID_COLUMN]
+
+
+def schema(dataset: str):
+    pa = require_pyarrow()
+    fields = []
+    for name in column_names(dataset):
+        if name in CATEGORY_COLUMNS:
+            kind = pa.dictionary(pa.int32(), pa.string())
+        elif name in FLOAT_COLUMNS:
+            kind = pa.float64()
+        elif name in INT_COLUMNS:
+            kind = pa.int64()
+        elif name in LIST_COLUMNS:
+            kind = pa.list_(pa.string())
+        else:
+            kind = pa.string()
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+def coerce(name: str, value: Any) -> Any:
+    if name in FLOAT_COLUMNS:
+        return as_float(value)
+    if name in INT_COLUMNS:
+        return as_int(value)
+    if name in LIST_COLUMNS:
+        return [str(item) for item in value] if isinstance(value, list) else None
+    return as_text(value)
+
+
+def rows(
+    data: Dict[str, Any], dataset: str, exported: Set[Tuple[str, ...]]
+) -> Iterator[Tuple[Tuple[str, ...], Dict[str, Any]]]:
+    """``(row key, entry)`` for every entry whose key path and listing id are not in ``exported``."""
+    keys = LAYOUTS[dataset]
+    for key_path, entries in walk(data, len(keys)):
+        for entry in entries:
+            row_key = key_path + (row_id(entry),)
+            if row_key not in exported:
+                exported.add(row_key)
+                yield row_key, entry
+
+
+def record_batches(data: Dict[str, Any], dataset: str, exported: Set[Tuple[str, ...]], batch_rows: int):
+    """New entries as record batches of at most ``batch_rows`` rows."""
+    pa = require_pyarrow()
+    target = schema(dataset)
+    keys = LAYOUTS[dataset]
+    names = column_names(dataset)
+    columns: Dict[str, List[Any]] = {name: [] for name in names}
+
+    def flush():
+        arrays = [pa.array(columns[field.name], type=field.type) for field in target]
+        for values in columns.values():
+            values.clear()
+        return pa.RecordBatch.from_arrays(arrays, schema=target)
+
+    for row_key, entry in rows(data, dataset, exported):
+        for index, key in enumerate(keys):
+            columns[key].append(row_key[index])
+        for name in names[len(keys):-1]:
+            columns[name].append(coerce(name, entry.get(name)))
+        columns[ID_COLUMN].append(row_key[-1])
+        if len(columns[ID_COLUMN]) >= batch_rows:
+            yield flush()
+    if columns[ID_COLUMN]:
+        yield flush()
+
+
+def exported_keys(directory: Path, dataset: str, fmt: str) -> Set[Tuple[str, ...]]:
+    """Key path and listing id of every row already exported; reads only those columns."""
+    if not directory.exists() or not any(directory.glob(f"*{FORMATS[fmt]}")):
+        return set()
+    require_pyarrow()
+    import pyarrow.dataset as ds
+
+    columns = list(LAYOUTS[dataset]) + [ID_COLUMN]
+    table = ds.dataset(str(directory), format="parquet" if fmt == "parquet" else "ipc").to_table(columns=columns)
+    return set(zip(*(table.column(name).to_pylist() for name in columns)))
+
+
+def write_part(directory: Path, batches: List[Any], fmt: str, batch_rows: int) -> Path:
+    """Write one part file atomically; hidden temp names are skipped by dataset readers."""
+    pa = require_pyarrow()
+    table = pa.Table.from_batches(batches)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"part-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{len(list(directory.glob('part-*')))}{FORMATS[fmt]}"
+    target = directory / name
+    temp_path = directory / f".{name}.tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, str(temp_path), row_group_size=batch_rows, compression="zstd")
+    else:
+        import pyarrow.feather as feather
+
+        # The IPC file format keeps one dictionary per column for the whole file.
+        feather.write_feather(table.unify_dictionaries(), str(temp_path), compression="zstd")
+    temp_path.replace(target)
+    return target
+
+
+def export_columnar(
+    path: Path, out_dir: Path, fmt: str = "parquet", full: bool = False, batch_rows: int = 65536
+) -> Dict[str, Any]:
+    """Append the entries of ``path`` not yet exported as a new part under ``out_dir/<dataset>.<fmt>``."""
+    started = time.perf_counter()
+    path = Path(path)
+    dataset = path.stem
+    directory = Path(out_dir) / f"{dataset}{FORMATS[fmt]}"
+    if full and directory.exists():
+        for old in directory.glob(f"part-*{FORMATS[fmt]}"):
+            old.unlink()
+    exported = exported_keys(directory, dataset, fmt)
+    previous = len(exported)
+    batches = list(record_batches(export_dataset(path), dataset, exported, batch_rows))
+    written = sum(batch.num_rows for batch in batches)
+    target = write_part(directory, batches, fmt, batch_rows) if written else None
+    return {
+        "dataset": dataset,
+        "rows": written,
+        "skipped": previous,
+        "file": target,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export datasets as typed columnar files for analytics.")
+    parser.add_argument("dataset", nargs="+", type=Path, help="Dataset file, e.g. catalog.json")
+    parser.add_argument("--out", type=Path, default=Path("exports"), help="One subdirectory per dataset goes here")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--full", action="store_true", help="Rewrite the export instead of appending new rows")
+    parser.add_argument("--batch-rows", type=int, default=65536, help="Rows per row group / record batch")
+    args = parser.parse_args()
+
+    for path in args.dataset:
+        if path.stem not in COLUMNS:
+            parser.error(f"Unknown dataset layout for {path}; expected one of {sorted(COLUMNS)}")
+    for path in args.dataset:
+        result = export_columnar(path, args.out, args.format, args.full, max(1, args.batch_rows))
+        target = result["file"] or "nothing new"
+        print(
+            f"{path}: {result['rows']} new rows ({result['skipped']} already exported) -> {target} "
+            f"in {result['seconds']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
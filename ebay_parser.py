@@ -0,0 +1,243 @@
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+# Parser backend used for eBay result pages: "lxml" (precompiled XPath on an lxml
+# tree), "selectolax" (lexbor CSS engine, optional dependency) or "bs4" (the
+# original BeautifulSoup select path). All three produce identical items, see
+# benchmarks/ebay_parser_parity.py.
+DEFAULT_BACKEND = os.environ.get("SCRAPER_EBAY_PARSER", "lxml")
+
+# Parse result pages while they download and stop once enough listings are found
+# (see iter_items_stream). Off by default.
+STREAM_RESULTS = os.environ.get("SCRAPER_EBAY_STREAM", "0") not in {"0", "false", "no", "off"}
+
+# Text under these elements is not page text; BeautifulSoup skips it as well.
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+class RawItem:
+    """Fields of one ``li.s-item`` as raw text nodes and attributes.
+
+    Text fields hold the element's descendant text nodes, or ``None`` when the
+    element is missing, so callers can rebuild exactly what ``get_text`` returned.
+    """
+
+    __slots__ = ("title", "subtitle", "price", "link", "link_href", "image", "image_src", "image_data_src")
+
+    def __init__(self) -> None:
+        self.title: Optional[List[str]] = None
+        self.subtitle: Optional[List[str]] = None
+        self.price: Optional[List[str]] = None
+        self.link = False
+        self.link_href: Optional[str] = None
+        self.image = False
+        self.image_src: Optional[str] = None
+        self.image_data_src: Optional[str] = None
+
+
+def join_text(strings: Optional[List[str]], separator: str = "", strip: bool = False) -> str:
+    """Equivalent of BeautifulSoup's ``get_text(separator, strip=strip)`` over text nodes."""
+    if not strings:
+        return ""
+    if strip:
+        return separator.join(text.strip() for text in strings if text.strip())
+    return separator.join(strings)
+
+
+# BeautifulSoup backend -------------------------------------------------------
+
+
+def parse_items_bs4(html: str) -> List[RawItem]:
+    soup = BeautifulSoup(html, "lxml")
+    items: List[RawItem] = []
+    for node in soup.select("li.s-item"):
+        # Items inside a <template> are not on the page; lexbor leaves them out of the tree too.
+        if node.find_parent("template") is not None:
+            continue
+        item = RawItem()
+        title = node.select_one(".s-item__title")
+        if title is not None:
+            item.title = list(title.strings)
+        subtitle = node.select_one(".s-item__subtitle")
+        if subtitle is not None:
+            item.subtitle = list(subtitle.strings)
+        price = node.select_one(".s-item__price")
+        if price is not None:
+            item.price = list(price.strings)
+        link = node.select_one("a.s-item__link")
+        if link is not None:
+            item.link = True
+            item.link_href = link.get("href")
+        image = node.select_one("img.s-item__image-img")
+        if image is not None:
+            item.image = True
+            item.image_src = image.get("src")
+            item.image_data_src = image.get("data-src")
+        items.append(item)
+    return items
+
+
+# lxml backend ----------------------------------------------------------------
+
+_XPATHS: Dict[str, object] = {}
+
+
+def _class_test(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _lxml_xpaths() -> Dict[str, object]:
+    if not _XPATHS:
+        from lxml import etree
+
+        excluded = " and ".join(f"not(ancestor::{tag})" for tag in sorted(NON_TEXT_TAGS))
+        _XPATHS.update(
+            {
+                "items": etree.XPath(f"//li[{_class_test('s-item')} and not(ancestor::template)]"),
+                "title": etree.XPath(f"(.//*[{_class_test('s-item__title')}])[1]"),
+                "subtitle": etree.XPath(f"(.//*[{_class_test('s-item__subtitle')}])[1]"),
+                "price": etree.XPath(f"(.//*[{_class_test('s-item__price')}])[1]"),
+                "link": etree.XPath(f"(.//a[{_class_test('s-item__link')}])[1]"),
+                "image": etree.XPath(f"(.//img[{_class_test('s-item__image-img')}])[1]"),
+                "text": etree.XPath(f".//text()[{excluded}]"),
+            }
+        )
+    return _XPATHS
+
+
+def _lxml_tree(html: str):
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Unicode input with an XML encoding declaration has to go in as bytes.
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def _lxml_item(node, xpaths: Dict[str, object]) -> RawItem:
+    text = xpaths["text"]
+    item = RawItem()
+    for field in ("title", "subtitle", "price"):
+        found = xpaths[field](node)
+        if found:
+            setattr(item, field, [str(value) for value in text(found[0])])
+    link = xpaths["link"](node)
+    if link:
+        item.link = True
+        item.link_href = link[0].get("href")
+    image = xpaths["image"](node)
+    if image:
+        item.image = True
+        item.image_src = image[0].get("src")
+        item.image_data_src = image[0].get("data-src")
+    return item
+
+
+def parse_items_lxml(html: str) -> List[RawItem]:
+    xpaths = _lxml_xpaths()
+    tree = _lxml_tree(html)
+    if tree is None:
+        return []
+    return [_lxml_item(node, xpaths) for node in xpaths["items"](tree)]
+
+
+# Streaming (lxml pull parser) --------------------------------------------------
+
+
+def iter_items_stream(chunks: Iterable[Union[str, bytes]], encoding: Optional[str] = None) -> Iterator[RawItem]:
+    """Yield ``li.s-item`` items while the page is still arriving.
+
+    ``chunks`` is the response body in pieces, e.g. ``iter_content``. Each item
+    is extracted as soon as its closing tag is parsed, so a caller that stops
+    iterating also stops parsing and stops reading ``chunks``. A fully consumed
+    stream yields the same items as ``parse_items_lxml``. ``encoding`` applies to
+    byte chunks; without it lxml falls back to the page's meta charset.
+    """
+    from lxml import etree
+
+    xpaths = _lxml_xpaths()
+    parser = etree.HTMLPullParser(events=("end",), tag="li", encoding=encoding)
+
+    def completed() -> Iterator[RawItem]:
+        for _, node in parser.read_events():
+            if "s-item" in (node.get("class") or "").split() and next(node.iterancestors("template"), None) is None:
+                yield _lxml_item(node, xpaths)
+
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            yield from completed()
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Empty or truncated documents: there is nothing left to extract.
+        return
+    yield from completed()
+
+
+# selectolax backend ----------------------------------------------------------
+
+
+def _selectolax_strings(node) -> List[str]:
+    strings: List[str] = []
+    for child in node.traverse(include_text=True):
+        if child.tag != "-text":
+            continue
+        parent = child.parent
+        skip = False
+        while parent is not None and parent is not node:
+            if parent.tag in NON_TEXT_TAGS:
+                skip = True
+                break
+            parent = parent.parent
+        if not skip:
+            strings.append(child.text_content or "")
+    return strings
+
+
+def parse_items_selectolax(html: str) -> List[RawItem]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    items: List[RawItem] = []
+    for node in tree.css("li.s-item"):
+        item = RawItem()
+        for field, selector in (("title", ".s-item__title"), ("subtitle", ".s-item__subtitle"), ("price", ".s-item__price")):
+            found = node.css_first(selector)
+            if found is not None:
+                setattr(item, field, _selectolax_strings(found))
+        link = node.css_first("a.s-item__link")
+        if link is not None:
+            item.link = True
+            item.link_href = link.attributes.get("href")
+        image = node.css_first("img.s-item__image-img")
+        if image is not None:
+            item.image = True
+            item.image_src = image.attributes.get("src")
+            item.image_data_src = image.attributes.get("data-src")
+        items.append(item)
+    return items
+
+
+BACKENDS: Dict[str, Callable[[str], List[RawItem]]] = {
+    "bs4": parse_items_bs4,
+    "lxml": parse_items_lxml,
+    "selectolax": parse_items_selectolax,
+}
+
+
+def parse_items(html: str, backend: Optional[str] = None) -> List[RawItem]:
+    name = backend or DEFAULT_BACKEND
+    try:
+        parser = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown eBay parser backend: {name!r}") from None
+    return parser(html)
@@ -0,0 +1,306 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+from rate_limiter import host_key
+
+# Seconds a cached page is served without contacting the host. Model lists on
+# Wikipedia barely change; search and pagination pages go stale much faster.
+HOST_TTLS: Dict[str, int] = {
+    "wikipedia": 7 * 24 * 3600,
+    "ebay.com": 12 * 3600,
+    "ebay.de": 12 * 3600,
+    "ebay.co.uk": 12 * 3600,
+    "autoplius.lt": 6 * 3600,
+    "otomoto.pl": 3600,
+    "rrr.lt": 24 * 3600,
+}
+DEFAULT_TTL = 6 * 3600
+
+CACHE_DIR = Path(os.environ.get("SCRAPER_CACHE_DIR", ".http_cache"))
+CACHE_MAX_BYTES = int(float(os.environ.get("SCRAPER_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+CACHE_ENABLED = os.environ.get("SCRAPER_CACHE", "1") not in {"0", "false", "no", "off"}
+# Seconds a cache write waits for another process (a --workers crawl) to release the file.
+CACHE_TIMEOUT = float(os.environ.get("SCRAPER_CACHE_TIMEOUT", "30"))
+# Access times of cache hits are written this many at a time, or with the next store.
+TOUCH_BATCH = 256
+# The running size total is summed from the file again every this many stores,
+# which also picks up what other processes stored and evicted.
+SIZE_RESYNC = 256
+
+
+class CachedResponse:
+    """Minimal stand-in for ``requests.Response`` built from a cached body."""
+
+    def __init__(self, url: str, text: str) -> None:
+        self.url = url
+        self.text = text
+        self.status_code = 200
+        self.headers: Dict[str, str] = {}
+        self.from_cache = True
+
+
+def canonical_url(url: str, params: Optional[Mapping[str, str]] = None) -> str:
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+def cache_key(url: str, params: Optional[Mapping[str, str]] = None) -> str:
+    return hashlib.sha256(canonical_url(url, params).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk page cache keyed by URL plus query params.
+
+    Entries live in a single SQLite file with zlib-compressed bodies. Fresh entries
+    (younger than the host TTL) are served without any request; stale entries that
+    carry an ETag or Last-Modified are revalidated with a conditional GET. The
+    least recently used entries are evicted once the total body size exceeds
+    ``max_bytes``; that total is kept running instead of summed on every store, and
+    the access times of hits are written in batches (``close`` writes the last one).
+    The file may be shared by worker processes; a SQLite error (such as the file
+    staying locked past ``CACHE_TIMEOUT``) is counted and the request goes on as a
+    cache miss.
+    """
+
+    def __init__(
+        self,
+        root: Path = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttls: Optional[Dict[str, int]] = None,
+        enabled: bool = CACHE_ENABLED,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = dict(HOST_TTLS if ttls is None else ttls)
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0, "errors": 0
+        }
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._touched: Dict[str, float] = {}
+        self._total: Optional[int] = None
+        self._stores = 0
+
+    # Storage -------------------------------------------------------------------
+
+    def conn(self) -> sqlite3.Connection:
+        # A connection must not cross a fork; a child process opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            self.root.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.root / "cache.sqlite"), timeout=CACHE_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, url TEXT, host TEXT, body BLOB, etag TEXT, "
+                "last_modified TEXT, stored_at REAL, accessed_at REAL, size INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn, self._pid = conn, os.getpid()
+            self._touched, self._total = {}, None
+        return self._conn
+
+    def lookup(self, key: str) -> Optional[Tuple[str, Optional[str], Optional[str], float]]:
+        row = self.conn().execute(
+            "SELECT body, etag, last_modified, stored_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, stored_at = row
+        return zlib.decompress(body).decode("utf-8"), etag, last_modified, stored_at
+
+    def touch(self, key: str, revalidated: bool = False) -> None:
+        now = time.time()
+        if not revalidated:
+            # A hit only moves the entry up the eviction order, so it is written with the next batch.
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH:
+                self.write_touches()
+                self.conn().commit()
+            return
+        conn = self.conn()
+        conn.execute("UPDATE entries SET accessed_at = ?, stored_at = ? WHERE key = ?", (now, now, key))
+        conn.commit()
+
+    def write_touches(self) -> None:
+        """Write the buffered access times of hits (the caller commits)."""
+        if self._touched:
+            touched, self._touched = self._touched, {}
+            self.conn().executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in touched.items()]
+            )
+
+    def flush(self) -> None:
+        """Write and commit the access times still buffered from hits."""
+        with self.lock:
+            if not self._touched or self._conn is None or self._pid != os.getpid():
+                return
+            try:
+                self.write_touches()
+                self._conn.commit()
+            except sqlite3.Error:
+                self.failed()
+
+    def close(self) -> None:
+        """``flush`` and close this process's connection; the next lookup opens a new one."""
+        self.flush()
+        with self.lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def store(self, key: str, url: str, text: str, headers: Mapping[str, str]) -> None:
+        body = zlib.compress(text.encode("utf-8"))
+        now = time.time()
+        conn = self.conn()
+        replaced = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, url, host_key(url), body, headers.get("ETag"), headers.get("Last-Modified"), now, now, len(body)),
+        )
+        self._touched.pop(key, None)
+        self.write_touches()
+        self.counts["stored"] += 1
+        self._stores += 1
+        if self._total is None or self._stores % SIZE_RESYNC == 0:
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        else:
+            self._total += len(body) - (replaced[0] if replaced else 0)
+        self.evict()
+        conn.commit()
+
+    def store_safely(self, key: str, url: str, text: str, headers: Mapping[str, str]) -> None:
+        """``store``, counting a SQLite error instead of raising it; the page is simply not cached."""
+        try:
+            self.store(key, url, text, headers)
+        except sqlite3.Error:
+            self.failed()
+
+    def failed(self) -> None:
+        """Count a SQLite error and roll back whatever it left half written."""
+        self.counts["errors"] += 1
+        self._total = None
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.rollback()
+
+    def evict(self) -> None:
+        conn = self.conn()
+        while self._total is not None and self._total > self.max_bytes:
+            oldest = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at LIMIT 64").fetchall()
+            if not oldest:
+                self._total = 0
+                return
+            for key, size in oldest:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.counts["evicted"] += 1
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    return
+
+    # Public API ----------------------------------------------------------------
+
+    def ttl(self, url: str) -> int:
+        return self.ttls.get(host_key(url), DEFAULT_TTL)
+
+    def get_fresh(self, url: str, params: Optional[Mapping[str, str]] = None) -> Optional[str]:
+        """Return the cached body if it is still within the host TTL, without any request."""
+        if not self.enabled:
+            return None
+        key = cache_key(url, params)
+        with self.lock:
+            try:
+                entry = self.lookup(key)
+            except sqlite3.Error:
+                self.counts["errors"] += 1
+                return None
+            if entry is None or time.time() - entry[3] > self.ttl(url):
+                return None
+            try:
+                self.touch(key)
+            except sqlite3.Error:
+                self.failed()
+            self.counts["hits"] += 1
+            return entry[0]
+
+    def fetch(
+        self,
+        getter: Callable[..., object],
+        url: str,
+        params: Optional[Mapping[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        store_body: bool = True,
+        **kwargs,
+    ):
+        """Issue ``getter(url, ...)`` with conditional headers and cache a 200 response.
+
+        A 304 answer to the revalidation is turned into a ``CachedResponse`` so the
+        caller sees the usual ``status_code == 200`` / ``text`` interface. Streaming
+        callers pass ``store_body=False`` and call ``save`` once the whole body is read.
+        """
+        if not self.enabled:
+            return getter(url, params=params, headers=headers, **kwargs)
+        key = cache_key(url, params)
+        with self.lock:
+            try:
+                entry = self.lookup(key)
+            except sqlite3.Error:
+                self.counts["errors"] += 1
+                entry = None
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry[1]:
+                request_headers["If-None-Match"] = entry[1]
+            if entry[2]:
+                request_headers["If-Modified-Since"] = entry[2]
+        response = getter(url, params=params, headers=request_headers, **kwargs)
+        status = getattr(response, "status_code", None)
+        with self.lock:
+            if status == 304 and entry is not None:
+                if hasattr(response, "close"):
+                    # Streamed requests keep the connection until the response is closed.
+                    response.close()
+                try:
+                    self.touch(key, revalidated=True)
+                except sqlite3.Error:
+                    self.failed()
+                self.counts["revalidated"] += 1
+                return CachedResponse(url, entry[0])
+            self.counts["misses"] += 1
+            if status == 200 and store_body:
+                self.store_safely(key, url, response.text, response.headers)
+        return response
+
+    def save(self, url: str, params: Optional[Mapping[str, str]], text: str, headers: Mapping[str, str]) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.store_safely(cache_key(url, params), url, text, headers)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts)
+
+    def report(self) -> str:
+        counts = self.stats()
+        lookups = counts["hits"] + counts["revalidated"] + counts["misses"]
+        served = counts["hits"] + counts["revalidated"]
+        ratio = served / lookups if lookups else 0.0
+        return (
+            f"hits={counts['hits']} revalidated={counts['revalidated']} misses={counts['misses']} "
+            f"stored={counts['stored']} evicted={counts['evicted']} errors={counts['errors']} "
+            f"served_locally={ratio:.1%}"
+        )
+
+
+RESPONSE_CACHE = ResponseCache()
+atexit.register(RESPONSE_CACHE.close)
@@ -0,0 +1,272 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, TypeVar
+
+import requests
+
+from http_cache import RESPONSE_CACHE, CachedResponse
+from http_session import get_session
+from proxy_pool import ProxyPool
+from rate_limiter import RATE_LIMITER, host_key
+from retry_policy import CIRCUIT_BREAKER, DEFAULT_POLICY, RetryPolicy, parse_retry_after
+from transport import TRANSPORT
+
+T = TypeVar("T")
+
+# Statuses that usually mean the egress IP is blocked rather than the page missing.
+PROXY_BLOCK_STATUSES = {403, 407, 429}
+
+# Streamed bodies are read in chunks of this size. When a consumer stops early
+# and at most DRAIN_LIMIT bytes are left (per Content-Length), the rest is still
+# read so the keep-alive connection can be reused; otherwise it is dropped.
+STREAM_CHUNK_SIZE = 16 * 1024
+DRAIN_LIMIT = 64 * 1024
+
+
+def _silent(message: str, *args: object) -> None:
+    pass
+
+
+class StreamedBody:
+    """Iterates a streamed response body and remembers what was read."""
+
+    def __init__(self, response, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+        self.response = response
+        self.chunk_size = chunk_size
+        self.parts: List[str] = []
+        self.bytes_read = 0
+        self.complete = False
+
+    def __iter__(self) -> Iterator[str]:
+        if not hasattr(self.response, "iter_content"):
+            # Cached or revalidated page: the whole body is already here.
+            self.parts.append(self.response.text)
+            self.complete = True
+            yield self.response.text
+            return
+        if not self.response.encoding:
+            # Without a declared charset requests would yield bytes; pages here are UTF-8.
+            self.response.encoding = "utf-8"
+        raw = self.response.raw
+        for chunk in self.response.iter_content(self.chunk_size, decode_unicode=True):
+            self.bytes_read = raw.tell() if hasattr(raw, "tell") else self.bytes_read + len(chunk)
+            self.parts.append(chunk)
+            yield chunk
+        self.complete = True
+
+    def remaining(self) -> Optional[int]:
+        length = getattr(self.response, "headers", {}).get("Content-Length")
+        if not length or not length.isdigit():
+            return None
+        return max(0, int(length) - self.bytes_read)
+
+    def drain(self) -> None:
+        for _ in self:
+            pass
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class StreamStats:
+    """Bytes read versus bytes skipped by consumers that stopped early."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {"streams": 0, "stopped_early": 0, "bytes_read": 0, "bytes_skipped": 0}
+
+    def add(self, body: StreamedBody, skipped: Optional[int]) -> None:
+        with self.lock:
+            self.counts["streams"] += 1
+            self.counts["bytes_read"] += body.bytes_read
+            if not body.complete:
+                self.counts["stopped_early"] += 1
+                self.counts["bytes_skipped"] += skipped or 0
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        return (
+            f"streams={counts['streams']} stopped_early={counts['stopped_early']} "
+            f"read={counts['bytes_read'] / 1024:.0f}KiB skipped>={counts['bytes_skipped'] / 1024:.0f}KiB"
+        )
+
+
+STREAM_STATS = StreamStats()
+
+
+def _fetch(
+    url: str,
+    session: Optional[requests.Session],
+    params: Optional[Mapping[str, str]],
+    headers: Optional[Callable[[], Dict[str, str]]],
+    proxies: Optional[Dict[str, str]],
+    proxy_pool: Optional[ProxyPool],
+    timeout: float,
+    policy: RetryPolicy,
+    log: Callable[..., None],
+    log_debug: Callable[..., None],
+    log_error: Callable[..., None],
+    read: Callable[[object], T],
+    stream: bool,
+) -> Optional[T]:
+    host = host_key(url)
+    send_url, send_params = TRANSPORT.route(url, params)
+
+    def send(_url: str, params: Optional[Mapping[str, str]] = None, **kwargs):
+        # The cache keys on the original URL; the transport may redirect the request.
+        return (session or get_session()).get(send_url, params=send_params, stream=stream, **kwargs)
+
+    for attempt in range(1, policy.max_attempts + 1):
+        proxy_url = proxy_pool.acquire() if proxy_pool else None
+        # Each egress proxy gets its own per-host budget and breaker, so throughput scales with the pool
+        # and a proxy being throttled does not pause the host for the others.
+        scope = proxy_url or ""
+        paused = CIRCUIT_BREAKER.wait(host, scope)
+        if paused:
+            log("Circuit open for host=%s, paused %.2fs URL=%s", host, paused, url)
+        waited = RATE_LIMITER.wait(url, scope=scope)
+        if waited:
+            log_debug("Rate limited %.2fs before request attempt %s URL=%s", waited, attempt, url)
+
+        retry_after: Optional[float] = None
+        proxy_ok = False
+        started = time.monotonic()
+        try:
+            log_debug("Requesting URL=%s, attempt=%s", url, attempt)
+            response = RESPONSE_CACHE.fetch(
+                send,
+                url,
+                params=params,
+                headers=headers() if headers else None,
+                store_body=not stream,
+                proxies={"http": proxy_url, "https": proxy_url} if proxy_url else proxies,
+                timeout=timeout,
+            )
+            proxy_ok = response.status_code not in PROXY_BLOCK_STATUSES
+            status = response.status_code
+            if status == 200:
+                value = read(response)
+                log_debug("Request success status=200 attempt=%s URL=%s", attempt, url)
+                CIRCUIT_BREAKER.record_success(host, scope)
+                return value
+            TRANSPORT.record(url, params, response)
+            if stream:
+                response.close()
+            if not policy.should_retry(status):
+                log_error("Permanent status %s for URL=%s, not retrying", status, url)
+                CIRCUIT_BREAKER.record_success(host, scope)
+                return None
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            log_error("Retryable status %s (attempt %s) for URL=%s", status, attempt, url)
+            CIRCUIT_BREAKER.record_failure(host, retry_after, scope)
+        except requests.RequestException as exc:
+            proxy_ok = False
+            log_error("Request failed (attempt %s) for URL=%s: %r", attempt, url, exc)
+            CIRCUIT_BREAKER.record_failure(host, scope=scope)
+        finally:
+            if proxy_url:
+                proxy_pool.release(proxy_url, proxy_ok, time.monotonic() - started)
+
+        if attempt < policy.max_attempts:
+            delay = policy.backoff(attempt, retry_after)
+            log_debug("Sleeping for %.2fs before request attempt %s URL=%s", delay, attempt + 1, url)
+            time.sleep(delay)
+
+    log_error("Giving up on URL=%s after %s attempts", url, policy.max_attempts)
+    return None
+
+
+def fetch_text(
+    url: str,
+    session: Optional[requests.Session] = None,
+    params: Optional[Mapping[str, str]] = None,
+    headers: Optional[Callable[[], Dict[str, str]]] = None,
+    proxies: Optional[Dict[str, str]] = None,
+    proxy_pool: Optional[ProxyPool] = None,
+    timeout: float = 20,
+    policy: RetryPolicy = DEFAULT_POLICY,
+    log: Callable[..., None] = _silent,
+    log_error: Optional[Callable[..., None]] = None,
+    log_debug: Callable[..., None] = _silent,
+) -> Optional[str]:
+    """Fetch ``url`` through the shared cache, rate limiter, retry policy and circuit breaker.
+
+    With a ``proxy_pool`` each attempt goes out through the healthiest free proxy
+    and its latency and outcome are fed back into the pool.
+
+    Returns the body of a 200 response, or ``None`` once the URL turns out to be
+    permanently unavailable or the retry budget is spent.
+
+    The ``log`` callables take a %-style message and its arguments, like a
+    logger's methods; per-attempt chatter (requests, waits, backoff sleeps)
+    goes to ``log_debug``, so a disabled level drops it before formatting.
+    """
+    log_error = log_error or log
+    cached = RESPONSE_CACHE.get_fresh(url, params)
+    if cached is not None:
+        log_debug("Cache hit URL=%s", url)
+        return cached
+
+    def read(response) -> str:
+        TRANSPORT.record(url, params, response)
+        return response.text
+
+    return _fetch(
+        url, session, params, headers, proxies, proxy_pool, timeout, policy, log, log_debug, log_error, read,
+        stream=False,
+    )
+
+
+def fetch_stream(
+    url: str,
+    consume: Callable[[StreamedBody], T],
+    session: Optional[requests.Session] = None,
+    params: Optional[Mapping[str, str]] = None,
+    headers: Optional[Callable[[], Dict[str, str]]] = None,
+    proxies: Optional[Dict[str, str]] = None,
+    proxy_pool: Optional[ProxyPool] = None,
+    timeout: float = 20,
+    policy: RetryPolicy = DEFAULT_POLICY,
+    log: Callable[..., None] = _silent,
+    log_error: Optional[Callable[..., None]] = None,
+    log_debug: Callable[..., None] = _silent,
+) -> Optional[T]:
+    """Like ``fetch_text``, but hands the body to ``consume`` while it downloads.
+
+    ``consume`` iterates the ``StreamedBody`` (text chunks) and returns its
+    result; once it returns, the rest of the body is not downloaded. Only bodies
+    that were read completely are cached and recorded. In record mode the body
+    is always read to the end so the archive stays replayable.
+    """
+    log_error = log_error or log
+    cached = RESPONSE_CACHE.get_fresh(url, params)
+    if cached is not None:
+        log_debug("Cache hit URL=%s", url)
+        return consume(StreamedBody(CachedResponse(url, cached)))
+
+    def read(response) -> T:
+        body = StreamedBody(response)
+        skipped: Optional[int] = None
+        try:
+            value = consume(body)
+            if not body.complete:
+                skipped = body.remaining()
+                if TRANSPORT.mode == "record" or (skipped is not None and skipped <= DRAIN_LIMIT):
+                    body.drain()
+        finally:
+            if hasattr(response, "close"):
+                response.close()
+        STREAM_STATS.add(body, skipped)
+        if body.complete and hasattr(response, "iter_content"):
+            text = body.text()
+            RESPONSE_CACHE.save(url, params, text, response.headers)
+            TRANSPORT.record(url, params, response, text)
+        elif not body.complete:
+            log_debug("Stopped reading after %s bytes URL=%s", body.bytes_read, url)
+        return value
+
+    return _fetch(
+        url, session, params, headers, proxies, proxy_pool, timeout, policy, log, log_debug, log_error, read,
+        stream=True,
+    )
@@ -0,0 +1,77 @@
+import os
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Number of distinct hosts whose pools are kept open, and the number of keep-alive
+# connections kept per host. Raise the pool size together with crawl concurrency.
+POOL_HOSTS = int(os.environ.get("SCRAPER_POOL_HOSTS", "16"))
+POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "10"))
+
+
+def accept_encoding() -> str:
+    # urllib3 only decodes brotli when one of these modules is importable.
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+            return "gzip, deflate, br"
+        except ImportError:
+            continue
+    return "gzip, deflate"
+
+
+class SessionFactory:
+    """Hands out one ``requests.Session`` per thread on top of a shared connection pool.
+
+    Sessions keep cookies and other per-session state that is not thread-safe, so
+    each thread gets its own. They all mount the same ``HTTPAdapter`` whose urllib3
+    pool manager is thread-safe, so keep-alive connections are reused across threads.
+    """
+
+    def __init__(self, pool_hosts: int = POOL_HOSTS, pool_size: int = POOL_SIZE) -> None:
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+        self.encoding = accept_encoding()
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            session.headers["Accept-Encoding"] = self.encoding
+            self._local.session = session
+        return session
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return ``{host: {"requests": n, "connections": m}}`` for every open pool."""
+        managers = [self.adapter.poolmanager] + list(self.adapter.proxy_manager.values())
+        collected: Dict[str, Dict[str, int]] = {}
+        for manager in managers:
+            for pool_key in list(manager.pools.keys()):
+                pool = manager.pools.get(pool_key)
+                if pool is None:
+                    continue
+                host_stats = collected.setdefault(pool.host, {"requests": 0, "connections": 0})
+                host_stats["requests"] += pool.num_requests
+                host_stats["connections"] += pool.num_connections
+        return collected
+
+    def report(self) -> str:
+        per_host = self.stats()
+        requests_total = sum(item["requests"] for item in per_host.values())
+        connections_total = sum(item["connections"] for item in per_host.values())
+        reuse = 1 - connections_total / requests_total if requests_total else 0.0
+        hosts = " ".join(
+            f"{host}={item['requests']}/{item['connections']}" for host, item in sorted(per_host.items())
+        )
+        return f"requests={requests_total} connections={connections_total} reuse={reuse:.1%} {hosts}".rstrip()
+
+
+SESSIONS = SessionFactory()
+
+
+def get_session() -> requests.Session:
+    return SESSIONS.session()
@@ -0,0 +1,240 @@
+import codecs
+import hashlib
+import json
+import re
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from record_log import snapshot_digest
+
+CHUNK_SIZE = 1 << 20
+_DECODER = json.JSONDecoder()
+_SCAN = _DECODER.scan_once
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+# A log reference: (op, offset, length) of one record line in the record log.
+Ref = Tuple[str, int, int]
+
+
+class LayoutReader:
+    """Pull parser over a dataset file, one key or one value at a time.
+
+    The file is read in chunks and each value is decoded by the C decoder
+    (``raw_decode``), so a dataset can be walked one entry at a time and only
+    the current chunk and entry are held in memory. ``items`` yields the keys of
+    an object (the caller reads or walks each value before the next key);
+    ``elements`` yields the entries of a list. The SHA-1 of the bytes read is
+    kept so ``finish`` returns the same digest the record log stores.
+    """
+
+    def __init__(self, fh: BinaryIO, chunk_size: int = CHUNK_SIZE) -> None:
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.sha1 = hashlib.sha1()
+        self.head = b""
+        self.size = 0
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.fh.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            text = self.decoder.decode(b"", final=True)
+        else:
+            self.sha1.update(data)
+            if len(self.head) < 64:
+                self.head += data[: 64 - len(self.head)]
+            self.size += len(data)
+            text = self.decoder.decode(data)
+        self.buf = self.buf[self.pos :] + text
+        self.pos = 0
+        return bool(data)
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at the end of the file."""
+        while True:
+            pos = self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if pos < len(self.buf):
+                return self.buf[pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number cut by the end of the buffer ("1.5e|10") may continue in the next chunk.
+            if (end == len(self.buf) or self.buf[end] in _NUMBER_CHARS) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def _separator(self, close: str) -> bool:
+        char = self.peek()
+        self.pos += 1
+        if char == ",":
+            return True
+        if char == close:
+            return False
+        raise json.JSONDecodeError(f"Expecting ',' or {close!r}", self.buf, self.pos - 1)
+
+    def items(self) -> Iterator[str]:
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise json.JSONDecodeError("Expecting property name", self.buf, self.pos)
+            self.expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+    def elements(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        match_ws = _WHITESPACE.match
+        while True:
+            # Fast path: the entry and the separator after it are both in the buffer.
+            buf = self.buf
+            start = match_ws(buf, self.pos).end()
+            try:
+                value, end = _SCAN(buf, start)
+            except (StopIteration, ValueError):
+                end = len(buf)
+            if end < len(buf) and buf[end] not in _NUMBER_CHARS:
+                separator = match_ws(buf, end).end()
+                if separator < len(buf) and buf[separator] in ",]":
+                    self.pos = separator + 1
+                    yield value
+                    if buf[separator] == "]":
+                        return
+                    continue
+            self.pos = start
+            yield self.value()
+            if not self._separator("]"):
+                return
+
+    def leaves(self, depth: int, prefix: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+        """``(key path, entry)`` for every entry of the lists ``depth`` objects down."""
+        for key in self.items():
+            char = self.peek()
+            if depth > 1 and char == "{":
+                yield from self.leaves(depth - 1, prefix + (key,))
+            elif depth == 1 and char == "[":
+                key_path = prefix + (key,)
+                for entry in self.elements():
+                    yield key_path, entry
+            else:
+                self.value()
+
+    def finish(self) -> str:
+        """Check that only whitespace is left and return the file's base digest."""
+        if self.peek() != "":
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+        return snapshot_digest(self.head) if self.size <= len(self.head) else self.sha1.hexdigest()
+
+
+def dumps_at(value: Any, level: int) -> str:
+    """``value`` as ``json.dumps(indent=2)`` renders it ``level`` objects deep."""
+    text = json.dumps(value, indent=2, ensure_ascii=False)
+    return text.replace("\n", "\n" + "  " * level) if level else text
+
+
+class LayoutMerger:
+    """Writes a dataset file with logged records applied, without loading either.
+
+    ``overlay`` mirrors the key layout with a list of log references at each
+    leaf, in the order the records were appended; ``load_ref`` returns the
+    entries of one. Entries are streamed from the old file and the log into
+    ``write``; the output is byte for byte what ``json.dumps(data, indent=2)``
+    gives for the replayed dataset.
+    """
+
+    def __init__(
+        self, depth: int, overlay: Dict[str, Any], load_ref: Callable[[Ref], List[Any]], write: Callable[[str], Any]
+    ) -> None:
+        self.depth = depth
+        self.overlay = overlay
+        self.load_ref = load_ref
+        self.write = write
+
+    def merge(self, reader: Optional[LayoutReader]) -> None:
+        if reader is not None and reader.peek() == "":
+            reader = None
+        self.merge_dict(reader, self.overlay, 0, self.depth)
+
+    def merge_dict(
+        self, reader: Optional[LayoutReader], overlay: Optional[Dict[str, Any]], level: int, depth: int
+    ) -> None:
+        overlay = overlay if isinstance(overlay, dict) else {}
+        pad = "\n" + "  " * (level + 1)
+        written = 0
+        seen = set()
+
+        def open_child(key: str) -> None:
+            nonlocal written
+            self.write(("{" if not written else ",") + pad + json.dumps(key, ensure_ascii=False) + ": ")
+            written += 1
+
+        if reader is not None:
+            for key in reader.items():
+                seen.add(key)
+                open_child(key)
+                child = overlay.get(key)
+                char = reader.peek()
+                if depth > 1 and char == "{":
+                    self.merge_dict(reader, child, level + 1, depth - 1)
+                elif depth == 1 and char == "[":
+                    self.merge_list(reader, child, level + 1)
+                else:
+                    self.write(dumps_at(reader.value(), level + 1))
+        for key, child in overlay.items():
+            if key in seen:
+                continue
+            open_child(key)
+            if depth > 1:
+                self.merge_dict(None, child, level + 1, depth - 1)
+            else:
+                self.merge_list(None, child, level + 1)
+        self.write("{}" if not written else "\n" + "  " * level + "}")
+
+    def merge_list(self, reader: Optional[LayoutReader], refs: Optional[List[Ref]], level: int) -> None:
+        refs = refs if isinstance(refs, list) else []
+        pad = "\n" + "  " * (level + 1)
+        written = 0
+
+        def emit(entry: Any) -> None:
+            nonlocal written
+            self.write(("[" if not written else ",") + pad + dumps_at(entry, level + 1))
+            written += 1
+
+        # Entries before the last "set" were replaced by it.
+        start = max((index for index, ref in enumerate(refs) if ref[0] == "set"), default=-1)
+        if reader is not None:
+            for entry in reader.elements():
+                if start < 0:
+                    emit(entry)
+        for ref in refs[max(start, 0) :]:
+            for entry in self.load_ref(ref):
+                emit(entry)
+        self.write("[]" if not written else "\n" + "  " * level + "]")
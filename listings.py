@@ -0,0 +1,189 @@
+import sys
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
+
+R = TypeVar("R", bound="Record")
+
+# One tuple object per distinct key order, shared by every record built with it.
+_SHAPES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def shared_shape(names: Tuple[str, ...]) -> Tuple[str, ...]:
+    return _SHAPES.setdefault(names, names)
+
+
+class Record:
+    """A listing with one slot per field instead of a dict.
+
+    ``FIELDS`` are the keys the scrapers write. Strings in ``CATEGORICAL``
+    fields (brand, model, currency, ...) are interned, so each distinct value is
+    stored once however many listings carry it; lists in ``SEQUENCES`` fields
+    are kept as tuples. A record remembers the keys it was built with, in order,
+    plus any keys it has no slot for, so ``to_dict`` gives back exactly the dict
+    the scraper would have written. ``get`` reads a field like ``dict.get``, so
+    the store and planner helpers take records and dicts alike. Fields assigned
+    after construction must be among the ones the record was built with.
+    """
+
+    __slots__ = ("shape", "extra")
+    FIELDS: Tuple[str, ...] = ()
+    CATEGORICAL: FrozenSet[str] = frozenset()
+    SEQUENCES: FrozenSet[str] = frozenset()
+
+    def __init__(self, **values: Any) -> None:
+        self.shape = shared_shape(tuple(values))
+        self.extra: Optional[Dict[str, Any]] = None
+        for name in self.FIELDS:
+            value = values.pop(name, None)
+            if type(value) is str and name in self.CATEGORICAL:
+                value = sys.intern(value)
+            elif type(value) is list and name in self.SEQUENCES:
+                value = tuple(value)
+            setattr(self, name, value)
+        if values:
+            self.extra = values
+
+    @classmethod
+    def from_dict(cls: Type[R], entry: Dict[str, Any]) -> R:
+        return cls(**entry)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name not in self.shape:
+            return default
+        extra = self.extra
+        if extra is not None and name in extra:
+            return extra[name]
+        return getattr(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        extra = self.extra
+        sequences = self.SEQUENCES
+        entry: Dict[str, Any] = {}
+        for name in self.shape:
+            if extra is not None and name in extra:
+                entry[name] = extra[name]
+            else:
+                value = getattr(self, name)
+                entry[name] = list(value) if type(value) is tuple and name in sequences else value
+        return entry
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Rebuilt through __init__ so the categorical strings are interned in the receiving process too.
+        return (restore_record, (type(self), self.to_dict()))
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+def restore_record(record_type: Type[R], entry: Dict[str, Any]) -> R:
+    return record_type.from_dict(entry)
+
+
+class EbayPartListing(Record):
+    """One eBay listing of ``catalog.json`` (``catalog_builder``, ``scraper``)."""
+
+    FIELDS = ("oem_main", "oem_cross_refs", "title", "price", "currency", "image_url", "ebay_url")
+    __slots__ = FIELDS
+    CATEGORICAL = frozenset({"currency"})
+    SEQUENCES = frozenset({"oem_cross_refs"})
+
+
+class CarListing(Record):
+    """One car ad of ``autoplius.json`` or ``car_catalog.json`` (otomoto)."""
+
+    FIELDS = ("brand", "model", "generation", "year", "mileage", "price", "vin", "photo", "photos", "url", "id")
+    __slots__ = FIELDS
+    CATEGORICAL = frozenset({"brand", "model", "generation"})
+    SEQUENCES = frozenset({"photos"})
+
+
+class RrrPart(Record):
+    """One rrr.lt part of ``parts_catalog.json``."""
+
+    FIELDS = ("oem_main", "oem_cross_refs", "price", "currency", "model", "year", "image_url", "url", "title")
+    __slots__ = FIELDS
+    CATEGORICAL = frozenset({"currency", "model"})
+    SEQUENCES = frozenset({"oem_cross_refs"})
+
+
+class RecordList:
+    """Records of one type stored column by column.
+
+    Each row costs one pointer per field and none of the per-object overhead
+    of a record (or dict), and the rows are not tracked by the garbage
+    collector. Indexing and iteration hand out record objects built on the
+    fly, so changes to them are not written back; ``append`` takes records or
+    dicts. Meant for the large batches a scraper collects before storing them.
+    """
+
+    __slots__ = ("record_type", "columns", "shapes", "extras")
+
+    def __init__(self, record_type: Type[Record], records: Iterable[Any] = ()) -> None:
+        self.record_type = record_type
+        self.columns: Dict[str, List[Any]] = {name: [] for name in record_type.FIELDS}
+        self.shapes: List[Tuple[str, ...]] = []
+        # Row index -> keys a record had no slot for.
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self.extend(records)
+
+    def append(self, record: Any) -> None:
+        if isinstance(record, dict):
+            record = self.record_type.from_dict(record)
+        elif type(record) is not self.record_type:
+            raise TypeError(f"Expected {self.record_type.__name__}, got {type(record).__name__}")
+        for name, column in self.columns.items():
+            column.append(getattr(record, name))
+        if record.extra:
+            self.extras[len(self.shapes)] = record.extra
+        self.shapes.append(record.shape)
+
+    def extend(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    def __getitem__(self, index: int) -> Record:
+        if index < 0:
+            index += len(self.shapes)
+        record = self.record_type.__new__(self.record_type)
+        record.shape = self.shapes[index]
+        record.extra = self.extras.get(index)
+        for name, column in self.columns.items():
+            setattr(record, name, column[index])
+        return record
+
+    def __iter__(self) -> Iterator[Record]:
+        for index in range(len(self.shapes)):
+            yield self[index]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [record.to_dict() for record in self]
+
+    def __repr__(self) -> str:
+        return f"RecordList({self.record_type.__name__}, {len(self)} records)"
+
+
+def as_records(record_type: Type[R], entries: Iterable[Any]) -> List[Any]:
+    """``entries`` with every dict turned into a ``record_type``; records and anything else are kept."""
+    return [record_type.from_dict(entry) if isinstance(entry, dict) else entry for entry in entries]
+
+
+def as_entry(entry: Any) -> Any:
+    """The dict a record stands for; anything else unchanged."""
+    return entry.to_dict() if isinstance(entry, Record) else entry
+
+
+def encode_record(value: Any) -> Any:
+    """``default`` hook for ``json.dumps``: records are written as the dicts they stand for."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, RecordList):
+        return value.to_dicts()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
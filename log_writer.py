@@ -0,0 +1,334 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def parse_level(value: str) -> int:
+    level = logging.getLevelName(value.strip().upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+# Records below this level are dropped by the logger itself, before anything is
+# formatted or queued; "debug" also keeps the per-attempt request chatter.
+LOG_LEVEL = parse_level(os.environ.get("SCRAPER_LOG_LEVEL", "info"))
+# A log file is rotated to <name>.1 (then .2, ...) once it reaches this size.
+LOG_MAX_BYTES = int(float(os.environ.get("SCRAPER_LOG_MAX_MB", "50")) * 1024 * 1024)
+LOG_BACKUPS = int(os.environ.get("SCRAPER_LOG_BACKUPS", "3"))
+# Records written per batch, at most; a batch is one write per file.
+BATCH_RECORDS = 1024
+
+# A queued log call: (time, level, logger name, message, args, extra fields, exc_info).
+Record = Tuple[float, int, str, str, Tuple[Any, ...], Optional[Dict[str, Any]], Any]
+
+_LEVEL_NAMES = {level: logging.getLevelName(level) for level in (10, 20, 30, 40, 50)}
+_stamp: List[Any] = [0, ""]
+
+
+def timestamp(created: float) -> str:
+    second = int(created)
+    if second != _stamp[0]:
+        _stamp[:] = [second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))]
+    return f"{_stamp[1]}.{int((created - second) * 1000):03d}"
+
+
+def json_line(record: Record) -> str:
+    """One log call as a JSON line: time, level, logger, message and its ``extra`` fields."""
+    created, level, name, message, args, extra, exc_info = record
+    if args:
+        try:
+            message = message % args
+        except Exception:
+            message = f"{message} {args!r}"
+    line: Dict[str, Any] = {
+        "ts": timestamp(created),
+        "level": _LEVEL_NAMES.get(level) or str(level),
+        "logger": name,
+        "msg": message,
+    }
+    if extra:
+        line.update(extra)
+    if exc_info:
+        line["exc"] = "".join(traceback.format_exception(*exc_info)).rstrip()
+    return json.dumps(line, ensure_ascii=False, default=str) + "\n"
+
+
+class LogFile:
+    """An append-only log file, rotated before it outgrows ``max_bytes`` (0 never rotates).
+
+    Several processes may append to the same file (``catalog_builder --workers``).
+    The size is therefore taken from the file itself, not from what this process wrote.
+    A file that another process rotated away is reopened under its name.
+    Rotation takes an exclusive lock on the file and checks again that it was not rotated meanwhile.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backups: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+        self.fh = None
+
+    def open(self) -> None:
+        self.close()
+        self.fh = self.path.open("ab")
+
+    def moved(self) -> bool:
+        """Whether ``path`` no longer names the open file (rotated or removed by another process)."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self.fh.fileno())
+        return (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+
+    def write(self, data: bytes) -> int:
+        """Append ``data`` (whole lines), rotating as often as needed; returns the rotations done here."""
+        rotations = 0
+        while data:
+            if self.fh is None or self.moved():
+                self.open()
+            size = os.fstat(self.fh.fileno()).st_size
+            chunk = data
+            if self.max_bytes and size + len(data) > self.max_bytes:
+                # The lines that still fit; a lone line longer than max_bytes goes into an empty file.
+                cut = data.rfind(b"\n", 0, max(0, self.max_bytes - size)) + 1
+                if not cut and not size:
+                    cut = data.find(b"\n") + 1 or len(data)
+                chunk = data[:cut]
+            if chunk:
+                self.fh.write(chunk)
+                self.fh.flush()
+                data = data[len(chunk) :]
+            if data:
+                rotations += self.rotate()
+        return rotations
+
+    def rotate(self) -> bool:
+        """Rotate the file unless another process already did; returns whether this one did."""
+        with locked(self.fh):
+            rotated = not self.moved()
+            if rotated and self.backups:
+                for index in range(self.backups - 1, 0, -1):
+                    older = self.path.with_name(f"{self.path.name}.{index}")
+                    if older.exists():
+                        os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            elif rotated:
+                os.remove(self.path)
+        self.open()
+        return rotated
+
+    def close(self) -> None:
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+
+
+@contextmanager
+def locked(fh: Any) -> Iterator[None]:
+    """Exclusive advisory lock on an open file where the platform has ``fcntl``."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class LogWriter:
+    """The one background thread that writes every scraper's log files.
+
+    Loggers from ``get_logger`` only put their calls on a queue, so a log call
+    costs the calling thread no formatting and no file access. The writer
+    takes whatever has queued up (up to ``BATCH_RECORDS``), formats it as JSON
+    lines and writes each file's share with a single write, so lines from
+    concurrent crawls never interleave. Message arguments are formatted on the
+    writer thread; pass values that are not changed afterwards.
+    """
+
+    def __init__(self, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS) -> None:
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue: "queue.SimpleQueue[Tuple[Optional[Path], Any]]" = queue.SimpleQueue()
+        self.files: Dict[Path, LogFile] = {}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.counts: Dict[str, float] = {
+            "records": 0, "batches": 0, "bytes": 0, "rotations": 0, "errors": 0, "write_seconds": 0.0
+        }
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+            self.thread.start()
+
+    def submit(self, path: Path, record: Record) -> None:
+        if self.thread is None:
+            self.start()
+        self.queue.put((path, record))
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_RECORDS:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self.write_batch(batch):
+                return
+
+    def write_batch(self, batch: List[Tuple[Optional[Path], Any]]) -> bool:
+        """Write one batch; returns False once it held the stop marker."""
+        lines: Dict[Path, List[str]] = {}
+        waiting: List[threading.Event] = []
+        running = True
+        errors = 0
+        for path, item in batch:
+            if path is None:
+                # Control item: an Event to set once written (``flush``), or None to stop.
+                if item is None:
+                    running = False
+                else:
+                    waiting.append(item)
+                continue
+            try:
+                lines.setdefault(path, []).append(json_line(item))
+            except Exception:
+                errors += 1
+        started = time.perf_counter()
+        written = rotations = 0
+        for path, chunk in lines.items():
+            data = "".join(chunk).encode("utf-8")
+            try:
+                log_file = self.files.get(path)
+                if log_file is None:
+                    log_file = self.files[path] = LogFile(path, self.max_bytes, self.backups)
+                rotations += log_file.write(data)
+                written += len(data)
+            except Exception:
+                # Counted, never raised: the writer thread must outlive a bad file.
+                errors += 1
+        with self.lock:
+            self.counts["records"] += sum(len(chunk) for chunk in lines.values())
+            self.counts["batches"] += 1 if lines else 0
+            self.counts["bytes"] += written
+            self.counts["rotations"] += rotations
+            self.counts["errors"] += errors
+            self.counts["write_seconds"] += time.perf_counter() - started
+        for event in waiting:
+            event.set()
+        return running
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until everything logged so far is written."""
+        thread = self.thread
+        if thread is None or not thread.is_alive():
+            return
+        done = threading.Event()
+        self.queue.put((None, done))
+        done.wait(timeout)
+
+    def shutdown(self) -> None:
+        """Write what is queued, stop the thread and close the files."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None and thread.is_alive():
+            self.queue.put((None, None))
+            thread.join(5.0)
+        for log_file in self.files.values():
+            log_file.close()
+
+    def after_fork(self) -> None:
+        # A forked child (parse worker) has no writer thread; it starts its own if it logs.
+        self.queue = queue.SimpleQueue()
+        self.files = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        per_batch = counts["records"] / counts["batches"] if counts["batches"] else 0.0
+        return (
+            f"records={int(counts['records'])} batches={int(counts['batches'])} ({per_batch:.1f}/batch) "
+            f"written={counts['bytes'] / 1024:.0f}KiB rotations={int(counts['rotations'])} "
+            f"errors={int(counts['errors'])} write={counts['write_seconds']:.2f}s"
+        )
+
+
+class Logger:
+    """The calling side of a log file, with the methods of a ``logging.Logger``.
+
+    ``info("Page %s parsed", page, extra={"brand": brand})`` queues the call
+    for the writer; ``extra`` entries become fields of the JSON line. A call
+    below ``level`` returns after one comparison, with nothing formatted. It
+    skips the stdlib's record and caller lookup, which cost more than the
+    write they replace.
+    """
+
+    __slots__ = ("name", "path", "level", "writer")
+
+    def __init__(self, name: str, path: Path, level: int, writer: "LogWriter") -> None:
+        self.name = name
+        self.path = path
+        self.level = level
+        self.writer = writer
+
+    def is_enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args: Any, exc_info: Any = None, extra: Optional[Dict[str, Any]] = None):
+        if level < self.level:
+            return
+        if exc_info is True or (exc_info is not None and not isinstance(exc_info, tuple)):
+            exc_info = sys.exc_info()
+        self.writer.submit(self.path, (time.time(), level, self.name, message, args, extra, exc_info or None))
+
+    def debug(self, message: str, *args: Any, **kwargs: Any) -> None:
+        if self.level <= logging.DEBUG:
+            self.log(logging.DEBUG, message, *args, **kwargs)
+
+    def info(self, message: str, *args: Any, **kwargs: Any) -> None:
+        if self.level <= logging.INFO:
+            self.log(logging.INFO, message, *args, **kwargs)
+
+    def warning(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.log(logging.WARNING, message, *args, **kwargs)
+
+    def error(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.log(logging.ERROR, message, *args, **kwargs)
+
+    def exception(self, message: str, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("exc_info", True)
+        self.log(logging.ERROR, message, *args, **kwargs)
+
+
+LOG_WRITER = LogWriter()
+atexit.register(LOG_WRITER.shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=LOG_WRITER.after_fork)
+
+_LOGGERS: Dict[str, Logger] = {}
+
+
+def get_logger(name: str, path: Path, level: int = LOG_LEVEL) -> Logger:
+    """The logger ``name``, writing JSON lines to ``path`` through ``LOG_WRITER``."""
+    logger = _LOGGERS.get(name)
+    if logger is None or logger.path != Path(path):
+        logger = _LOGGERS[name] = Logger(name, Path(path), level, LOG_WRITER)
+    return logger
@@ -2,16 +2,17 @@ import json
 from pathlib import Path
 from typing import Dict, List, Set
 
+from catalog_store import export_dataset
+
 AUTOPLIUS_PATH = Path("autoplius.json")
 PARTS_PATH = Path("parts_catalog.json")
 OUTPUT_PATH = Path("sonver_catalog.json")
 
 
 def load_json(path: Path) -> Dict:
-    if not path.exists():
-        return {}
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        # Reads SCRAPER_STORAGE=sqlite datasets too, and JSON record logs not yet compacted.
+        return export_dataset(path)
     except Exception:
         return {}
 
@@ -0,0 +1,255 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Known models per brand. They seed the matcher and are what catalog_builder crawls.
+SEED_MODELS: Dict[str, List[str]] = {
+    "Audi": ["A1", "A2", "A3", "A4", "A5", "A6", "A7", "A8", "Q3", "Q5", "Q7"],
+    "BMW": ["1 Series", "2 Series", "3 Series", "4 Series", "5 Series", "7 Series", "X1", "X3", "X5"],
+    "Mercedes": ["A-Class", "B-Class", "C-Class", "E-Class", "S-Class", "GLA", "GLC", "GLE", "Sprinter"],
+    "Volkswagen": ["Golf", "Polo", "Passat", "Tiguan", "Touran", "Caddy", "Transporter"],
+    "Skoda": ["Fabia", "Octavia", "Superb", "Kodiaq", "Karoq"],
+    "Seat": ["Ibiza", "Leon", "Toledo", "Altea", "Ateca"],
+    "Opel": ["Corsa", "Astra", "Insignia", "Zafira", "Mokka"],
+    "Peugeot": ["208", "308", "508", "2008", "3008", "5008", "Partner"],
+    "Citroen": ["C1", "C3", "C4", "C5", "Berlingo", "Jumpy"],
+    "Renault": ["Clio", "Megane", "Laguna", "Scenic", "Twingo", "Kangoo", "Master"],
+    "Dacia": ["Logan", "Sandero", "Duster", "Dokker"],
+    "Fiat": ["Panda", "500", "Punto", "Tipo", "Doblo", "Ducato"],
+    "Alfa Romeo": ["Giulietta", "Giulia", "MiTo", "Stelvio"],
+    "Volvo": ["S40", "S60", "S80", "V40", "V60", "XC60", "XC90"],
+    "Porsche": ["911", "Cayenne", "Macan", "Panamera", "Boxster"],
+    "Mini": ["One", "Cooper", "Clubman", "Countryman"],
+    "Land Rover": ["Defender", "Discovery", "Range Rover", "Range Rover Sport", "Evoque"],
+    "Jaguar": ["XE", "XF", "XJ", "F-Pace", "E-Pace", "F-Type"],
+    "Saab": ["9-3", "9-5", "900", "9000"],
+    "Smart": ["Fortwo", "Forfour"],
+    "Ford Europe": ["Fiesta", "Focus", "Mondeo", "Kuga", "Transit"],
+}
+
+# Other names a brand appears under on its pages.
+BRAND_ALIASES: Dict[str, List[str]] = {
+    "Mercedes": ["Mercedes-Benz"],
+    "Volkswagen": ["VW"],
+    "Ford Europe": ["Ford"],
+}
+
+# A list item or table cell with at most this many words may be a model name on
+# its own; longer texts only contribute vocabulary matches and "<Brand> <Model>".
+MAX_CELL_WORDS = 3
+# Capitalized words following the brand name that are taken as the model;
+# hyphenated parts ("C-Class") count as one.
+MAX_MODEL_WORDS = 2
+
+# Table headers and body styles that are capitalized like model names.
+NOISE_WORDS = frozenset(
+    {
+        "body", "cabriolet", "concept", "convertible", "coupe", "coupé", "diesel", "electric", "engine",
+        "estate", "generation", "hatchback", "hybrid", "image", "model", "models", "name", "no", "notes",
+        "petrol", "production", "roadster", "saloon", "sedan", "suv", "total", "type", "unknown", "van",
+        "wagon", "years", "yes",
+    }
+)
+
+WORD = re.compile(r"[A-Za-z0-9]+")
+_PARENTHESES = re.compile(r"\(.*?\)")
+_YEAR = re.compile(r"\b\d{4}\b")
+_SPACES = re.compile(r"\s+")
+_SLASH_TAIL = re.compile(r"\s+/.*")
+
+
+@lru_cache(maxsize=65536)
+def normalize_model(name: str) -> str:
+    cleaned = _PARENTHESES.sub("", name)
+    cleaned = _YEAR.sub("", cleaned)
+    cleaned = _SPACES.sub(" ", cleaned).strip()
+    cleaned = _SLASH_TAIL.sub("", cleaned)
+    cleaned = cleaned.replace("–", "-")
+    cleaned = cleaned.strip("- ")
+    return cleaned.title()
+
+
+class WordAutomaton:
+    """Aho-Corasick automaton over casefolded words.
+
+    Each phrase is a word sequence ("range", "rover", "sport"); ``find`` reports
+    every phrase occurrence in one pass over a text's words, overlapping ones
+    included, as ``(start, end, value)`` triples with an exclusive ``end``.
+    """
+
+    def __init__(self) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, object]]] = [[]]
+        self.built = True
+
+    def add(self, words: List[str], value: object) -> None:
+        node = 0
+        for word in words:
+            nxt = self.goto[node].get(word)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][word] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append((len(words), value))
+        self.built = False
+
+    def build(self) -> None:
+        queue = list(self.goto[0].values())
+        for node in queue:
+            self.fail[node] = 0
+        for node in queue:
+            for word, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and word not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(word, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        self.built = True
+
+    def find(self, words: List[str]) -> List[Tuple[int, int, object]]:
+        """Every phrase occurrence in ``words``, in order of its last word."""
+        if not self.built:
+            self.build()
+        found: List[Tuple[int, int, object]] = []
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            for length, value in output[state]:
+                found.append((index + 1 - length, index + 1, value))
+        return found
+
+
+def phrase_words(phrase: str) -> List[str]:
+    return [word.casefold() for word in WORD.findall(phrase)]
+
+
+def model_end(text: str, words: List["re.Match[str]"], start: int) -> int:
+    """End of the capitalized model name starting at word ``start`` ("C-Class", "Range Rover")."""
+    end = start + 1
+    groups = 1
+    while end < len(words):
+        gap = text[words[end - 1].end() : words[end].start()]
+        first = words[end].group()[0]
+        if gap == "-":
+            end += 1
+        elif gap == " " and groups < MAX_MODEL_WORDS and (first.isupper() or first.isdigit()):
+            end += 1
+            groups += 1
+        else:
+            break
+    return end
+
+
+class ModelDiscovery:
+    """Finds model names of a brand in the list items and table cells of a page.
+
+    Per brand, one automaton holds the known models and the brand name itself.
+    A text contributes every known model it mentions, the words right after
+    each mention of the brand, and, when it is a short cell, its own text.
+    Every model comes out in the ``normalize_model`` spelling the catalog keys
+    were always written with ("Xc60", "A-Class"), once per casefolded name.
+    Timing and candidate counts are kept per brand for ``report``.
+    """
+
+    def __init__(self, seeds: Optional[Dict[str, List[str]]] = None) -> None:
+        self.seeds = {brand: list(models) for brand, models in (SEED_MODELS if seeds is None else seeds).items()}
+        self.automata: Dict[str, WordAutomaton] = {}
+        self.lock = threading.Lock()
+        # brand -> [pages, texts, candidates, known matches, models kept, seconds]
+        self.stats: Dict[str, List[float]] = {}
+
+    def automaton(self, brand: str) -> WordAutomaton:
+        with self.lock:
+            automaton = self.automata.get(brand)
+            if automaton is None:
+                automaton = WordAutomaton()
+                for name in [brand] + BRAND_ALIASES.get(brand, []):
+                    automaton.add(phrase_words(name), None)
+                for model in self.seeds.get(brand, []):
+                    automaton.add(phrase_words(model), model)
+                automaton.build()
+                self.automata[brand] = automaton
+            return automaton
+
+    def add_models(self, brand: str, models: Iterable[str]) -> None:
+        """Extend a brand's vocabulary, e.g. with models confirmed by a previous run."""
+        with self.lock:
+            known = self.seeds.setdefault(brand, [])
+            fresh = [model for model in models if model not in known]
+            known.extend(fresh)
+            if fresh:
+                self.automata.pop(brand, None)
+
+    @staticmethod
+    def accept(candidate: str) -> Optional[str]:
+        normalized = normalize_model(candidate)
+        # Body styles and headers after the name ("S60 Sedan") are dropped like noise-only cells.
+        words = normalized.split(" ")
+        while words and all(word in NOISE_WORDS for word in phrase_words(words[-1])):
+            words.pop()
+        normalized = " ".join(words)
+        if len(normalized) < 2 or len(normalized) > 30 or normalized.replace(" ", "").isdigit():
+            return None
+        if not (normalized[0].isupper() or normalized[0].isdigit()):
+            return None
+        return normalized
+
+    def extract(self, texts: Iterable[str], brand: str) -> Set[str]:
+        started = time.perf_counter()
+        automaton = self.automaton(brand)
+        # casefolded name -> spelling kept
+        models: Dict[str, str] = {}
+        text_count = candidates = known = 0
+        for text in texts:
+            text_count += 1
+            words = list(WORD.finditer(text))
+            if not words:
+                continue
+            # Brand mentions by start word; the longest name wins ("Mercedes-Benz" over "Mercedes").
+            brand_ends: Dict[int, int] = {}
+            for start, end, value in automaton.find([word.group().casefold() for word in words]):
+                if value is None:
+                    brand_ends[start] = max(end, brand_ends.get(start, 0))
+                else:
+                    known += 1
+                    model = normalize_model(str(value))
+                    models.setdefault(model.casefold(), model)
+            spans = [(end, model_end(text, words, end)) for end in brand_ends.values() if end < len(words)]
+            cell_start = brand_ends.get(0, 0)
+            if 0 < len(words) - cell_start <= MAX_CELL_WORDS:
+                spans.append((cell_start, len(words)))
+            for first, last in dict.fromkeys(spans):
+                candidates += 1
+                # A span running to the end of the text keeps its closing bracket.
+                stop = len(text) if last == len(words) else words[last - 1].end()
+                normalized = self.accept(text[words[first].start() : stop])
+                if normalized:
+                    models.setdefault(normalized.casefold(), normalized)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            entry = self.stats.setdefault(brand, [0, 0, 0, 0, 0, 0.0])
+            for index, value in enumerate((1, text_count, candidates, known, len(models), elapsed)):
+                entry[index] += value
+        return set(models.values())
+
+    def report(self) -> str:
+        with self.lock:
+            return " ".join(
+                f"{brand}: pages={int(pages)} texts={int(texts)} candidates={int(candidates)} "
+                f"known={int(known)} models={int(kept)} {seconds * 1000:.1f}ms"
+                for brand, (pages, texts, candidates, known, kept, seconds) in sorted(self.stats.items())
+            )
+
+
+MODEL_DISCOVERY = ModelDiscovery()
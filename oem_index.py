@@ -0,0 +1,255 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from checkpoints import CHECKPOINTS
+from oem_tokenizer import normalize_oem
+
+OEM_INDEX_PATH = Path(os.environ.get("SCRAPER_OEM_INDEX", "oem_index.sqlite"))
+# Buffered occurrences are written by the checkpoint thread; once this many are
+# pending, the scraper thread that adds the next one writes them itself.
+OEM_INDEX_BATCH = int(os.environ.get("SCRAPER_OEM_INDEX_BATCH", "5000"))
+
+# Site each dataset's listings come from, for indexing existing dataset files.
+DATASET_SOURCES: Dict[str, str] = {"catalog": "ebay", "parts_catalog": "rrr"}
+
+COLUMNS = ("oem", "brand", "model", "part", "source", "url")
+
+
+def upper_bound(prefix: str) -> str:
+    """The smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class OemIndex:
+    """Every OEM number seen by the scrapers, with where it was seen.
+
+    One row per (OEM, brand, model, part, source, listing URL) in a SQLite
+    table clustered on the normalized OEM (``WITHOUT ROWID``), so ``lookup``
+    is a B-tree seek and ``prefix`` a range scan, and nothing is loaded into
+    memory. ``add`` only buffers the rows; ``checkpoint`` hands them to the
+    background checkpoint thread, whose ``flush`` writes them as one
+    transaction (as does ``add`` once ``batch`` rows are pending). An
+    occurrence seen again is not duplicated. Missing brand, model or part
+    (rrr.lt parts have no brand) are stored as "".
+    """
+
+    def __init__(self, path: Path = OEM_INDEX_PATH, batch: int = OEM_INDEX_BATCH) -> None:
+        self.path = Path(path)
+        self.batch = max(1, batch)
+        self.lock = threading.Lock()
+        # Serializes use of the connection: batch writes, reads and its creation.
+        self.db_lock = threading.RLock()
+        self.pending: List[Tuple[str, ...]] = []
+        self.unchecked = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counts: Dict[str, float] = {"added": 0, "batches": 0, "rows": 0, "seconds": 0.0}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self.db_lock:
+            if self._conn is None:
+                conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS occurrences (
+                        oem TEXT NOT NULL,
+                        brand TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        part TEXT NOT NULL,
+                        source TEXT NOT NULL,
+                        url TEXT NOT NULL,
+                        first_seen REAL NOT NULL,
+                        PRIMARY KEY (oem, source, url, brand, model, part)
+                    ) WITHOUT ROWID
+                    """
+                )
+                self._conn = conn
+            return self._conn
+
+    # Writing -------------------------------------------------------------------
+
+    def add(
+        self,
+        oems: Iterable[Any],
+        source: str,
+        url: Optional[str],
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        part: Optional[str] = None,
+    ) -> None:
+        """Buffer one listing's OEMs; writes a batch once ``batch`` rows are pending."""
+        context = (brand or "", model or "", part or "", source, url or "")
+        rows = [(oem, *context) for oem in dict.fromkeys(normalize_oem(str(raw)) for raw in oems if raw) if oem]
+        if not rows:
+            return
+        with self.lock:
+            self.pending.extend(rows)
+            self.unchecked += len(rows)
+            self.counts["added"] += len(rows)
+            due = len(self.pending) >= self.batch
+        if due:
+            self.write_pending()
+
+    def add_listings(
+        self,
+        listings: Iterable[Any],
+        source: str,
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        part: Optional[str] = None,
+    ) -> None:
+        """Buffer the main and cross-reference OEMs of dataset entries (records or dicts)."""
+        for listing in listings:
+            url = listing.get("ebay_url") or listing.get("url")
+            self.add([listing.get("oem_main"), *(listing.get("oem_cross_refs") or ())], source, url, brand, model, part)
+
+    def write_pending(self) -> int:
+        """Write the buffered rows as one transaction; returns how many were new."""
+        with self.db_lock:
+            with self.lock:
+                rows, self.pending = self.pending, []
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            conn = self.conn
+            now = time.time()
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO occurrences (oem, brand, model, part, source, url, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(*row, now) for row in rows],
+                )
+                written = conn.total_changes - before
+            with self.lock:
+                self.counts["batches"] += 1
+                self.counts["rows"] += written
+                self.counts["seconds"] += time.perf_counter() - started
+            return written
+
+    def checkpoint(self) -> bool:
+        """Queue the rows added since the last call; returns whether a checkpoint is due."""
+        with self.lock:
+            records, self.unchecked = self.unchecked, 0
+        return CHECKPOINTS.request(self, records)
+
+    def flush(self, compact: bool = False) -> None:
+        """Write the buffered rows (and truncate SQLite's write-ahead log with ``compact``)."""
+        self.write_pending()
+        if compact:
+            with self.db_lock:
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def save(self) -> None:
+        CHECKPOINTS.flush(self, compact=True)
+
+    # Reading -------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Sequence[object]) -> List[tuple]:
+        self.write_pending()
+        with self.db_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _rows(self, sql: str, params: Sequence[object], chunk: int = 1000) -> Iterator[Dict[str, str]]:
+        """Rows of a query, fetched ``chunk`` at a time so a long scan is never held in memory."""
+        self.write_pending()
+        with self.db_lock:
+            cursor = self.conn.execute(sql, params)
+        while True:
+            with self.db_lock:
+                rows = cursor.fetchmany(chunk)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(zip(COLUMNS, row))
+
+    def lookup(self, oem: str) -> List[Dict[str, str]]:
+        """Every occurrence of ``oem`` (normalized first), in source/URL order."""
+        return list(
+            self._rows(
+                f"SELECT {', '.join(COLUMNS)} FROM occurrences WHERE oem = ? ORDER BY source, url",
+                (normalize_oem(oem),),
+            )
+        )
+
+    def seen(self, oem: str) -> bool:
+        return bool(self._query("SELECT 1 FROM occurrences WHERE oem = ? LIMIT 1", (normalize_oem(oem),)))
+
+    def prefix(self, prefix: str, limit: Optional[int] = None) -> Iterator[Dict[str, str]]:
+        """Occurrences of every OEM starting with ``prefix`` (normalized), in OEM order."""
+        prefix = normalize_oem(prefix)
+        where, params = ("WHERE oem >= ? AND oem < ?", [prefix, upper_bound(prefix)]) if prefix else ("", [])
+        sql = f"SELECT {', '.join(COLUMNS)} FROM occurrences {where} ORDER BY oem, source, url"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._rows(sql, params)
+
+    def count(self) -> Tuple[int, int]:
+        """(distinct OEMs, occurrences)."""
+        return self._query("SELECT COUNT(DISTINCT oem), COUNT(*) FROM occurrences", ())[0]
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+            pending = len(self.pending)
+        return (
+            f"{self.path.name}: added={int(counts['added'])} new={int(counts['rows'])} "
+            f"batches={int(counts['batches'])} pending={pending} ({counts['seconds']:.2f}s)"
+        )
+
+
+OEM_INDEX = OemIndex()
+
+
+def index_dataset(index: OemIndex, path: Path) -> int:
+    """Add the OEMs of an existing dataset file; returns the number of listings read."""
+    from catalog_store import LAYOUTS, export_dataset, walk
+
+    keys = LAYOUTS[path.stem]
+    source = DATASET_SOURCES[path.stem]
+    listings = 0
+    for key_path, entries in walk(export_dataset(path), len(keys)):
+        context = dict(zip(keys, key_path))
+        index.add_listings(entries, source, context.get("brand"), context.get("model"), context.get("part"))
+        listings += len(entries)
+    return listings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up OEM numbers in the OEM index.")
+    parser.add_argument("command", choices=["lookup", "prefix", "build", "stats"])
+    parser.add_argument("values", nargs="*", help="OEMs (lookup), prefixes (prefix) or dataset files (build)")
+    parser.add_argument("--index", type=Path, default=OEM_INDEX_PATH)
+    parser.add_argument("--limit", type=int, default=100, help="Rows per prefix, 0 for all")
+    args = parser.parse_args()
+
+    index = OemIndex(args.index)
+    if args.command == "build":
+        for path in args.values:
+            if Path(path).stem not in DATASET_SOURCES:
+                parser.error(f"No OEMs in {path}; expected one of {sorted(DATASET_SOURCES)}")
+            print(f"Indexed {index_dataset(index, Path(path))} listings of {path}")
+        index.flush(compact=True)
+    elif args.command == "stats":
+        oems, occurrences = index.count()
+        print(f"{args.index}: {oems} OEMs, {occurrences} occurrences")
+    else:
+        for value in args.values:
+            if args.command == "lookup":
+                rows: Iterable[Dict[str, str]] = index.lookup(value)
+            else:
+                rows = index.prefix(value, args.limit or None)
+            for row in rows:
+                print("\t".join(row[column] for column in COLUMNS))
+
+
+if __name__ == "__main__":
+    main()
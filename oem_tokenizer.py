@@ -0,0 +1,151 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+# Separators allowed inside a spaced part number ("03L 130 277 B", "0-445-110-183").
+# Newlines are deliberately excluded so batched titles never run into each other.
+SEP = r"[ .\-]?"
+
+# Part-number grammars, tried in this order before the generic token rule at every word start.
+GRAMMARS: Dict[str, str] = {
+    # Bosch: 0 445 110 183, 0 986 437 404, F 00V C01 329. Supplier numbers, so every brand; tried
+    # first so a model year in front of one ("2006 0 445 110 311") cannot start a longer match.
+    "bosch": rf"(?:0{SEP}\d{{3}}|F{SEP}00[0-9A-Z]){SEP}[0-9A-Z]{{3}}{SEP}[0-9A-Z]{{3}}\b",
+    # VAG: 03L 130 277 B, 1K0-615-301-AA, 5Q0.407.271.
+    "vag": rf"\d[0-9A-Z]{{2}}{SEP}\d{{3}}{SEP}\d{{3}}(?:{SEP}(?!(?:OE|VW|TO|IN|OR|AT|ON)\b)[A-Z]{{1,2}})?\b",
+    # BMW 11-digit: 11 61 7 823 210, with one separator throughout or none, so a year and the
+    # digits after it ("2006 0 445 110") never pass for one. The 7-digit short form is generic.
+    "bmw": r"\d{2}(?P<bmw_sep>[ .\-]?)\d{2}(?P=bmw_sep)\d(?P=bmw_sep)\d{3}(?P=bmw_sep)\d{3}\b",
+    # Mercedes: A 651 090 14 80.
+    "mercedes": rf"A{SEP}\d{{3}}{SEP}\d{{3}}{SEP}\d{{2}}{SEP}\d{{2}}\b",
+    # Renault / Dacia: 8200 123 456.
+    "renault": rf"82\d{{2}}{SEP}\d{{3}}{SEP}\d{{3}}\b",
+    # Opel (GM) and Fiat group 8-digit numbers: 55 566 052.
+    "eight_digit": rf"\d{{2}}{SEP}\d{{3}}{SEP}\d{{3}}\b",
+}
+
+# Grammars that apply regardless of the vehicle brand.
+UNIVERSAL_GRAMMARS: Tuple[str, ...] = ("bosch",)
+
+BRAND_GRAMMARS: Dict[str, Tuple[str, ...]] = {
+    "audi": ("vag",),
+    "volkswagen": ("vag",),
+    "vw": ("vag",),
+    "skoda": ("vag",),
+    "seat": ("vag",),
+    "cupra": ("vag",),
+    "porsche": ("vag",),
+    "bmw": ("bmw",),
+    "mini": ("bmw",),
+    "mercedes": ("mercedes",),
+    "mercedes-benz": ("mercedes",),
+    "renault": ("renault",),
+    "dacia": ("renault",),
+    "opel": ("eight_digit",),
+    "fiat": ("eight_digit",),
+    "alfa romeo": ("eight_digit",),
+    "lancia": ("eight_digit",),
+}
+
+# Any other alphanumeric token with a digit; kept only if it passes is_candidate().
+GENERIC = r"(?=[A-Z]{0,19}\d)[A-Z0-9]{5,20}\b"
+
+# Title words that look like part numbers but are not.
+DEFAULT_STOPWORDS: FrozenSet[str] = frozenset(
+    {"4MATIC", "4MOTION", "XDRIVE", "SDRIVE", "QUATTRO", "MK2", "MK3", "MK4", "MK5", "MK6", "MK7", "MK8"}
+)
+
+# Model years and year ranges (2010, 2010-2015 collapses to 20102015), engine and unit figures.
+NOISE = re.compile(r"(?:19|20)\d{2}(?:(?:19|20)\d{2})?|\d+(?:KW|PS|HP|CV|CC|CCM|MM|CM|NM|KM|KG|AH|V|W|L)")
+
+_SEPARATORS = str.maketrans("", "", " .-")
+
+
+def normalize_oem(text: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", text.upper())
+
+
+def brand_key(brand: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", brand or "").strip().casefold()
+
+
+class OemTokenizer:
+    """Extracts normalized OEM part numbers from listing titles and page text.
+
+    Brand grammars are compiled once into a single alternation per brand, with
+    the generic token rule last, so one ``finditer`` pass tokenizes a text.
+    Unknown or missing brands use every grammar.
+    """
+
+    def __init__(self, stopwords: Iterable[str] = DEFAULT_STOPWORDS) -> None:
+        self.stopwords = frozenset(normalize_oem(word) for word in stopwords)
+        self.patterns: Dict[Tuple[str, ...], Pattern[str]] = {}
+
+    def grammars_for(self, brand: Optional[str]) -> Tuple[str, ...]:
+        specific = BRAND_GRAMMARS.get(brand_key(brand))
+        if specific is None:
+            return tuple(GRAMMARS)
+        return tuple(name for name in UNIVERSAL_GRAMMARS if name not in specific) + specific
+
+    def pattern(self, brand: Optional[str]) -> Pattern[str]:
+        grammars = self.grammars_for(brand)
+        compiled = self.patterns.get(grammars)
+        if compiled is None:
+            alternatives = [f"(?P<{name}>{GRAMMARS[name]})" for name in grammars]
+            alternatives.append(f"(?P<generic>{GENERIC})")
+            # One shared word-start guard instead of a \b in front of every alternative.
+            compiled = re.compile(rf"(?<![A-Z0-9])(?:{'|'.join(alternatives)})")
+            self.patterns[grammars] = compiled
+        return compiled
+
+    def is_candidate(self, token: str) -> bool:
+        if token in self.stopwords or NOISE.fullmatch(token):
+            return False
+        # Short all-digit tokens are prices, mileages and postcodes.
+        return not (token.isdigit() and len(token) < 7)
+
+    def _scan(self, upper_text: str, brand: Optional[str]) -> List[Tuple[int, str]]:
+        found: List[Tuple[int, str]] = []
+        stopwords = self.stopwords
+        is_candidate = self.is_candidate
+        for match in self.pattern(brand).finditer(upper_text):
+            token = match.group()
+            if match.lastgroup == "generic":
+                if not is_candidate(token):
+                    continue
+            else:
+                token = token.translate(_SEPARATORS)
+                if token in stopwords:
+                    continue
+            found.append((match.start(), token))
+        return found
+
+    def tokenize(self, text: str, brand: Optional[str] = None) -> List[str]:
+        """All OEM occurrences in ``text``, in order, duplicates included."""
+        return [token for _, token in self._scan(text.upper(), brand)]
+
+    def tokenize_many(self, texts: List[str], brand: Optional[str] = None) -> List[List[str]]:
+        """Tokenize many titles in one regex pass; returns one token list per text."""
+        results: List[List[str]] = [[] for _ in texts]
+        if not texts:
+            return results
+        # Uppercase first: offsets must be measured on the text that is scanned.
+        upper_texts = [text.upper().replace("\n", " ") for text in texts]
+        ends: List[int] = []
+        position = 0
+        for text in upper_texts:
+            position += len(text) + 1
+            ends.append(position)
+        index = 0
+        for start, token in self._scan("\n".join(upper_texts), brand):
+            # Matches arrive in text order, so the owning text only moves forward.
+            while start >= ends[index]:
+                index += 1
+            results[index].append(token)
+        return results
+
+    def unique(self, text: str, brand: Optional[str] = None) -> List[str]:
+        """OEMs in first-seen order without duplicates."""
+        return list(dict.fromkeys(self.tokenize(text, brand)))
+
+
+OEM_TOKENIZER = OemTokenizer()
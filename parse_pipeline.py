@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from parsed_document import PARSE_STATS
+
+T = TypeVar("T")
+
+# Parse worker processes. 0 parses inline on the fetching thread (the default);
+# "auto" uses one process per core.
+PARSE_WORKERS = os.environ.get("SCRAPER_PARSE_WORKERS", "0")
+
+
+def resolve_workers(value: str) -> int:
+    if str(value).strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(value))
+
+
+def _run_task(func: Callable[..., T], args: Tuple) -> Tuple[T, Dict[str, List[float]]]:
+    # Runs in the worker process. Parse timings recorded there are shipped back
+    # with the result so the parent's PARSE_STATS stays complete.
+    PARSE_STATS.reset()
+    result = func(*args)
+    return result, PARSE_STATS.snapshot()
+
+
+class ParsePipeline:
+    """Hands raw HTML to a process pool and returns the parsed records.
+
+    Parse functions must be module-level and take and return picklable values
+    (HTML strings in, ``listings`` records, dicts and lists out). At most ``max_pending`` parses are queued
+    or running; ``submit`` blocks and ``run_async``/``wait_ready`` wait when that
+    limit is reached, so fetchers slow down instead of piling up unparsed pages.
+    With ``workers=0`` every call runs inline, as before the pipeline existed.
+    Workers are spawned, not forked: the parent has fetch threads and open SQLite
+    connections by the time the pool starts, and a fork would copy their locks.
+    """
+
+    def __init__(self, workers: int = 0, max_pending: Optional[int] = None) -> None:
+        self.workers = max(0, workers)
+        self.max_pending = max(1, max_pending or self.workers * 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._async_slots: Optional[asyncio.Semaphore] = None
+        self.lock = threading.Lock()
+        self.counts: Dict[str, float] = {"submitted": 0, "completed": 0, "failed": 0, "blocked": 0, "blocked_seconds": 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def _record_blocked(self, seconds: float) -> None:
+        with self.lock:
+            self.counts["blocked"] += 1
+            self.counts["blocked_seconds"] += seconds
+
+    def _finish(self, future: Future) -> None:
+        with self.lock:
+            self.counts["failed" if future.exception() else "completed"] += 1
+
+    def _unwrap(self, future: Future) -> Future:
+        """Turn a ``_run_task`` future into one carrying only the parse result."""
+        result: Future = Future()
+
+        def transfer(done: Future) -> None:
+            self._finish(done)
+            if done.exception() is not None:
+                result.set_exception(done.exception())
+                return
+            value, kinds = done.result()
+            PARSE_STATS.merge(kinds)
+            result.set_result(value)
+
+        future.add_done_callback(transfer)
+        return result
+
+    def submit(self, func: Callable[..., T], *args) -> "Future[T]":
+        """Queue one parse, blocking while ``max_pending`` parses are outstanding."""
+        with self.lock:
+            self.counts["submitted"] += 1
+        if not self.enabled:
+            inline: Future = Future()
+            try:
+                inline.set_result(func(*args))
+            except Exception as exc:
+                inline.set_exception(exc)
+            self._finish(inline)
+            return inline
+        if not self._slots.acquire(blocking=False):
+            started = time.perf_counter()
+            self._slots.acquire()
+            self._record_blocked(time.perf_counter() - started)
+        try:
+            future = self.executor().submit(_run_task, func, args)
+        except BaseException:
+            # E.g. BrokenProcessPool: the slot was never handed to a parse.
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return self._unwrap(future)
+
+    async def run_async(self, func: Callable[..., T], *args) -> T:
+        """Asyncio counterpart of ``submit`` for the concurrent crawl engine."""
+        if not self.enabled:
+            return self.submit(func, *args).result()
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_pending)
+        if self._async_slots.locked():
+            started = time.perf_counter()
+            await self._async_slots.acquire()
+            self._record_blocked(time.perf_counter() - started)
+        else:
+            await self._async_slots.acquire()
+        try:
+            with self.lock:
+                self.counts["submitted"] += 1
+            future = self._unwrap(self.executor().submit(_run_task, func, args))
+            return await asyncio.wrap_future(future)
+        finally:
+            self._async_slots.release()
+
+    async def wait_ready(self) -> None:
+        """Wait until the parse stage has room; fetchers call this before a request."""
+        if not self.enabled or self._async_slots is None or not self._async_slots.locked():
+            return
+        started = time.perf_counter()
+        async with self._async_slots:
+            pass
+        self._record_blocked(time.perf_counter() - started)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        mode = f"workers={self.workers} max_pending={self.max_pending}" if self.enabled else "inline"
+        return (
+            f"{mode} submitted={int(counts['submitted'])} completed={int(counts['completed'])} "
+            f"failed={int(counts['failed'])} backpressure_waits={int(counts['blocked'])} "
+            f"({counts['blocked_seconds']:.1f}s)"
+        )
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Dict, List, Union
+
+from bs4 import BeautifulSoup
+
+
+class ParseStats:
+    """Parse count and CPU time per page kind, e.g. ``autoplius.detail``."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.kinds: Dict[str, List[float]] = {}
+
+    def add(self, kind: str, seconds: float) -> None:
+        with self.lock:
+            entry = self.kinds.setdefault(kind, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        with self.lock:
+            return {kind: list(entry) for kind, entry in self.kinds.items()}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.kinds.clear()
+
+    def merge(self, kinds: Dict[str, List[float]]) -> None:
+        """Fold in counters collected elsewhere, e.g. by a parse worker process."""
+        with self.lock:
+            for kind, (count, total, peak) in kinds.items():
+                entry = self.kinds.setdefault(kind, [0, 0.0, 0.0])
+                entry[0] += count
+                entry[1] += total
+                entry[2] = max(entry[2], peak)
+
+    def report(self) -> str:
+        with self.lock:
+            return " ".join(
+                f"{kind}: pages={int(count)} total={total:.2f}s avg={total / count * 1000:.1f}ms max={peak * 1000:.1f}ms"
+                for kind, (count, total, peak) in sorted(self.kinds.items())
+            )
+
+
+PARSE_STATS = ParseStats()
+
+
+class ParsedDocument:
+    """A fetched page parsed exactly once and handed between parsing stages."""
+
+    __slots__ = ("url", "html", "soup", "kind", "parse_seconds")
+
+    def __init__(self, url: str, html: str, soup: BeautifulSoup, kind: str, parse_seconds: float) -> None:
+        self.url = url
+        self.html = html
+        self.soup = soup
+        self.kind = kind
+        self.parse_seconds = parse_seconds
+
+    @classmethod
+    def parse(cls, html: str, url: str = "", kind: str = "page", features: str = "lxml") -> "ParsedDocument":
+        started = time.perf_counter()
+        soup = BeautifulSoup(html, features)
+        elapsed = time.perf_counter() - started
+        PARSE_STATS.add(kind, elapsed)
+        return cls(url, html, soup, kind, elapsed)
+
+
+def as_document(
+    source: Union[str, ParsedDocument], kind: str = "page", features: str = "lxml"
+) -> ParsedDocument:
+    """Accept either raw HTML or an already parsed document."""
+    if isinstance(source, ParsedDocument):
+        return source
+    return ParsedDocument.parse(source, kind=kind, features=features)
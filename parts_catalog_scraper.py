@@ -1,14 +1,25 @@
-import json
 import random
 import re
-import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from urllib.parse import quote_plus, urljoin
 
 import requests
 from bs4 import BeautifulSoup
 
+from catalog_store import PART_KEYS, CatalogStore, open_store
+from checkpoints import CHECKPOINTS
+from http_cache import RESPONSE_CACHE
+from http_fetch import fetch_text
+from http_session import SESSIONS, get_session
+from log_writer import LOG_WRITER, get_logger
+from listings import RecordList, RrrPart
+from oem_index import OEM_INDEX
+from oem_tokenizer import OEM_TOKENIZER
+from parse_pipeline import PARSE_WORKERS, ParsePipeline, resolve_workers
+from parsed_document import PARSE_STATS, ParsedDocument, as_document
+
 PARTS = [
     "engine",
     "turbo",
@@ -36,22 +47,17 @@ USER_AGENTS = [
 ]
 
 DATA_PATH = Path("parts_catalog.json")
+DATA_STORE = open_store(DATA_PATH, PART_KEYS)
 LOG_PATH = Path("autoplius_log.txt")
+LOG = get_logger("parts_catalog", LOG_PATH)
 BASE_SEARCH_URL = "https://rrr.lt/paieska/?q={query}"
 
 
 # Logging ---------------------------------------------------------------------
 
-def timestamp() -> str:
-    return time.strftime("%Y-%m-%d %H:%M:%S")
-
-
 def log(message: str) -> None:
-    try:
-        with LOG_PATH.open("a", encoding="utf-8") as fh:
-            fh.write(f"[{timestamp()}] {message}\n")
-    except Exception:
-        pass
+    """Queue an INFO line for the shared log writer (``log_writer``)."""
+    LOG.info(message)
 
 
 # HTTP helpers ----------------------------------------------------------------
@@ -65,28 +71,13 @@ def random_headers() -> Dict[str, str]:
 
 
 def request_with_retry(url: str, session: requests.Session) -> Optional[str]:
-    for attempt in range(1, 6):
-        sleep_seconds = random.uniform(1.0, 2.5)
-        log(f"Sleeping {sleep_seconds:.2f}s before request attempt {attempt} URL={url}")
-        time.sleep(sleep_seconds)
-        try:
-            response = session.get(url, headers=random_headers(), timeout=25)
-            if response.status_code == 200:
-                log(f"Request success attempt={attempt} status=200 URL={url}")
-                return response.text
-            log(f"Non-200 status={response.status_code} attempt={attempt} URL={url}")
-        except requests.RequestException as exc:
-            log(f"Request exception attempt={attempt} URL={url} exc={exc!r}")
-    log(f"Failed all retries for URL={url}")
-    return None
+    return fetch_text(
+        url, session, headers=random_headers, timeout=25, log=LOG.info, log_debug=LOG.debug, log_error=LOG.error
+    )
 
 
 # Parsing helpers -------------------------------------------------------------
 
-def normalize_oem(text: str) -> str:
-    return re.sub(r"[^A-Z0-9]", "", text.upper())
-
-
 def parse_price(text: str) -> Optional[float]:
     match = re.search(r"([0-9]+(?:[.,][0-9]+)?)", text)
     if not match:
@@ -97,8 +88,125 @@ def parse_price(text: str) -> Optional[float]:
         return None
 
 
-def extract_listing_cards(html: str) -> List[BeautifulSoup]:
-    soup = BeautifulSoup(html, "lxml")
+# Detail page regions. The product block is located first (the best marked element
+# around the page's <h1>, so related-product cards and nav items never win); OEM numbers are read
+# from its labelled spec rows, OEM blocks and title before falling back to its
+# text with site chrome removed, so navigation and footer numbers never count.
+# Matching is done on tag names and attributes in one traversal; CSS selectors
+# would walk the block once per selector.
+PRODUCT_CLASSES = {"product-page", "product-details", "product"}
+OEM_BLOCK_CLASSES = {"oem", "oem-codes", "oem-numbers"}
+OEM_ITEMPROPS = {"mpn", "sku"}
+GALLERY_CLASSES = {"gallery", "product-gallery", "product-image", "swiper"}
+OEM_LABELS = ("oem", "kodas", "numeris", "originalus", "part number", "code")
+CHROME_TAGS = ["nav", "header", "footer", "aside", "form", "script", "style", "noscript"]
+
+
+def block_rank(tag) -> int:
+    """0 for a schema.org Product, 1 for the main content, 2 for a product class, 3 otherwise."""
+    if "Product" in (tag.get("itemtype") or ""):
+        return 0
+    if tag.name == "main" or tag.get("id") == "content":
+        return 1
+    return 2 if not PRODUCT_CLASSES.isdisjoint(tag.get("class") or ()) else 3
+
+
+def product_block(soup: BeautifulSoup):
+    """The best ranked (then outermost) element containing the page's <h1>, or in the page if it has none."""
+    title = soup.find("h1")
+    candidates = list(title.parents)[::-1] if title else soup.find_all(lambda tag: block_rank(tag) < 3)
+    ranked = [tag for tag in candidates if block_rank(tag) < 3]
+    return min(ranked, key=block_rank) if ranked else None
+
+
+def image_source(tag) -> str:
+    candidate = tag.get("data-src") or tag.get("src") or ""
+    return candidate if candidate.startswith("http") else ""
+
+
+def in_gallery(tag, depth: int = 3) -> bool:
+    parent = tag.parent
+    for _ in range(depth):
+        if parent is None:
+            return False
+        if not GALLERY_CLASSES.isdisjoint(parent.get("class") or ()):
+            return True
+        parent = parent.parent
+    return False
+
+
+class DetailRegions:
+    """Product block, spec rows, OEM blocks, price and gallery of a detail page.
+
+    The block is located once and walked once: ``specs`` holds every
+    ``<dt>``/``<th>`` label (lowercased) with the text of its ``<dd>``/``<td>``,
+    ``oem_blocks`` the text of elements marked as OEM lists, and the first
+    gallery image wins over the first other absolute image in the block.
+    ``terms`` keeps the ``<dt>`` rows alone with their ``<dd>`` text unspaced,
+    which is what ``spec`` reads model and year from.
+    """
+
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self.soup = soup
+        self.main = product_block(soup) or soup.body or soup
+        self.specs: List[Tuple[str, str]] = []
+        self.terms: List[Tuple[str, str]] = []
+        self.oem_blocks: List[str] = []
+        self.title = None
+        self.price = None
+        gallery_image = first_image = ""
+        for tag in self.main.find_all(True):
+            name = tag.name
+            if name in ("dt", "th"):
+                value = tag.find_next_sibling("dd" if name == "dt" else "td")
+                if value is not None:
+                    label = tag.get_text(strip=True).lower()
+                    self.specs.append((label, value.get_text(" ", strip=True)))
+                    if name == "dt":
+                        self.terms.append((label, value.get_text(strip=True)))
+            elif name == "img":
+                if not gallery_image:
+                    candidate = image_source(tag)
+                    if candidate and in_gallery(tag):
+                        gallery_image = candidate
+                    elif candidate and not first_image:
+                        first_image = candidate
+            elif name == "h1":
+                self.title = self.title or tag
+            else:
+                classes = tag.get("class") or ()
+                itemprop = tag.get("itemprop")
+                if self.price is None and ("price" in classes or itemprop == "price"):
+                    self.price = tag
+                elif itemprop in OEM_ITEMPROPS or not OEM_BLOCK_CLASSES.isdisjoint(classes):
+                    self.oem_blocks.append(tag.get_text(" ", strip=True))
+        self.image_url = gallery_image or first_image
+
+    def spec(self, labels: List[str]) -> Optional[str]:
+        """Value of the last ``<dt>`` row whose label contains one of ``labels``."""
+        for label_text, value in reversed(self.terms):
+            if any(label in label_text for label in labels):
+                return value
+        return None
+
+    def oems(self, brand: Optional[str] = None) -> List[str]:
+        """OEM numbers in priority order: labelled rows, OEM blocks, title, other specs."""
+        labelled = [value for label, value in self.specs if any(word in label for word in OEM_LABELS)]
+        title = self.title or self.soup.find("h1")
+        primary = labelled + self.oem_blocks + ([title.get_text(" ", strip=True)] if title else [])
+        found = [token for text in primary for token in OEM_TOKENIZER.tokenize(text, brand)]
+        if not found:
+            others = [value for label, value in self.specs if not any(word in label for word in OEM_LABELS)]
+            found = [token for text in others for token in OEM_TOKENIZER.tokenize(text, brand)]
+        if not found:
+            for tag in self.main.find_all(CHROME_TAGS):
+                tag.decompose()
+            found = OEM_TOKENIZER.tokenize(self.main.get_text(" ", strip=True), brand)
+        return found
+
+
+def extract_listing_cards(source: Union[str, ParsedDocument]) -> List[BeautifulSoup]:
+    soup = as_document(source, kind="rrr.search").soup
     cards = soup.select(".products .product, .item, .products-item")
     return cards or soup.select("article")
 
@@ -121,17 +229,23 @@ def parse_listing_card(card: BeautifulSoup, base_url: str) -> Dict[str, str]:
     }
 
 
-def parse_detail_page(url: str, session: requests.Session, fallback: Dict[str, object]) -> Optional[Dict[str, object]]:
+def parse_detail_page(url: str, session: requests.Session, fallback: Dict[str, object]) -> Optional[RrrPart]:
     html = request_with_retry(url, session)
     if not html:
         return None
-    soup = BeautifulSoup(html, "lxml")
+    return parse_detail_html(html, url, fallback)
+
+
+def parse_detail_html(html: str, url: str, fallback: Dict[str, object]) -> RrrPart:
+    """Build the part record from a fetched detail page; runs in parse workers too."""
+    soup = ParsedDocument.parse(html, url, kind="rrr.detail").soup
+    regions = DetailRegions(soup)
 
     title = soup.find("h1")
     title_text = title.get_text(" ", strip=True) if title else fallback.get("title", "")
 
     price = None
-    price_tag = soup.select_one(".price, [itemprop='price']")
+    price_tag = regions.price or soup.select_one(".price, [itemprop='price']")
     if price_tag:
         price = parse_price(price_tag.get_text(" ", strip=True))
     if price is None:
@@ -139,113 +253,122 @@ def parse_detail_page(url: str, session: requests.Session, fallback: Dict[str, o
 
     currency = "EUR"
 
+    model = regions.spec(["model", "automobil"]) or ""
+    year = None
+    year_text = regions.spec(["year", "metai"])
+    if year_text:
+        years = re.findall(r"\d{4}", year_text)
+        year = int(years[0]) if years else None
+
     oem_main = ""
     oem_cross: List[str] = []
-    specs_text = soup.get_text(" ", strip=True)
-    oem_candidates = [normalize_oem(token) for token in re.findall(r"[A-Z0-9]{4,}", specs_text)]
+    oem_candidates = regions.oems(model.split(" ")[0] if model else None)
     if oem_candidates:
         oem_main = oem_candidates[0]
-        oem_cross = sorted(set(oem_candidates[1:]))
+        oem_cross = sorted(set(oem_candidates[1:]) - {oem_main})
 
-    model = ""
-    year = None
-    for dt in soup.select("dt"):
-        label = dt.get_text(strip=True).lower()
-        dd = dt.find_next_sibling("dd")
-        value = dd.get_text(strip=True) if dd else ""
-        if "model" in label or "automobil" in label:
-            model = value
-        if "year" in label or "metai" in label:
-            try:
-                year = int(re.findall(r"\d{4}", value)[0])
-            except Exception:
-                year = None
-
-    image_url = fallback.get("image_url", "")
-    gallery = soup.select("img")
-    for img in gallery:
-        candidate = img.get("data-src") or img.get("src") or ""
-        if candidate.startswith("http"):
-            image_url = candidate
-            break
-
-    return {
-        "oem_main": oem_main,
-        "oem_cross_refs": oem_cross,
-        "price": price,
-        "currency": currency,
-        "model": model,
-        "year": year,
-        "image_url": image_url,
-        "url": url,
-        "title": title_text,
-    }
+    return RrrPart(
+        oem_main=oem_main,
+        oem_cross_refs=oem_cross,
+        price=price,
+        currency=currency,
+        model=model,
+        year=year,
+        image_url=regions.image_url or fallback.get("image_url", ""),
+        url=url,
+        title=title_text,
+    )
 
 
 # Persistence -----------------------------------------------------------------
 
-def load_existing() -> Dict:
-    if DATA_PATH.exists():
-        try:
-            return json.loads(DATA_PATH.read_text(encoding="utf-8"))
-        except Exception as exc:
-            log(f"Failed to load existing parts catalog: {exc!r}")
-            return {}
-    return {}
+def load_existing() -> CatalogStore:
+    try:
+        return DATA_STORE.load()
+    except Exception as exc:
+        log(f"Failed to load existing parts catalog: {exc!r}")
+        return DATA_STORE
 
 
-def save_data(data: Dict) -> None:
+def save_data(data: CatalogStore) -> None:
     try:
-        DATA_PATH.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        data.save()
+        OEM_INDEX.save()
         log("parts_catalog.json saved")
     except Exception as exc:
         log(f"Failed to save parts catalog: {exc!r}")
 
 
+def checkpoint_data(data: CatalogStore) -> None:
+    """Hand new records to the background checkpoint thread; it fsyncs and compacts parts_catalog.json."""
+    try:
+        if data.checkpoint():
+            log("parts_catalog.json checkpoint queued")
+        OEM_INDEX.checkpoint()
+    except Exception as exc:
+        log(f"Failed to save parts catalog: {exc!r}")
+
+
 # Scraper ---------------------------------------------------------------------
 
-def scrape_part(part: str, session: requests.Session) -> List[Dict[str, object]]:
+def scrape_part(
+    part: str, session: requests.Session, pipeline: Optional[ParsePipeline] = None
+) -> RecordList:
+    pipeline = pipeline or ParsePipeline()
     log(f"Starting part search {part}")
     encoded = quote_plus(part)
     url = BASE_SEARCH_URL.format(query=encoded)
     html = request_with_retry(url, session)
     if not html:
-        return []
+        return RecordList(RrrPart)
 
-    cards = extract_listing_cards(html)
-    results: List[Dict[str, object]] = []
+    doc = ParsedDocument.parse(html, url, kind="rrr.search")
+    log(f"Parsed search page for part={part} in {doc.parse_seconds * 1000:.1f}ms")
+    cards = extract_listing_cards(doc)
+    # Detail pages are fetched here and parsed by the pipeline while the next one downloads.
+    queued: List[Future] = []
     for card in cards:
         summary = parse_listing_card(card, url)
         if not summary.get("url"):
             continue
-        detail = parse_detail_page(summary["url"], session, summary)
-        if not detail:
+        html = request_with_retry(summary["url"], session)
+        if not html:
             continue
-        results.append(detail)
+        queued.append(pipeline.submit(parse_detail_html, html, summary["url"], summary))
+    results = RecordList(RrrPart, (parsed.result() for parsed in queued))
     log(f"Finished part {part} with {len(results)} listings")
     return results
 
 
 def main() -> None:
     LOG_PATH.touch(exist_ok=True)
-    session = requests.Session()
+    session = get_session()
+    pipeline = ParsePipeline(resolve_workers(PARSE_WORKERS))
     data = load_existing()
 
     for part in PARTS:
         try:
-            part_results = scrape_part(part, session)
+            part_results = scrape_part(part, session, pipeline)
             if part_results:
-                data.setdefault(part, [])
-                data[part] = part_results
-                save_data(data)
+                data.set([part], part_results)
+                OEM_INDEX.add_listings(part_results, "rrr", part=part)
+                checkpoint_data(data)
         except KeyboardInterrupt:
             log("KeyboardInterrupt received, saving and exiting")
             break
         except Exception as exc:
             log(f"Unhandled exception while scraping part={part}: {exc!r}")
-            save_data(data)
 
     save_data(data)
+    pipeline.shutdown()
+    log(f"HTTP cache {RESPONSE_CACHE.report()}")
+    log(f"HTTP connections {SESSIONS.report()}")
+    log(f"HTML parsing {PARSE_STATS.report()}")
+    log(f"Parse pipeline {pipeline.report()}")
+    log(f"Data store {data.report()}")
+    log(f"OEM index {OEM_INDEX.report()}")
+    log(f"Checkpoints {CHECKPOINTS.report()}")
+    log(f"Log writer {LOG_WRITER.report()}")
     log("Parts scraping completed")
 
 
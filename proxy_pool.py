@@ -0,0 +1,116 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Exponentially weighted moving average factor for latency and error rate.
+EWMA_ALPHA = 0.2
+
+
+def parse_proxy_list(values: Iterable[str]) -> List[str]:
+    """Flatten comma/newline separated proxy URLs and ``@file`` references."""
+    proxies: List[str] = []
+    for value in values:
+        if not value:
+            continue
+        if value.startswith("@"):
+            lines = Path(value[1:]).read_text(encoding="utf-8").splitlines()
+            proxies.extend(parse_proxy_list(line for line in lines if not line.strip().startswith("#")))
+            continue
+        for chunk in value.replace("\n", ",").split(","):
+            chunk = chunk.strip()
+            if chunk and chunk not in proxies:
+                proxies.append(chunk)
+    return proxies
+
+
+class ProxyState:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.cooldown_until = 0.0
+
+    def score(self) -> float:
+        # Lower is better: fast, reliable, idle proxies are picked first.
+        return (self.latency or 1.0) * (1 + 4 * self.error_rate) * (1 + self.in_flight)
+
+
+class ProxyPool:
+    """Rotates requests across several proxies by health score.
+
+    Each proxy tracks an EWMA of latency and error rate. A proxy that fails
+    ``failure_threshold`` times in a row is benched for ``cooldown`` seconds, and
+    no proxy ever carries more than ``max_per_proxy`` requests at once; callers
+    block in ``acquire`` until a slot frees up and report the outcome via ``release``.
+    """
+
+    def __init__(
+        self,
+        proxies: List[str],
+        max_per_proxy: int = 2,
+        failure_threshold: int = 3,
+        cooldown: float = 120.0,
+    ) -> None:
+        if not proxies:
+            raise ValueError("ProxyPool needs at least one proxy")
+        self.states: Dict[str, ProxyState] = {url: ProxyState(url) for url in proxies}
+        self.max_per_proxy = max_per_proxy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.condition = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def _pick(self) -> Optional[ProxyState]:
+        now = time.monotonic()
+        available = [
+            state
+            for state in self.states.values()
+            if state.in_flight < self.max_per_proxy and state.cooldown_until <= now
+        ]
+        if not available:
+            return None
+        return min(available, key=lambda state: (state.score(), state.requests))
+
+    def acquire(self) -> str:
+        """Reserve a slot on the healthiest available proxy and return its URL."""
+        with self.condition:
+            while True:
+                state = self._pick()
+                if state is not None:
+                    state.in_flight += 1
+                    state.requests += 1
+                    return state.url
+                now = time.monotonic()
+                cooling = [s.cooldown_until - now for s in self.states.values() if s.cooldown_until > now]
+                self.condition.wait(timeout=min(cooling) if cooling else None)
+
+    def release(self, url: str, ok: bool, latency: float) -> None:
+        with self.condition:
+            state = self.states[url]
+            state.in_flight -= 1
+            state.latency = latency if not state.latency else (1 - EWMA_ALPHA) * state.latency + EWMA_ALPHA * latency
+            state.error_rate = (1 - EWMA_ALPHA) * state.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+            if ok:
+                state.consecutive_failures = 0
+            else:
+                state.failures += 1
+                state.consecutive_failures += 1
+                if state.consecutive_failures >= self.failure_threshold:
+                    state.cooldown_until = time.monotonic() + self.cooldown
+                    state.consecutive_failures = 0
+            self.condition.notify_all()
+
+    def report(self) -> str:
+        with self.condition:
+            return " ".join(
+                f"{state.url}: requests={state.requests} failures={state.failures} "
+                f"latency={state.latency:.2f}s error_rate={state.error_rate:.0%}"
+                for state in self.states.values()
+            )
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import random
+import re
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Query variants issued per brand/model/part, in order. The empty suffix is the base
+# query and is never dropped.
+QUERY_SUFFIXES: Tuple[str, ...] = ("", "OEM", "replacement")
+STATS_PATH = Path("query_stats.json")
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+def listing_oems(listings: Iterable[Dict[str, object]]) -> Set[str]:
+    collected: Set[str] = set()
+    for entry in listings:
+        main = entry.get("oem_main")
+        if main:
+            collected.add(str(main).upper())
+        for cross in entry.get("oem_cross_refs", []) or []:
+            collected.add(str(cross).upper())
+    return collected
+
+
+class QueryPlanner:
+    """Plans eBay queries per brand/model/part and coalesces duplicate work.
+
+    - Duplicate queries (after whitespace/case normalization) in a plan are collapsed.
+    - Identical queries in flight at the same time share one fetch (``run`` for
+      threads, ``run_async`` for the asyncio engine). Callers pass whatever else the
+      result depends on, such as the eBay domain, as ``scope``.
+    - For every part, the planner tracks how many OEMs each suffixed variant adds
+      on top of the base query. Once a variant has ``min_samples`` observations and
+      averages fewer than ``min_new_oems`` new OEMs per query, it is dropped from
+      plans, except for an ``explore`` fraction that keeps its statistics current.
+      The statistics persist in ``stats_path`` across runs.
+    """
+
+    def __init__(
+        self,
+        suffixes: Tuple[str, ...] = QUERY_SUFFIXES,
+        stats_path: Optional[Path] = STATS_PATH,
+        min_samples: int = 20,
+        min_new_oems: float = 0.25,
+        explore: float = 0.1,
+    ) -> None:
+        self.suffixes = suffixes
+        self.stats_path = stats_path
+        self.min_samples = min_samples
+        self.min_new_oems = min_new_oems
+        self.explore = explore
+        self.lock = threading.Lock()
+        self.in_flight: Dict[Tuple[str, Hashable], Future] = {}
+        self.in_flight_async: Dict[Tuple[str, Hashable], "asyncio.Future"] = {}
+        self.counts: Dict[str, int] = {"planned": 0, "collapsed": 0, "coalesced": 0, "dropped": 0, "fetched": 0}
+        # part -> suffix -> [queries observed, new OEMs contributed]
+        self.variant_stats: Dict[str, Dict[str, List[int]]] = self.load_stats()
+
+    # Persistence ---------------------------------------------------------------
+
+    def load_stats(self) -> Dict[str, Dict[str, List[int]]]:
+        if not self.stats_path or not self.stats_path.exists():
+            return {}
+        try:
+            return json.loads(self.stats_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def save_stats(self) -> None:
+        if not self.stats_path:
+            return
+        with self.lock:
+            payload = json.dumps(self.variant_stats, indent=2, sort_keys=True)
+        temp_path = self.stats_path.with_suffix(".tmp")
+        temp_path.write_text(payload, encoding="utf-8")
+        temp_path.replace(self.stats_path)
+
+    # Planning ------------------------------------------------------------------
+
+    def variant_is_useful(self, part: str, suffix: str) -> bool:
+        observed, new_oems = self.variant_stats.get(part, {}).get(suffix, [0, 0])
+        if observed < self.min_samples:
+            return True
+        return new_oems / observed >= self.min_new_oems
+
+    def plan(self, brand: str, model: str, part: str) -> List[Tuple[str, str]]:
+        """Return ``[(suffix, query), ...]`` for one brand/model/part, base query first."""
+        planned: List[Tuple[str, str]] = []
+        seen: Set[str] = set()
+        with self.lock:
+            for suffix in self.suffixes:
+                query = " ".join(token for token in (brand, model, part, suffix) if token)
+                key = normalize_query(query)
+                if key in seen:
+                    self.counts["collapsed"] += 1
+                    continue
+                if suffix and not self.variant_is_useful(part, suffix) and random.random() >= self.explore:
+                    self.counts["dropped"] += 1
+                    continue
+                seen.add(key)
+                planned.append((suffix, query))
+            self.counts["planned"] += len(planned)
+        return planned
+
+    def record_yields(self, part: str, results: List[Tuple[str, List[Dict[str, object]]]]) -> None:
+        """Record how many OEMs each suffixed variant found beyond the base query.
+
+        ``results`` holds ``(suffix, listings)`` pairs in query order.
+        """
+        base = next((listings for suffix, listings in results if not suffix), None)
+        if base is None:
+            return
+        base_oems = listing_oems(base)
+        with self.lock:
+            part_stats = self.variant_stats.setdefault(part, {})
+            for suffix, listings in results:
+                if not suffix:
+                    continue
+                observed = part_stats.setdefault(suffix, [0, 0])
+                observed[0] += 1
+                observed[1] += len(listing_oems(listings) - base_oems)
+
+    # Coalescing ----------------------------------------------------------------
+
+    def run(self, query: str, fetch: Callable[[], T], scope: Hashable = None) -> T:
+        """Run ``fetch`` once for all threads asking for the same query and scope at the same time."""
+        key = (normalize_query(query), scope)
+        with self.lock:
+            pending = self.in_flight.get(key)
+            if pending is None:
+                pending = Future()
+                self.in_flight[key] = pending
+                owner = True
+                self.counts["fetched"] += 1
+            else:
+                owner = False
+                self.counts["coalesced"] += 1
+        if not owner:
+            return pending.result()
+        try:
+            pending.set_result(fetch())
+        except BaseException as exc:
+            pending.set_exception(exc)
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+        return pending.result()
+
+    async def run_async(self, query: str, fetch: Callable[[], Awaitable[T]], scope: Hashable = None) -> T:
+        """Asyncio counterpart of ``run`` for the concurrent crawl engine."""
+        key = (normalize_query(query), scope)
+        pending = self.in_flight_async.get(key)
+        if pending is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(pending)
+        self.counts["fetched"] += 1
+        pending = asyncio.ensure_future(fetch())
+        self.in_flight_async[key] = pending
+        pending.add_done_callback(lambda _: self.in_flight_async.pop(key, None))
+        return await asyncio.shield(pending)
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+            dropped_variants = sorted(
+                f"{part}/{suffix}"
+                for part, suffixes in self.variant_stats.items()
+                for suffix in suffixes
+                if not self.variant_is_useful(part, suffix)
+            )
+        summary = " ".join(f"{name}={value}" for name, value in counts.items())
+        return f"{summary} low_yield_variants={','.join(dropped_variants) or '-'}"
@@ -0,0 +1,127 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Requests-per-second budget and burst size for every host we crawl. Hosts are keyed
+# without the "www." prefix; every *.wikipedia.org language edition shares one bucket.
+HOST_RATES: Dict[str, Tuple[float, int]] = {
+    "ebay.com": (1.0, 3),
+    "ebay.de": (1.0, 3),
+    "ebay.co.uk": (1.0, 3),
+    "autoplius.lt": (0.6, 2),
+    "otomoto.pl": (0.8, 2),
+    "rrr.lt": (0.6, 2),
+    "wikipedia": (2.0, 4),
+}
+DEFAULT_RATE: Tuple[float, int] = (0.5, 1)
+# Extra random delay added to a wait, as a fraction of one token interval.
+JITTER = 0.3
+
+
+def host_key(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host == "wikipedia.org" or host.endswith(".wikipedia.org"):
+        return "wikipedia"
+    for known in HOST_RATES:
+        if host == known or host.endswith("." + known):
+            return known
+    return host
+
+
+def parse_rate_overrides(spec: str) -> Dict[str, Tuple[float, int]]:
+    """Parse ``host=rate[:burst]`` pairs, e.g. ``ebay.de=2:4,rrr.lt=0.5``."""
+    overrides: Dict[str, Tuple[float, int]] = {}
+    for chunk in spec.split(","):
+        if "=" not in chunk:
+            continue
+        host, value = chunk.split("=", 1)
+        rate_text, _, burst_text = value.partition(":")
+        try:
+            rate = float(rate_text)
+            burst = int(burst_text) if burst_text else 1
+        except ValueError:
+            continue
+        if rate > 0:
+            overrides[host.strip().lower()] = (rate, max(1, burst))
+    return overrides
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it.
+
+        The balance may go negative, which queues concurrent callers one interval
+        apart instead of letting them all wake up at the same moment.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class RateLimiter:
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None, jitter: float = JITTER) -> None:
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        self.jitter = jitter
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.waited: Dict[str, float] = {}
+        # Processes sharing each budget, see ``split``.
+        self.shares = 1
+        self.lock = threading.Lock()
+
+    def split(self, shares: int) -> None:
+        """Give this process ``1/shares`` of every host's rate and burst, for processes crawling side by side."""
+        with self.lock:
+            self.shares = max(1, shares)
+            self.buckets.clear()
+
+    def set_rate(self, host: str, rate: float, burst: int = 1) -> None:
+        with self.lock:
+            self.rates[host] = (rate, burst)
+            for key in [key for key in self.buckets if key == host or key.startswith(host + "@")]:
+                del self.buckets[key]
+
+    def bucket(self, host: str, scope: str = "") -> TokenBucket:
+        key = f"{host}@{scope}" if scope else host
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                rate, burst = self.rates.get(host, DEFAULT_RATE)
+                bucket = TokenBucket(rate / self.shares, max(1, burst // self.shares))
+                self.buckets[key] = bucket
+            return bucket
+
+    def wait(self, url: str, scope: str = "") -> float:
+        """Block until the host of ``url`` has budget for one request; return the delay.
+
+        ``scope`` splits a host's budget further, e.g. one bucket per egress proxy.
+        """
+        host = host_key(url)
+        bucket = self.bucket(host, scope)
+        delay = bucket.reserve()
+        if delay <= 0:
+            return 0.0
+        delay += random.uniform(0, self.jitter / bucket.rate)
+        with self.lock:
+            self.waited[host] = self.waited.get(host, 0.0) + delay
+        time.sleep(delay)
+        return delay
+
+
+RATE_LIMITER = RateLimiter({**HOST_RATES, **parse_rate_overrides(os.environ.get("SCRAPER_RATE_LIMITS", ""))})
@@ -0,0 +1,370 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from listings import encode_record
+
+# The dataset file is rewritten once the log has grown to this fraction of it
+# (and at least COMPACT_MIN_BYTES), so compaction stays amortized O(new records).
+COMPACT_RATIO = float(os.environ.get("SCRAPER_WAL_COMPACT_RATIO", "0.5"))
+COMPACT_MIN_BYTES = int(float(os.environ.get("SCRAPER_WAL_COMPACT_MIN_MB", "4")) * 1024 * 1024)
+# fsync after every appended record. Off by default: a crash then loses at most
+# what the OS had not written yet, never the records before it.
+FSYNC_EVERY_RECORD = os.environ.get("SCRAPER_WAL_FSYNC", "0") not in {"0", "false", "no", "off"}
+
+
+def snapshot_digest(raw: bytes) -> str:
+    # A missing file and an empty "{}" placeholder are the same base.
+    stripped = raw.strip()
+    return hashlib.sha1(raw).hexdigest() if stripped and stripped != b"{}" else ""
+
+
+def header_base(path: Path) -> Optional[str]:
+    """The dataset digest a log file was started for, or None for a missing or torn header."""
+    try:
+        with path.open("rb") as fh:
+            header = fh.readline()
+        return json.loads(header).get("base") if header.endswith(b"\n") else None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def fsync_directory(path: Path) -> None:
+    """Make renames inside ``path`` durable; a no-op where directories cannot be opened."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Apply one log record to the in-memory dataset."""
+    keys = record["keys"]
+    parent = data
+    for key in keys[:-1]:
+        parent = parent.setdefault(key, {})
+    if record["op"] == "set":
+        parent[keys[-1]] = record["value"]
+    elif record["op"] == "extend":
+        parent.setdefault(keys[-1], []).extend(record["value"])
+    else:
+        raise ValueError(f"Unknown record op: {record['op']!r}")
+
+
+class DigestWriter:
+    """Binary file wrapper that keeps the base digest of what is written through it."""
+
+    def __init__(self, fh: BinaryIO) -> None:
+        self.fh = fh
+        self.sha1 = hashlib.sha1()
+        self.head = b""
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha1.update(data)
+        if len(self.head) < 64:
+            self.head += data[: 64 - len(self.head)]
+        self.size += len(data)
+        return self.fh.write(data)
+
+    def digest(self) -> str:
+        return snapshot_digest(self.head) if self.size <= len(self.head) else self.sha1.hexdigest()
+
+
+class RecordLog:
+    """Append-only JSON-lines log in front of a JSON dataset file.
+
+    Every unit of work is appended to ``<name>.wal.jsonl`` as one record:
+    ``set`` replaces the value at a key path (a brand/model/part listing list) and
+    ``extend`` appends entries to the list at a key path (a brand's listings).
+    ``load`` reads the dataset file and replays the log on top of it.
+    ``checkpoint`` compacts the log into the dataset file, in the usual indented
+    layout, once it has grown large enough; ``compact`` does so unconditionally.
+
+    The log's first line names the SHA-1 of the dataset file it applies to. A
+    compaction writes the records appended while it serialized into
+    ``<name>.wal.jsonl.next`` (based on the new file) before replacing the dataset
+    file, then renames it over the log. A crash between the two renames leaves a
+    log whose base no longer matches, and ``load`` picks up the next log instead
+    of replaying the old one twice.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        compact_ratio: float = COMPACT_RATIO,
+        compact_min_bytes: int = COMPACT_MIN_BYTES,
+        fsync: bool = FSYNC_EVERY_RECORD,
+    ) -> None:
+        self.path = Path(path)
+        self.log_path = self.path.with_name(f"{self.path.stem}.wal.jsonl")
+        self.next_path = self.log_path.with_name(self.log_path.name + ".next")
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.base = ""
+        self.snapshot_bytes = 0
+        self.log_bytes = 0
+        # Position of the log file's first byte. Positions handed out by ``append``
+        # count from it, so they stay valid when a compaction moves the tail.
+        self.origin = 0
+        # Whether ``log_bytes`` tells where this process's records start: the log was
+        # read (or started) here. A log that was not has nothing to carry over.
+        self.loaded = False
+        self._fh = None
+        self.counts: Dict[str, float] = {
+            "replayed": 0, "stale": 0, "appended": 0, "appended_bytes": 0, "syncs": 0, "compactions": 0,
+            "compact_seconds": 0.0,
+        }
+
+    # Loading -------------------------------------------------------------------
+
+    def read_snapshot(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            self.base, self.snapshot_bytes = "", 0
+            return {}
+        raw = self.path.read_bytes()
+        self.base, self.snapshot_bytes = snapshot_digest(raw), len(raw)
+        return json.loads(raw.decode("utf-8")) if raw.strip() else {}
+
+    def current_log(self) -> Path:
+        """The log that applies to the current dataset file (the next log after an interrupted compaction)."""
+        if self.next_path.exists() and header_base(self.next_path) == self.base:
+            return self.next_path
+        return self.log_path
+
+    def promote_next_log(self) -> None:
+        """Finish or discard a compaction that was interrupted between its renames."""
+        if not self.next_path.exists():
+            return
+        if self.current_log() == self.next_path:
+            os.replace(self.next_path, self.log_path)
+        else:
+            self.next_path.unlink()
+
+    def iter_records(self, repair: bool = True) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """``(offset, length, record)`` of each record of a log that applies to the current dataset file.
+
+        A torn last line (the process died mid-write) is skipped and, with
+        ``repair``, cut off so the next append starts on a clean line.
+        """
+        if repair:
+            self.promote_next_log()
+        log_path = self.current_log()
+        if not log_path.exists():
+            return
+        valid = 0
+        with log_path.open("rb") as fh:
+            header = fh.readline()
+            try:
+                base = json.loads(header).get("base") if header.endswith(b"\n") else None
+            except ValueError:
+                base = None
+            if base != self.base:
+                self.counts["stale"] += 1
+                return
+            valid = len(header)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                yield self.origin + valid, len(line), record
+                valid += len(line)
+        if repair and valid < log_path.stat().st_size:
+            with log_path.open("r+b") as fh:
+                fh.truncate(valid)
+        self.log_bytes = valid
+
+    def read_records(self, repair: bool = True) -> List[Dict[str, Any]]:
+        return [record for _, _, record in self.iter_records(repair)]
+
+    def read_record(self, offset: int, length: int) -> Dict[str, Any]:
+        """The record appended at ``offset`` (as returned by ``append``)."""
+        with self.log_path.open("rb") as fh:
+            fh.seek(offset - self.origin)
+            return json.loads(fh.read(length))
+
+    def load(self) -> Dict[str, Any]:
+        """The dataset file with every logged record replayed on top of it."""
+        with self.lock:
+            self.close()
+            data = self.read_snapshot()
+            records = self.read_records()
+            for record in records:
+                apply_record(data, record)
+            self.counts["replayed"] += len(records)
+            if not records:
+                self.reset_log()
+            self.loaded = True
+            return data
+
+    def replay(self, base: str, snapshot_bytes: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+        """Like ``load`` for a dataset file the caller read itself: yields the log's records."""
+        with self.lock:
+            self.close()
+            self.base, self.snapshot_bytes = base, snapshot_bytes
+        replayed = 0
+        for item in self.iter_records():
+            replayed += 1
+            yield item
+        with self.lock:
+            self.counts["replayed"] += replayed
+            if not replayed:
+                self.reset_log()
+            self.loaded = True
+
+    # Appending -----------------------------------------------------------------
+
+    def reset_log(self) -> None:
+        """Start an empty log for the current dataset file."""
+        temp_path = self.log_path.with_name(self.log_path.name + ".tmp")
+        header = json.dumps({"base": self.base}) + "\n"
+        with temp_path.open("w", encoding="utf-8") as fh:
+            fh.write(header)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temp_path, self.log_path)
+        self.log_bytes = len(header)
+        self.loaded = True
+
+    def append(self, op: str, keys: Sequence[str], value: Any) -> Tuple[int, int]:
+        """Append one record; returns its ``(offset, length)`` in the log (see ``origin``)."""
+        line = json.dumps({"op": op, "keys": list(keys), "value": value}, ensure_ascii=False, default=encode_record)
+        line += "\n"
+        encoded = line.encode("utf-8")
+        with self.lock:
+            if self._fh is None:
+                if not self.log_path.exists():
+                    self.reset_log()
+                self._fh = self.log_path.open("ab")
+            self._fh.write(encoded)
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            offset = self.origin + self.log_bytes
+            self.log_bytes += len(encoded)
+            self.counts["appended"] += 1
+            self.counts["appended_bytes"] += len(encoded)
+            return offset, len(encoded)
+
+    def set(self, keys: Sequence[str], value: Any) -> Tuple[int, int]:
+        return self.append("set", keys, value)
+
+    def extend(self, keys: Sequence[str], values: List[Any]) -> Optional[Tuple[int, int]]:
+        return self.append("extend", keys, values) if values else None
+
+    # Compaction ----------------------------------------------------------------
+
+    def should_compact(self) -> bool:
+        threshold = max(self.compact_min_bytes, self.snapshot_bytes * self.compact_ratio)
+        return self.log_bytes > threshold
+
+    def checkpoint(self, data: Dict[str, Any]) -> bool:
+        """Compact if the log has outgrown its threshold; returns whether it did."""
+        if not self.should_compact():
+            return False
+        self.compact(data)
+        return True
+
+    def mark(self) -> Optional[int]:
+        """Log position covered by the dataset as it is now, for ``compact``.
+
+        None when the log was never loaded: the dataset then replaces the file
+        and whatever log it had, rather than being merged with them.
+        """
+        with self.lock:
+            return self.log_bytes if self.loaded else None
+
+    def sync(self) -> None:
+        """fsync the records appended so far."""
+        with self.lock:
+            if self._fh is not None:
+                os.fsync(self._fh.fileno())
+                self.counts["syncs"] += 1
+
+    def compact(self, data: Dict[str, Any], mark: Optional[int] = None) -> None:
+        """Write ``data`` to the dataset file atomically and start a new log.
+
+        ``data`` reflects the log up to byte ``mark`` (all of it when None).
+        Records appended after that are carried over into the new log, so the
+        dataset can be serialized while the crawl keeps appending.
+        """
+        encoded = json.dumps(data, indent=2, ensure_ascii=False, default=encode_record).encode("utf-8")
+        self.rewrite(lambda fh: fh.write(encoded), mark)
+
+    def rewrite(self, write_dataset: Callable[[BinaryIO], Any], mark: Optional[int] = None) -> int:
+        """``compact`` with the new dataset file written by ``write_dataset`` instead of from memory.
+
+        Returns the log position (see ``origin``) up to which records are now
+        part of the dataset file.
+        """
+        started = time.perf_counter()
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with temp_path.open("wb") as raw:
+            written = DigestWriter(raw)
+            write_dataset(written)
+            raw.flush()
+            os.fsync(raw.fileno())
+        base = written.digest()
+        with self.lock:
+            self.close()
+            tail = b""
+            if mark is not None and self.log_path.exists():
+                with self.log_path.open("rb") as fh:
+                    # The old header never belongs to the tail, whatever ``mark`` says.
+                    mark = max(mark, len(fh.readline()))
+                    fh.seek(mark)
+                    tail = fh.read()
+            header = (json.dumps({"base": base}) + "\n").encode("utf-8")
+            with self.next_path.open("wb") as fh:
+                fh.write(header + tail)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(temp_path, self.path)
+            os.replace(self.next_path, self.log_path)
+            fsync_directory(self.path.parent)
+            covered = self.origin + (mark if mark is not None else self.log_bytes)
+            self.origin = covered - len(header)
+            self.base, self.snapshot_bytes = base, written.size
+            self.log_bytes = len(header) + len(tail)
+            self.loaded = True
+            self.counts["compactions"] += 1
+            self.counts["compact_seconds"] += time.perf_counter() - started
+        return covered
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        return (
+            f"{self.log_path.name}: replayed={int(counts['replayed'])} stale_logs={int(counts['stale'])} "
+            f"appended={int(counts['appended'])} ({counts['appended_bytes'] / 1024:.0f}KiB) "
+            f"syncs={int(counts['syncs'])} compactions={int(counts['compactions'])} ({counts['compact_seconds']:.2f}s)"
+        )
+
+
+def read_dataset(path: Path) -> Dict[str, Any]:
+    """A dataset as its scraper would resume it, without touching its files."""
+    log = RecordLog(path)
+    data = log.read_snapshot()
+    for record in log.read_records(repair=False):
+        apply_record(data, record)
+    return data
@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Statuses worth another attempt: throttling, timeouts and transient server errors.
+# Everything else outside 2xx (404, 410, 403, ...) is treated as permanent.
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, status: int) -> bool:
+        return status in RETRY_STATUSES
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter, never shorter than ``Retry-After``."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(ceiling / 2, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay * 5))
+        return delay
+
+
+class CircuitBreaker:
+    """Per-host breaker that pauses every request to a host that keeps failing.
+
+    After ``threshold`` consecutive failures the host is opened for ``cooldown``
+    seconds; each further failure while still failing doubles the pause up to
+    ``max_cooldown``. A ``Retry-After`` on a throttling response pauses the host
+    for at least that long. Any success closes the breaker again. ``scope``
+    keeps a separate breaker per egress proxy, so one proxy being throttled
+    does not pause the host for the others.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 600.0) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures: Dict[str, int] = {}
+        self.open_until: Dict[str, float] = {}
+        self.trips: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def remaining(self, host: str, scope: str = "") -> float:
+        key = f"{host}@{scope}" if scope else host
+        with self.lock:
+            return max(0.0, self.open_until.get(key, 0.0) - time.monotonic())
+
+    def wait(self, host: str, scope: str = "") -> float:
+        """Block while the host's breaker is open; return how long we waited."""
+        waited = 0.0
+        delay = self.remaining(host, scope)
+        while delay > 0:
+            time.sleep(delay)
+            waited += delay
+            delay = self.remaining(host, scope)
+        return waited
+
+    def record_success(self, host: str, scope: str = "") -> None:
+        with self.lock:
+            self.failures.pop(f"{host}@{scope}" if scope else host, None)
+
+    def record_failure(self, host: str, pause: Optional[float] = None, scope: str = "") -> None:
+        host = f"{host}@{scope}" if scope else host
+        with self.lock:
+            now = time.monotonic()
+            failures = self.failures.get(host, 0) + 1
+            self.failures[host] = failures
+            until = self.open_until.get(host, 0.0)
+            if failures >= self.threshold:
+                excess = failures - self.threshold
+                until = max(until, now + min(self.max_cooldown, self.cooldown * (2 ** excess)))
+                self.trips[host] = self.trips.get(host, 0) + 1
+            if pause:
+                until = max(until, now + min(pause, self.max_cooldown))
+            self.open_until[host] = until
+
+
+DEFAULT_POLICY = RetryPolicy()
+CIRCUIT_BREAKER = CircuitBreaker()
@@ -1,13 +1,27 @@
-import json
 import os
 import random
 import re
-import time
-from typing import Dict, List, Optional, Set
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-import requests
 from bs4 import BeautifulSoup
 
+from catalog_store import CATALOG_KEYS, CatalogStore, open_store
+from checkpoints import CHECKPOINTS
+from ebay_parser import STREAM_RESULTS, RawItem, iter_items_stream, join_text, parse_items
+from http_cache import RESPONSE_CACHE
+from http_fetch import STREAM_STATS, fetch_stream, fetch_text
+from http_session import SESSIONS
+from listings import EbayPartListing
+from log_writer import LOG_WRITER
+from model_matcher import MODEL_DISCOVERY, normalize_model
+from oem_index import OEM_INDEX
+from oem_tokenizer import OEM_TOKENIZER
+from parsed_document import PARSE_STATS, ParsedDocument
+from proxy_pool import ProxyPool, parse_proxy_list
+from query_planner import QueryPlanner
+
 BRANDS: List[str] = [
     "Audi",
     "BMW",
@@ -76,69 +90,33 @@ USER_AGENTS: List[str] = [
 ]
 
 PROXY = os.environ.get("SCRAPER_PROXY")
+PROXY_POOL = ProxyPool(parse_proxy_list([PROXY]), max_per_proxy=2) if PROXY else None
 CATALOG_FILE = "catalog.json"
-LOG_FILE = "log.txt"
+CATALOG = open_store(Path(CATALOG_FILE), CATALOG_KEYS)
+QUERY_PLANNER = QueryPlanner()
 
 
-def random_sleep() -> None:
-    time.sleep(random.uniform(1.5, 4.0))
+def random_headers() -> Dict[str, str]:
+    return {"User-Agent": random.choice(USER_AGENTS)}
 
 
-def build_proxies() -> Optional[Dict[str, str]]:
-    if not PROXY:
-        return None
-    return {"http": PROXY, "https": PROXY}
+def request_with_retry(url: str, params: Optional[Dict[str, str]] = None) -> Optional[str]:
+    return fetch_text(url, params=params, headers=random_headers, timeout=20, proxy_pool=PROXY_POOL)
 
 
-def request_with_retry(url: str, params: Optional[Dict[str, str]] = None) -> Optional[str]:
-    for attempt in range(5):
-        try:
-            response = requests.get(
-                url,
-                params=params,
-                headers={"User-Agent": random.choice(USER_AGENTS)},
-                timeout=20,
-                proxies=build_proxies(),
-            )
-            if response.status_code == 200:
-                return response.text
-        except requests.RequestException:
-            pass
-        random_sleep()
-    return None
+# Wikipedia blocks whose list items are links to other articles, not models.
+WIKIPEDIA_CHROME = {"navbox", "sidebar", "reflist", "references", "mw-references-wrap", "toc", "hatnote", "metadata"}
 
 
-def normalize_model(name: str) -> str:
-    cleaned = re.sub(r"\(.*?\)", "", name)
-    cleaned = re.sub(r"\b\d{4}\b", "", cleaned)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    cleaned = re.sub(r"\s+/.*", "", cleaned)
-    cleaned = cleaned.replace("–", "-")
-    cleaned = cleaned.strip("- ")
-    return cleaned.title()
+def is_wikipedia_chrome(tag) -> bool:
+    return tag.get("id") == "toc" or not WIKIPEDIA_CHROME.isdisjoint(tag.get("class") or ())
 
 
 def extract_models_from_content(content: BeautifulSoup, brand: str) -> Set[str]:
-    models: Set[str] = set()
-    text_sources: List[str] = []
-    for li in content.find_all("li"):
-        text_sources.append(li.get_text(" ", strip=True))
-    for cell in content.find_all(["td", "th"]):
-        text_sources.append(cell.get_text(" ", strip=True))
-
-    brand_lower = brand.lower()
-    for source in text_sources:
-        for candidate in re.findall(r"[A-Z][A-Za-z0-9][A-Za-z0-9\-\s]{0,24}", source):
-            normalized = normalize_model(candidate)
-            if not normalized or len(normalized) < 2 or len(normalized) > 30:
-                continue
-            lowered = normalized.lower()
-            if lowered.startswith(brand_lower):
-                lowered = lowered[len(brand_lower) :].strip()
-                normalized = normalize_model(lowered) if lowered else normalized
-            if normalized and not normalized.isdigit():
-                models.add(normalized)
-    return models
+    for block in content.find_all(is_wikipedia_chrome):
+        block.decompose()
+    text_sources: List[str] = [tag.get_text(" ", strip=True) for tag in content.find_all(["li", "td", "th"])]
+    return MODEL_DISCOVERY.extract(text_sources, brand)
 
 
 def fetch_models_for_brand(brand: str) -> List[str]:
@@ -150,10 +128,9 @@ def fetch_models_for_brand(brand: str) -> List[str]:
     collected: Set[str] = set()
     for url in candidates:
         html = request_with_retry(url)
-        random_sleep()
         if not html:
             continue
-        soup = BeautifulSoup(html, "lxml")
+        soup = ParsedDocument.parse(html, url, kind="wikipedia").soup
         content = soup.select_one("#mw-content-text") or soup
         collected |= extract_models_from_content(content, brand)
         if collected:
@@ -177,59 +154,57 @@ def parse_price(text: str) -> (Optional[float], Optional[str]):
         return None, currency
 
 
-def find_oems(text: str) -> List[str]:
-    normalized = text.upper().replace("-", " ")
-    matches = re.findall(r"[A-Z0-9]{4,}", normalized)
-    unique: List[str] = []
-    seen: Set[str] = set()
-    for m in matches:
-        cleaned = m.strip().upper()
-        if cleaned not in seen:
-            unique.append(cleaned)
-            seen.add(cleaned)
-    return unique
+def item_text(item: RawItem, title: str) -> str:
+    return f"{title} {join_text(item.subtitle, ' ', strip=True)}".strip()
 
 
-def log_oems(oems: List[str]) -> None:
-    with open(LOG_FILE, "a", encoding="utf-8") as log_file:
-        for oem in oems:
-            log_file.write(f"{oem}\n")
+def extract_listings(html: str, brand: Optional[str] = None) -> List[EbayPartListing]:
+    items = [item for item in parse_items(html) if item.title is not None]
+    titles = [join_text(item.title, " ", strip=True) for item in items]
+    texts = [item_text(item, title) for item, title in zip(items, titles)]
+    return build_listings(zip(items, titles, OEM_TOKENIZER.tokenize_many(texts, brand)))
+
+
+def stream_listings(chunks: Iterable[str], brand: Optional[str] = None, limit: int = 10) -> List[EbayPartListing]:
+    """``extract_listings`` on a downloading page, stopping after ``limit`` listings."""
+
+    def tokenized() -> Iterator[Tuple[RawItem, str, List[str]]]:
+        for item in iter_items_stream(chunks):
+            if item.title is None:
+                continue
+            title = join_text(item.title, " ", strip=True)
+            yield item, title, OEM_TOKENIZER.tokenize(item_text(item, title), brand)
 
+    return build_listings(tokenized(), limit)
 
-def extract_listings(html: str) -> List[Dict[str, object]]:
-    soup = BeautifulSoup(html, "lxml")
-    listings: List[Dict[str, object]] = []
+
+def build_listings(
+    entries: Iterable[Tuple[RawItem, str, List[str]]], limit: Optional[int] = None
+) -> List[EbayPartListing]:
+    listings: List[EbayPartListing] = []
     seen_oems: Set[str] = set()
-    for item in soup.select("li.s-item"):
-        title_el = item.select_one(".s-item__title")
-        subtitle_el = item.select_one(".s-item__subtitle")
-        if not title_el:
-            continue
-        title = title_el.get_text(" ", strip=True)
+    for item, title, tokens in entries:
+        if limit is not None and len(listings) >= limit:
+            break
         if title.lower() in {"new listing", "listing preview"}:
             continue
-        subtitle = subtitle_el.get_text(" ", strip=True) if subtitle_el else ""
-        combined_text = f"{title} {subtitle}".strip()
-        oems = find_oems(combined_text)
+        oems = list(dict.fromkeys(tokens))
         if not oems:
             continue
 
-        price_el = item.select_one(".s-item__price")
-        if not price_el:
+        if item.price is None:
             continue
-        price_value, currency = parse_price(price_el.get_text(" ", strip=True))
+        price_value, currency = parse_price(join_text(item.price, " ", strip=True))
         if price_value is None or not currency:
             continue
 
-        link_el = item.select_one("a.s-item__link")
-        if not link_el or not link_el.get("href"):
+        if not item.link_href:
             continue
-        listing_url = link_el.get("href").split("?")[0]
+        listing_url = item.link_href.split("?")[0]
 
-        image_el = item.select_one("img.s-item__image-img")
         image_url = None
-        if image_el:
-            image_url = image_el.get("src") or image_el.get("data-src")
+        if item.image:
+            image_url = item.image_src or item.image_data_src
 
         frequency: Dict[str, int] = {}
         for oem in oems:
@@ -240,70 +215,74 @@ def extract_listings(html: str) -> List[Dict[str, object]]:
             continue
         seen_oems.add(primary)
         cross_refs = [o for o in sorted_oems if o != primary]
-        log_oems(sorted_oems)
 
         listings.append(
-            {
-                "oem_main": primary,
-                "oem_cross_refs": cross_refs,
-                "title": title,
-                "price": price_value,
-                "currency": currency,
-                "image_url": image_url,
-                "ebay_url": listing_url,
-            }
+            EbayPartListing(
+                oem_main=primary,
+                oem_cross_refs=cross_refs,
+                title=title,
+                price=price_value,
+                currency=currency,
+                image_url=image_url,
+                ebay_url=listing_url,
+            )
         )
     return listings
 
 
-def search_ebay(brand: str, model: str, part: str) -> List[Dict[str, object]]:
-    queries = [
-        f"{brand} {model} {part}",
-        f"{brand} {model} {part} OEM",
-        f"{brand} {model} {part} replacement",
-    ]
-    aggregated: List[Dict[str, object]] = []
+def fetch_listings(query: str, brand: str) -> Optional[List[EbayPartListing]]:
+    url = "https://www.ebay.com/sch/i.html"
+    params = {"_nkw": query, "_sop": "12"}
+    if STREAM_RESULTS:
+        # Only the first 10 listings are used, so stop downloading once they are in.
+        consume = partial(stream_listings, brand=brand, limit=10)
+        return fetch_stream(url, consume, params=params, headers=random_headers, timeout=20, proxy_pool=PROXY_POOL)
+    html = request_with_retry(url, params=params)
+    if not html:
+        return None
+    return extract_listings(html, brand)
+
+
+def search_ebay(brand: str, model: str, part: str) -> List[EbayPartListing]:
+    aggregated: List[EbayPartListing] = []
     seen_primary: Set[str] = set()
-    for query in queries:
-        html = request_with_retry(
-            "https://www.ebay.com/sch/i.html",
-            params={"_nkw": query, "_sop": "12"},
-        )
-        random_sleep()
-        if not html:
+    yields: List[Tuple[str, List[EbayPartListing]]] = []
+    for suffix, query in QUERY_PLANNER.plan(brand, model, part):
+        # The OEM grammars depend on the brand, so only the same brand shares a fetch.
+        results = QUERY_PLANNER.run(query, lambda: fetch_listings(query, brand), scope=brand)
+        if results is None:
             continue
-        results = extract_listings(html)
+        yields.append((suffix, results[:10]))
         for listing in results[:10]:
-            primary = listing.get("oem_main")
+            primary = listing.oem_main
             if primary and primary in seen_primary:
                 continue
             if primary:
                 seen_primary.add(primary)
             aggregated.append(listing)
+    QUERY_PLANNER.record_yields(part, yields)
     return aggregated
 
 
-def load_catalog() -> Dict[str, Dict[str, Dict[str, List[Dict[str, object]]]]]:
-    if os.path.exists(CATALOG_FILE):
-        with open(CATALOG_FILE, "r", encoding="utf-8") as file:
-            return json.load(file)
-    return {}
+def load_catalog() -> CatalogStore:
+    return CATALOG.load()
 
 
-def save_catalog(catalog: Dict[str, Dict[str, Dict[str, List[Dict[str, object]]]]]) -> None:
-    with open(CATALOG_FILE, "w", encoding="utf-8") as file:
-        json.dump(catalog, file, ensure_ascii=False, indent=2)
+def save_catalog(catalog: CatalogStore) -> None:
+    catalog.save()
+    OEM_INDEX.save()
 
 
-def ensure_nested(catalog: Dict, brand: str, model: str) -> None:
-    if brand not in catalog:
-        catalog[brand] = {}
-    if model not in catalog[brand]:
-        catalog[brand][model] = {}
+def store_part(catalog: CatalogStore, brand: str, model: str, part: str, listings: List[EbayPartListing]) -> None:
+    """Record one part's listings and index their OEMs; the checkpoint itself runs in the background."""
+    catalog.set([brand, model, part], listings)
+    OEM_INDEX.add_listings(listings, "ebay", brand, model, part)
+    catalog.checkpoint()
+    OEM_INDEX.checkpoint()
 
 
-def should_skip_part(catalog: Dict, brand: str, model: str, part: str) -> bool:
-    return brand in catalog and model in catalog[brand] and part in catalog[brand][model]
+def should_skip_part(catalog: CatalogStore, brand: str, model: str, part: str) -> bool:
+    return catalog.has(brand, model, part)
 
 
 def main() -> None:
@@ -314,11 +293,24 @@ def main() -> None:
             for part in PARTS:
                 if should_skip_part(catalog, brand, model, part):
                     continue
-                ensure_nested(catalog, brand, model)
                 listings = search_ebay(brand, model, part)
                 if listings:
-                    catalog[brand][model][part] = listings
-                    save_catalog(catalog)
+                    store_part(catalog, brand, model, part, listings)
+        QUERY_PLANNER.save_stats()
+    save_catalog(catalog)
+    print(f"Catalog store {catalog.report()}")
+    print(f"OEM index {OEM_INDEX.report()}")
+    print(f"Checkpoints {CHECKPOINTS.report()}")
+    print(f"Log writer {LOG_WRITER.report()}")
+    print(f"Query planner {QUERY_PLANNER.report()}")
+    print(f"HTTP cache {RESPONSE_CACHE.report()}")
+    print(f"HTTP connections {SESSIONS.report()}")
+    print(f"HTML parsing {PARSE_STATS.report()}")
+    print(f"Model discovery {MODEL_DISCOVERY.report()}")
+    if STREAM_RESULTS:
+        print(f"Streamed pages {STREAM_STATS.report()}")
+    if PROXY_POOL:
+        print(f"Proxies {PROXY_POOL.report()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+QUEUE_PATH = Path(os.environ.get("SCRAPER_QUEUE_PATH", "crawl_queue.sqlite"))
+# A leased task not acked within this many seconds is handed to the next worker.
+LEASE_SECONDS = float(os.environ.get("SCRAPER_LEASE_SECONDS", "600"))
+# Leases a task gets before it is marked failed.
+MAX_ATTEMPTS = int(os.environ.get("SCRAPER_TASK_ATTEMPTS", "3"))
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+STATES = (QUEUED, LEASED, DONE, FAILED)
+
+TASK_COLUMNS = ("id", "dataset", "brand", "model", "part", "priority", "attempts")
+
+
+def worker_id(pid: Optional[int] = None) -> str:
+    """Lease owner name of a process: host and pid."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+class TaskQueue:
+    """Durable (brand, model, part) crawl jobs in a SQLite file, shared by worker processes.
+
+    ``seed`` queues jobs; ``lease`` hands out the highest priority queued
+    jobs (oldest first) to one owner until ``lease_seconds`` from now.
+    A job is finished with ``ack`` or given back with ``nack``, which queues it
+    again unless it has used up ``max_attempts`` leases. Leases that expire
+    (a worker crashed or hung) are queued again by the next ``lease`` call, and
+    ``release_owner`` does that at once for a worker known to be dead. Every
+    state change is one ``BEGIN IMMEDIATE`` transaction, so concurrent
+    workers never lease the same job. Each process opens its own connection.
+    """
+
+    def __init__(
+        self, path: Path = QUEUE_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS
+    ) -> None:
+        self.path = Path(path)
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self.lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self.counts: Dict[str, int] = {"seeded": 0, "leased": 0, "acked": 0, "retried": 0, "failed": 0, "expired": 0}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # A connection must not cross a fork; a child process opens its own.
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    dataset TEXT NOT NULL,
+                    brand TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    part TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    updated REAL NOT NULL,
+                    UNIQUE (dataset, brand, model, part)
+                );
+                CREATE INDEX IF NOT EXISTS tasks_next ON tasks (state, priority DESC, id);
+                CREATE INDEX IF NOT EXISTS tasks_leases ON tasks (state, lease_expires);
+                """
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _transaction(self, work: Any) -> Any:
+        """Run ``work(conn)`` in one write transaction."""
+        with self.lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    # Producing -----------------------------------------------------------------
+
+    def seed(self, dataset: str, jobs: Iterable[Tuple[str, str, str, int]]) -> int:
+        """Queue ``(brand, model, part, priority)`` jobs; returns how many were queued.
+
+        A job already queued or leased is left alone. A job that is done or
+        failed is queued again with fresh attempts (the caller seeds only work
+        that is still missing). A job that is done goes one priority lower, so
+        parts that were crawled before without results come after new ones.
+        """
+        now = time.time()
+        rows = [(dataset, brand, model, part, priority, now) for brand, model, part, priority in jobs]
+
+        def upsert(conn: sqlite3.Connection) -> int:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO tasks (dataset, brand, model, part, priority, updated) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dataset, brand, model, part) DO UPDATE SET state = 'queued', attempts = 0, "
+                "priority = CASE WHEN tasks.state = 'done' THEN excluded.priority - 1 ELSE excluded.priority END, "
+                "last_error = NULL, updated = excluded.updated WHERE tasks.state IN ('done', 'failed')",
+                rows,
+            )
+            return conn.total_changes - before
+
+        queued = self._transaction(upsert)
+        self.counts["seeded"] += queued
+        return queued
+
+    # Consuming -----------------------------------------------------------------
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> int:
+        expired = conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, owner = NULL, "
+            "lease_expires = NULL, last_error = 'lease expired', updated = ? "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now, now),
+        ).rowcount
+        self.counts["expired"] += max(0, expired)
+        return expired
+
+    def requeue_expired(self) -> int:
+        """Queue again (or fail) the jobs whose lease ran out; ``lease`` does this too."""
+        return self._transaction(lambda conn: self._requeue_expired(conn, time.time()))
+
+    def lease(self, owner: str, limit: int = 1, dataset: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lease up to ``limit`` queued jobs to ``owner``; an empty list means none are queued."""
+
+        def take(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            now = time.time()
+            self._requeue_expired(conn, now)
+            where, params = ("AND dataset = ?", [dataset]) if dataset else ("", [])
+            rows = conn.execute(
+                f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks WHERE state = 'queued' {where} "
+                "ORDER BY priority DESC, id LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?",
+                [(owner, now + self.lease_seconds, now, row[0]) for row in rows],
+            )
+            tasks = [dict(zip(TASK_COLUMNS, row)) for row in rows]
+            for task in tasks:
+                task["attempts"] += 1
+            return tasks
+
+        tasks = self._transaction(take)
+        self.counts["leased"] += len(tasks)
+        return tasks
+
+    def ack(self, task_id: int, owner: Optional[str] = None) -> bool:
+        """Mark a job done. With ``owner``, only while that owner still holds its lease."""
+
+        def finish(conn: sqlite3.Connection) -> bool:
+            sql = "UPDATE tasks SET state = 'done', owner = NULL, lease_expires = NULL, updated = ? WHERE id = ?"
+            params: List[Any] = [time.time(), task_id]
+            if owner is not None:
+                sql += " AND owner = ? AND state = 'leased'"
+                params.append(owner)
+            return conn.execute(sql, params).rowcount > 0
+
+        acked = self._transaction(finish)
+        self.counts["acked"] += acked
+        return acked
+
+    def nack(self, task_id: int, owner: str, error: str = "", retry: bool = True) -> str:
+        """Give a leased job back; returns its new state (queued again, or failed)."""
+
+        def give_back(conn: sqlite3.Connection) -> str:
+            row = conn.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND owner = ? AND state = 'leased'", (task_id, owner)
+            ).fetchone()
+            if row is None:
+                return ""
+            state = QUEUED if retry and row[0] < self.max_attempts else FAILED
+            conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, lease_expires = NULL, last_error = ?, updated = ? "
+                "WHERE id = ?",
+                (state, error[:500], time.time(), task_id),
+            )
+            return state
+
+        state = self._transaction(give_back)
+        if state:
+            self.counts["retried" if state == QUEUED else "failed"] += 1
+        return state
+
+    def release_owner(self, owner: str, error: str = "worker exited") -> int:
+        """Queue again every job leased to ``owner`` (a worker that died); returns how many."""
+
+        def release(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, owner = NULL, "
+                "lease_expires = NULL, last_error = ?, updated = ? WHERE owner = ? AND state = 'leased'",
+                (self.max_attempts, error, time.time(), owner),
+            ).rowcount
+
+        return self._transaction(release)
+
+    # Reporting -----------------------------------------------------------------
+
+    def stats(self, dataset: Optional[str] = None) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        where, params = ("WHERE dataset = ?", [dataset]) if dataset else ("", [])
+        with self.lock:
+            rows = self.conn.execute(f"SELECT state, COUNT(*) FROM tasks {where} GROUP BY state", params).fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def failures(self, dataset: Optional[str] = None, limit: int = 20) -> List[Sequence[Any]]:
+        where, params = ("AND dataset = ?", [dataset]) if dataset else ("", [])
+        with self.lock:
+            return self.conn.execute(
+                f"SELECT brand, model, part, attempts, last_error FROM tasks WHERE state = 'failed' {where} "
+                "ORDER BY updated DESC LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+
+    def report(self) -> str:
+        counts = self.counts
+        states = " ".join(f"{state}={count}" for state, count in self.stats().items())
+        return (
+            f"{self.path.name}: {states} (this process: seeded={counts['seeded']} leased={counts['leased']} "
+            f"acked={counts['acked']} retried={counts['retried']} failed={counts['failed']} "
+            f"expired={counts['expired']})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect the crawl task queue.")
+    parser.add_argument("command", choices=["stats", "failures"])
+    parser.add_argument("--queue", type=Path, default=QUEUE_PATH)
+    parser.add_argument("--dataset", default=None, help="Only jobs of this dataset, e.g. catalog")
+    args = parser.parse_args()
+
+    queue = TaskQueue(args.queue)
+    if args.command == "stats":
+        print(" ".join(f"{state}={count}" for state, count in queue.stats(args.dataset).items()))
+    else:
+        for brand, model, part, attempts, error in queue.failures(args.dataset):
+            print(f"{brand}\t{model}\t{part}\tattempts={attempts}\t{error or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import json
+import sys
+
+import catalog_store
+from catalog_store import CATALOG_KEYS, IndexedJsonStore, JsonStore
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["catalog_store.py", *map(str, args)])
+    catalog_store.main()
+
+
+def listing(oem):
+    return {"oem_main": oem, "oem_cross_refs": [], "price": 10.0, "currency": "EUR", "ebay_url": f"https://e/{oem}"}
+
+
+def test_export_over_existing_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path, db = tmp_path / "catalog.json", tmp_path / "catalogs.sqlite"
+    store = JsonStore(path, CATALOG_KEYS).load()
+    store.set(("Audi", "A4", "egr"), [listing("03L131512A")])
+    store.save()
+    # Records still in the log when the dataset is imported.
+    store.extend(("Audi", "A4", "egr"), [listing("03L131512B")])
+    store.set(("Audi", "A6", "turbo"), [listing("059145715F")])
+    store.close()
+
+    run_main(monkeypatch, "import", path, "--db", db)
+    run_main(monkeypatch, "export", path, "--db", db)
+
+    log_lines = (tmp_path / "catalog.wal.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [line for line in log_lines if "base" in json.loads(line)] == log_lines[:1]
+    expected = {
+        "Audi": {
+            "A4": {"egr": [listing("03L131512A"), listing("03L131512B")]},
+            "A6": {"turbo": [listing("059145715F")]},
+        }
+    }
+    assert JsonStore(path, CATALOG_KEYS).load().export() == expected
+    indexed = IndexedJsonStore(path, CATALOG_KEYS).load()
+    assert indexed.count() == 3
+    assert indexed.oems("Audi", "A4") == {"03L131512A", "03L131512B"}
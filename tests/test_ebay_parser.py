@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+
+import ebay_parser
+
+PAGES = sorted((Path(__file__).parent / "fixtures" / "ebay").glob("*.html"))
+BACKENDS = list(ebay_parser.BACKENDS)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # The callers log next to their datasets; keep that out of the tree.
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture(params=PAGES, ids=[path.stem for path in PAGES])
+def html(request):
+    return request.param.read_text(encoding="utf-8")
+
+
+def raw_fields(items):
+    return [tuple(getattr(item, name) for name in ebay_parser.RawItem.__slots__) for item in items]
+
+
+def chunked(html, size):
+    return (html[start : start + size] for start in range(0, len(html), size))
+
+
+def use_backend(monkeypatch, name):
+    if name == "selectolax":
+        pytest.importorskip("selectolax")
+    monkeypatch.setattr(ebay_parser, "DEFAULT_BACKEND", name)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_extract_identical_listings(html, backend, monkeypatch):
+    import catalog_builder
+    import scraper
+
+    expected = (
+        raw_fields(ebay_parser.parse_items(html, "bs4")),
+        scraper.extract_listings(html),
+        catalog_builder.listing_candidates(html, "parity", "Audi"),
+    )
+    use_backend(monkeypatch, backend)
+    observed = (
+        raw_fields(ebay_parser.parse_items(html)),
+        scraper.extract_listings(html),
+        catalog_builder.listing_candidates(html, "parity", "Audi"),
+    )
+    assert observed == expected
+
+
+@pytest.mark.parametrize("size", [1, 97, 16 * 1024])
+def test_streaming_matches_full_parse(html, size, monkeypatch):
+    import catalog_builder
+    import scraper
+
+    use_backend(monkeypatch, "lxml")
+    assert raw_fields(ebay_parser.iter_items_stream(chunked(html, size))) == raw_fields(ebay_parser.parse_items(html))
+    assert scraper.stream_listings(chunked(html, size), limit=1000) == scraper.extract_listings(html)
+    streamed = catalog_builder.stream_candidates(chunked(html, size), "parity", "Audi", set(), limit=1000)
+    assert streamed == catalog_builder.listing_candidates(html, "parity", "Audi")
+
+
+def test_page_edge_cases():
+    import catalog_builder
+
+    html = (PAGES[0].parent / "srp_ebay_co_uk_turbo.html").read_text(encoding="utf-8")
+    items = ebay_parser.parse_items(html, "bs4")
+    titles = [ebay_parser.join_text(item.title, " ", strip=True) for item in items]
+    # Items in the page's script and <template> are not result items; script text in a title is not text.
+    assert not any("03L 130 277 X" in title or "template" in title for title in titles)
+    assert titles[2] == "Turbo 03L253016T Audi A4 A5 Q5 2.0 TDI"
+    # The "Shop on eBay" placeholder has no s-item__image-img image.
+    assert titles[0] == "Shop on eBay" and not items[0].image
+    # Lazy images keep the placeholder in src and the picture in data-src; only <img> counts.
+    assert items[1].image_data_src.endswith("AAAAAAAAAAAAAAAA/s-l225.jpg")
+    assert items[2].image_src.endswith("BBBBBBBBBBBBBBBB/s-l225.jpg") and items[2].image_data_src is None
+    # Missing subtitle and missing price.
+    assert items[2].subtitle is None and items[4].price is None
+
+    _, listings = catalog_builder.listing_candidates(html, "parity", "Audi")
+    urls = [listing.ebay_url for listing in listings]
+    assert not any("/itm/123456" in url for url in urls)
+    assert not any("100000000004" in url for url in urls)
+    assert [listing.oem_main for listing in listings] == ["03L130277B", "03L253016T", "03L145702M"]
+
+
+def test_script_text_in_subtitle_is_ignored():
+    import scraper
+
+    html = (PAGES[0].parent / "srp_ebay_com_injector.html").read_text(encoding="utf-8")
+    listings = scraper.extract_listings(html, "BMW")
+    assert all("0445110999" not in (listing.oem_main, *listing.oem_cross_refs) for listing in listings)
+    assert listings[0].oem_main == "0445110289" and listings[0].oem_cross_refs == ("13537589048",)
+    assert listings[-1].image_url is None and "New Listing" in listings[-1].title
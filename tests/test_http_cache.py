@@ -0,0 +1,23 @@
+import sqlite3
+
+from http_cache import ResponseCache
+
+
+def accessed_at(root, url):
+    with sqlite3.connect(str(root / "cache.sqlite")) as conn:
+        return conn.execute("SELECT accessed_at FROM entries WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_close_writes_buffered_hits(tmp_path):
+    cache = ResponseCache(root=tmp_path, ttls={}, enabled=True)
+    url = "https://www.ebay.com/sch/i.html"
+    cache.save(url, None, "<html></html>", {})
+    stored = accessed_at(tmp_path, url)
+
+    assert cache.get_fresh(url) == "<html></html>"
+    assert accessed_at(tmp_path, url) == stored
+    cache.close()
+    assert accessed_at(tmp_path, url) > stored
+    # The cache opens a new connection after close.
+    assert cache.get_fresh(url) == "<html></html>"
+    cache.close()
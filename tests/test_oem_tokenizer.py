@@ -0,0 +1,32 @@
+import pytest
+
+from oem_tokenizer import OEM_TOKENIZER
+
+
+@pytest.mark.parametrize(
+    "brand, title, expected",
+    [
+        (None, "Injector 9673021480 308 2006 0 445 110 311", ["9673021480", "0445110311"]),
+        ("Peugeot", "Injector 9673021480 308 2006 0 445 110 311", ["9673021480", "0445110311"]),
+        ("BMW", "BMW 320d 2006 0 445 110 289", ["0445110289"]),
+        ("BMW", "Injector 13 53 7 589 048 E90 2006 0 445 110 289", ["13537589048", "0445110289"]),
+        ("Mercedes", "Sprinter 2010 0 986 437 404 A 651 090 14 80", ["0986437404", "A6510901480"]),
+        ("Opel", "Astra 2004 55 566 052", ["55566052"]),
+        (None, "Ducato 2012 F 00V C01 329", ["F00VC01329"]),
+    ],
+)
+def test_year_before_supplier_number(brand, title, expected):
+    assert OEM_TOKENIZER.tokenize(title, brand) == expected
+    assert OEM_TOKENIZER.tokenize_many([title, title], brand) == [expected, expected]
+
+
+@pytest.mark.parametrize(
+    "title", ["Alternator 11 61 7 823 210", "Alternator 11617823210", "Alternator 11-61-7-823-210"]
+)
+def test_bmw_grouping(title):
+    assert OEM_TOKENIZER.tokenize(title, "BMW") == ["11617823210"]
+
+
+def test_vag_numbers_unchanged_by_bosch_first():
+    title = "Turbo 03L 130 277 B 2010 059145715F 045906019BM"
+    assert OEM_TOKENIZER.tokenize(title, "Audi") == ["03L130277B", "059145715F", "045906019BM"]
@@ -0,0 +1,27 @@
+import asyncio
+
+from query_planner import QueryPlanner
+
+
+def test_run_async_coalesces_per_scope():
+    planner = QueryPlanner(stats_path=None)
+    fetched = []
+
+    async def fetch(base_url):
+        fetched.append(base_url)
+        await asyncio.sleep(0.01)
+        return base_url
+
+    async def crawl():
+        calls = [
+            ("BMW X5 Turbo", "https://www.ebay.com"),
+            ("bmw  x5 turbo", "https://www.ebay.com"),
+            ("BMW X5 Turbo", "https://www.ebay.de"),
+        ]
+        return await asyncio.gather(
+            *(planner.run_async(query, lambda url=url: fetch(url), scope=url) for query, url in calls)
+        )
+
+    assert asyncio.run(crawl()) == ["https://www.ebay.com", "https://www.ebay.com", "https://www.ebay.de"]
+    assert fetched == ["https://www.ebay.com", "https://www.ebay.de"]
+    assert planner.counts["coalesced"] == 1 and planner.counts["fetched"] == 2
@@ -0,0 +1,293 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, IO, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from http_cache import canonical_url
+from rate_limiter import host_key
+
+# Response headers worth keeping in an archive; the rest describe the live connection.
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+
+def open_archive(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return path.open(mode, encoding="utf-8")
+
+
+def load_archive(path: Path) -> Dict[str, Dict[str, object]]:
+    """Map canonical URL -> recorded response; later records win."""
+    records: Dict[str, Dict[str, object]] = {}
+    if not path.exists():
+        return records
+    with open_archive(path, "r") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["url"]] = record
+    return records
+
+
+# Stand-in server -------------------------------------------------------------
+
+
+class ReplayServer:
+    """Local HTTP stand-in serving archived responses at ``/replay?url=<original>``.
+
+    ``errors`` maps ``429``, ``503`` or ``"timeout"`` to an injection probability.
+    A timeout stalls for ``stall`` seconds and then drops the connection. With
+    ``fallback`` enabled, URLs missing from the archive get a random recorded page
+    from the same host instead of a 404, which lets crawls run past the recorded set.
+    """
+
+    def __init__(
+        self,
+        archive: Path,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        errors: Optional[Dict[object, float]] = None,
+        bandwidth: Optional[float] = None,
+        stall: float = 30.0,
+        fallback: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.records = load_archive(archive)
+        self.by_host: Dict[str, list] = {}
+        for url, record in self.records.items():
+            if record.get("status") == 200:
+                self.by_host.setdefault(host_key(url), []).append(record)
+        self.latency = latency
+        self.jitter = jitter
+        self.errors = dict(errors or {})
+        self.bandwidth = bandwidth
+        self.stall = stall
+        self.fallback = fallback
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.counts: Dict[str, int] = {"served": 0, "missing": 0, "fallback": 0, "429": 0, "503": 0, "timeout": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def draw(self) -> Tuple[float, Optional[object]]:
+        with self.random_lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            injected = None
+            roll = self.random.random()
+            for kind, probability in self.errors.items():
+                if roll < probability:
+                    injected = kind
+                    break
+                roll -= probability
+            return delay, injected
+
+    def pick_fallback(self, url: str) -> Optional[Dict[str, object]]:
+        candidates = self.by_host.get(host_key(url))
+        if not candidates:
+            return None
+        with self.random_lock:
+            return self.random.choice(candidates)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle(self) -> None:
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Streaming clients hang up mid-body once they have what they need.
+                    pass
+
+            def do_GET(self) -> None:
+                original = parse_qs(urlparse(self.path).query).get("url", [""])[0]
+                delay, injected = server.draw()
+                if delay:
+                    time.sleep(delay)
+                if injected == "timeout":
+                    server.counts["timeout"] += 1
+                    time.sleep(server.stall)
+                    self.close_connection = True
+                    return
+                if injected in (429, 503):
+                    server.counts[str(injected)] += 1
+                    self.send_response(injected)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                record = server.records.get(original)
+                if record is None and server.fallback:
+                    record = server.pick_fallback(original)
+                    if record is not None:
+                        server.counts["fallback"] += 1
+                if record is None:
+                    server.counts["missing"] += 1
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                server.counts["served"] += 1
+                body = str(record.get("body", "")).encode("utf-8")
+                self.send_response(int(record.get("status", 200)))
+                headers = dict(record.get("headers", {}))
+                # Bodies are archived as decoded text and always re-encoded as UTF-8.
+                media_type = str(headers.pop("Content-Type", "text/html")).split(";")[0]
+                self.send_header("Content-Type", f"{media_type}; charset=utf-8")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.write_body(body)
+
+            def write_body(self, body: bytes) -> None:
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    return
+                chunk_size = 16 * 1024
+                for start in range(0, len(body), chunk_size):
+                    chunk = body[start : start + chunk_size]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / server.bandwidth)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+
+# Client side -----------------------------------------------------------------
+
+
+class Transport:
+    """How ``http_fetch.fetch_text`` reaches the network, set by ``SCRAPER_TRANSPORT``.
+
+    ``live`` talks to the real hosts, ``record:<archive>`` also appends every
+    response to the archive, ``replay:<archive>`` starts an in-process stand-in on
+    a free port and ``replay:http://host:port`` uses an already running one.
+    """
+
+    def __init__(self, mode: str = "live", target: str = "") -> None:
+        self.mode = mode
+        self.target = target
+        self.replay_url = target if target.startswith("http") else ""
+        self.server: Optional[ReplayServer] = None
+        self.recorded = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Transport":
+        spec = os.environ.get("SCRAPER_TRANSPORT", "live")
+        mode, _, target = spec.partition(":")
+        if mode not in {"live", "record", "replay"}:
+            raise ValueError(f"Unknown SCRAPER_TRANSPORT mode: {mode!r}")
+        return cls(mode, target)
+
+    def replay_through(self, server_url: str) -> None:
+        self.mode = "replay"
+        self.replay_url = server_url
+
+    def route(self, url: str, params: Optional[Mapping[str, str]]) -> Tuple[str, Optional[Mapping[str, str]]]:
+        """Return the URL and params to actually send for a request to ``url``."""
+        if self.mode != "replay":
+            return url, params
+        with self.lock:
+            if not self.replay_url:
+                self.server = ReplayServer(Path(self.target)).start()
+                self.replay_url = self.server.url
+        return f"{self.replay_url}/replay?{urlencode({'url': canonical_url(url, params)})}", None
+
+    def record(self, url: str, params: Optional[Mapping[str, str]], response, body: Optional[str] = None) -> None:
+        """Append ``response`` to the archive; streamed responses pass the ``body`` they read."""
+        if self.mode != "record" or getattr(response, "from_cache", False):
+            return
+        entry = {
+            "url": canonical_url(url, params),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "body": response.text if body is None else body,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            with open_archive(Path(self.target), "a") as fh:
+                fh.write(line + "\n")
+            self.recorded += 1
+
+
+TRANSPORT = Transport.from_env()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a recorded crawl archive as a local stand-in.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the replay stand-in server")
+    serve.add_argument("--archive", required=True, type=Path)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="Mean added latency in seconds")
+    serve.add_argument("--jitter", type=float, default=0.0, help="Latency jitter in seconds (+/-)")
+    serve.add_argument("--error-429", type=float, default=0.0, help="Probability of a 429 response")
+    serve.add_argument("--error-503", type=float, default=0.0, help="Probability of a 503 response")
+    serve.add_argument("--timeout-rate", type=float, default=0.0, help="Probability of a stalled request")
+    serve.add_argument("--stall", type=float, default=30.0, help="Seconds a stalled request hangs")
+    serve.add_argument("--bandwidth", type=float, default=0.0, help="Bytes per second per response (0 = unlimited)")
+    serve.add_argument("--fallback", action="store_true", help="Serve a same-host page for unrecorded URLs")
+    serve.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.archive,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        errors={429: args.error_429, 503: args.error_503, "timeout": args.timeout_rate},
+        bandwidth=args.bandwidth or None,
+        stall=args.stall,
+        fallback=args.fallback,
+        seed=args.seed,
+    )
+    print(f"Serving {len(server.records)} recorded responses on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"Stand-in counts {server.counts}")
+
+
+if __name__ == "__main__":
+    main()